@@ -0,0 +1,203 @@
+"""
+Completa latitude/longitude y las columnas *_filter de los lugares que no las tienen
+(lugares creados sin validar la dirección, o antes de que existieran los filtros).
+
+Recorre `places` por id en páginas (keyset, sin cargar la tabla entera), geocodifica
+cada página con concurrencia acotada a través de `locationiq_client` (mismo rate
+limit, caché y coalescing que la API) y escribe la página en una sola transacción,
+junto con su ubicación normalizada (place_locations).
+Después de cada commit guarda el último id procesado en el archivo de checkpoint,
+así que si se corta se puede volver a correr y sigue desde ahí (--restart empieza
+de cero). Las coordenadas existentes no se pisan.
+
+    python backfill_place_geocoding.py --dry-run
+    python backfill_place_geocoding.py --concurrency 4 --batch-size 200
+
+Para probar sin gastar cuota, levantar el mock (python mock_locationiq.py) y correr
+con LOCATIONIQ_BASE_URL=http://127.0.0.1:8900/v1 LOCATIONIQ_API_KEY=test.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Optional
+
+from sqlalchemy import or_, select, update
+
+from address_parser import parse_full_address
+from database import SessionLocal
+from geocoding import locationiq_client
+from models import Place
+from services.locations import assign_place_locations
+
+_FILTER_COLUMNS = ("country_filter", "city_state_filter", "street_filter")
+_RETRY_DELAY_SECONDS = 1.0
+
+
+def _log(message: str) -> None:
+    sys.stdout.write(f"{message}\n")
+
+
+def _read_checkpoint(path: Path) -> int:
+    try:
+        return int(json.loads(path.read_text())["last_id"])
+    except (FileNotFoundError, KeyError, ValueError):
+        return 0
+
+
+def _write_checkpoint(path: Path, last_id: int) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps({"last_id": last_id}))
+    tmp.replace(path)
+
+
+def _fetch_page(after_id: int, batch_size: int) -> list:
+    stmt = (
+        select(
+            Place.id,
+            Place.country,
+            Place.city_state,
+            Place.street,
+            Place.street_number,
+            Place.latitude,
+            Place.longitude,
+        )
+        .where(
+            Place.id > after_id,
+            or_(
+                Place.latitude.is_(None),
+                Place.longitude.is_(None),
+                *(getattr(Place, column).is_(None) for column in _FILTER_COLUMNS),
+            ),
+        )
+        .order_by(Place.id)
+        .limit(batch_size)
+    )
+    with SessionLocal() as db:
+        return db.execute(stmt).all()
+
+
+def _build_update(row, result: Optional[dict]) -> Optional[dict]:
+    if not result:
+        return None
+    values: dict = {"id": row.id}
+    if row.latitude is None or row.longitude is None:
+        values["latitude"] = result["latitude"]
+        values["longitude"] = result["longitude"]
+    parsed = parse_full_address(result.get("display_name") or "")
+    if parsed:
+        values.update({column: parsed.get(column) for column in _FILTER_COLUMNS})
+    return values if len(values) > 1 else None
+
+
+async def _geocode_page(rows: list, concurrency: int, retries: int) -> list[Optional[dict]]:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def geocode(row) -> Optional[dict]:
+        address = {
+            "country": row.country,
+            "city_state": row.city_state,
+            "street": row.street,
+            "street_number": row.street_number,
+        }
+        if not (row.country or row.city_state or row.street):
+            return None
+        for attempt in range(retries + 1):
+            if attempt:
+                await asyncio.sleep(_RETRY_DELAY_SECONDS * attempt)
+            async with semaphore:
+                result = await locationiq_client.geocode_address(address)
+            # None también puede ser un 429/timeout; "sin resultados" queda en la caché
+            # negativa, así que reintentarlo no vuelve a llamar a LocationIQ.
+            if result is not None:
+                return result
+        return None
+
+    return await asyncio.gather(*(geocode(row) for row in rows))
+
+
+async def backfill(
+    checkpoint: Path,
+    batch_size: int,
+    concurrency: int,
+    retries: int,
+    limit: Optional[int],
+    dry_run: bool,
+) -> dict[str, float]:
+    stats = {"scanned": 0, "updated": 0, "not_found": 0, "batches": 0}
+    last_id = _read_checkpoint(checkpoint)
+    if last_id:
+        _log(f"Retomando desde el lugar {last_id}")
+
+    started = time.perf_counter()
+    try:
+        while limit is None or stats["scanned"] < limit:
+            page_size = batch_size if limit is None else min(batch_size, limit - stats["scanned"])
+            rows = _fetch_page(last_id, page_size)
+            if not rows:
+                break
+
+            results = await _geocode_page(rows, concurrency, retries)
+            updates = [values for row, result in zip(rows, results) if (values := _build_update(row, result))]
+            if updates and not dry_run:
+                rows_by_id = {row.id: row for row in rows}
+                with SessionLocal() as db:
+                    db.execute(update(Place), updates)
+                    for values in updates:
+                        row = rows_by_id[values["id"]]
+                        assign_place_locations(
+                            db,
+                            row.id,
+                            values.get("country_filter") or row.country,
+                            values.get("city_state_filter") or row.city_state,
+                        )
+                    db.commit()
+
+            last_id = rows[-1].id
+            if not dry_run:
+                _write_checkpoint(checkpoint, last_id)
+            stats["batches"] += 1
+            stats["scanned"] += len(rows)
+            stats["updated"] += len(updates)
+            stats["not_found"] += len(rows) - len(updates)
+            _log(f"  hasta id {last_id}: {stats['scanned']} revisados, {stats['updated']} actualizados")
+    finally:
+        await locationiq_client.aclose()
+    stats["seconds"] = time.perf_counter() - started
+    return stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Geocodificar lugares sin coordenadas o sin filtros de ubicación")
+    parser.add_argument("--batch-size", type=int, default=100, help="Lugares por página y por commit")
+    parser.add_argument("--concurrency", type=int, default=4, help="Geocodificaciones en paralelo")
+    parser.add_argument("--retries", type=int, default=2, help="Reintentos por lugar ante errores de LocationIQ")
+    parser.add_argument("--limit", type=int, default=None, help="Máximo de lugares a revisar en esta corrida")
+    parser.add_argument("--checkpoint", type=Path, default=Path("geocode_backfill.checkpoint"))
+    parser.add_argument("--restart", action="store_true", help="Ignorar el checkpoint y empezar de cero")
+    parser.add_argument("--dry-run", action="store_true", help="Geocodificar sin escribir en la base")
+    args = parser.parse_args()
+
+    if locationiq_client is None:
+        _log("LOCATIONIQ_API_KEY no está configurada")
+        sys.exit(1)
+    if args.restart:
+        args.checkpoint.unlink(missing_ok=True)
+
+    stats = asyncio.run(
+        backfill(args.checkpoint, args.batch_size, args.concurrency, args.retries, args.limit, args.dry_run)
+    )
+    seconds = stats["seconds"] or 1e-9
+    _log(
+        f"Revisados: {stats['scanned']}  actualizados: {stats['updated']}  "
+        f"sin resultado: {stats['not_found']}  en {seconds:.1f}s ({stats['scanned'] / seconds:.1f} lugares/s)"
+    )
+    _log(f"LocationIQ: {locationiq_client.stats()}")
+
+
+if __name__ == "__main__":
+    main()
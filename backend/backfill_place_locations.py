@@ -0,0 +1,67 @@
+"""
+Asocia los lugares existentes a la tabla de ubicaciones normalizadas (locations /
+place_locations) a partir de sus columnas *_filter, o de país y ciudad si no las
+tienen. Recorre los lugares por id en páginas y commitea cada página; se puede
+volver a correr sin problema (cada lugar se re-asocia desde cero).
+
+    python backfill_place_locations.py
+    python backfill_place_locations.py --only-missing --batch-size 500
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+
+from sqlalchemy import select
+
+from database import SessionLocal
+from models import Place, PlaceLocation
+from services.locations import assign_place_locations
+
+
+def _log(message: str) -> None:
+    sys.stdout.write(f"{message}\n")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Mapear lugares a ubicaciones normalizadas")
+    parser.add_argument("--batch-size", type=int, default=200, help="Lugares por commit")
+    parser.add_argument("--only-missing", action="store_true", help="Solo lugares sin ninguna ubicación asociada")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    last_id = 0
+    mapped = 0
+    while True:
+        stmt = (
+            select(Place.id, Place.country, Place.city_state, Place.country_filter, Place.city_state_filter)
+            .where(Place.id > last_id)
+            .order_by(Place.id)
+            .limit(args.batch_size)
+        )
+        if args.only_missing:
+            stmt = stmt.where(~select(PlaceLocation.place_id).where(PlaceLocation.place_id == Place.id).exists())
+
+        with SessionLocal() as db:
+            rows = db.execute(stmt).all()
+            if not rows:
+                break
+            for row in rows:
+                assign_place_locations(
+                    db,
+                    row.id,
+                    row.country_filter or row.country,
+                    row.city_state_filter or row.city_state,
+                )
+            db.commit()
+
+        last_id = rows[-1].id
+        mapped += len(rows)
+        _log(f"  hasta id {last_id}: {mapped} lugares")
+
+    _log(f"Lugares mapeados: {mapped} en {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
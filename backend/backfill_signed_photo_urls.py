@@ -0,0 +1,85 @@
+"""
+Reescribe las URLs de fotos guardadas (place_photos.url, review_photos.url y
+users.photo_url) a su forma firmada (/api/photos/<tipo>/<id>/<firma>). Así los
+clientes dejan de pasar por las rutas viejas, que consultan Postgres y responden con
+una redirección, y las URLs ya firmadas con una clave anterior vuelven a ser válidas.
+
+Recorre cada tabla por id en páginas y commitea cada página; solo toca las filas cuya
+URL cambia, así que se puede volver a correr sin problema. --base-url es la URL
+pública de la API, la misma que ven los clientes en request.base_url.
+
+    python backfill_signed_photo_urls.py --base-url https://api.viajerosxp.com/ --dry-run
+    python backfill_signed_photo_urls.py --base-url https://api.viajerosxp.com/ --batch-size 1000
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+
+from sqlalchemy import select, update
+
+from database import SessionLocal
+from models import PlacePhoto, ReviewPhoto, User
+from services.photo_urls import signed_photo_url
+
+
+def _log(message: str) -> None:
+    sys.stdout.write(f"{message}\n")
+
+
+def backfill_table(model, url_column, kind: str, base_url: str, batch_size: int, dry_run: bool) -> tuple[int, int]:
+    """Devuelve (filas revisadas, filas reescritas)."""
+    last_id = 0
+    scanned = 0
+    rewritten = 0
+    while True:
+        stmt = (
+            select(model.id, model.photo_file_id, url_column)
+            .where(model.id > last_id, model.photo_file_id.isnot(None))
+            .order_by(model.id)
+            .limit(batch_size)
+        )
+        with SessionLocal() as db:
+            rows = db.execute(stmt).all()
+            if not rows:
+                break
+            changes = []
+            for row_id, file_id, url in rows:
+                signed_url = signed_photo_url(base_url, kind, file_id)
+                if url != signed_url:
+                    changes.append({"id": row_id, url_column.key: signed_url})
+            if changes and not dry_run:
+                db.execute(update(model), changes)
+                db.commit()
+
+        last_id = rows[-1][0]
+        scanned += len(rows)
+        rewritten += len(changes)
+    return scanned, rewritten
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Reescribir las URLs de fotos guardadas a su forma firmada")
+    parser.add_argument("--base-url", required=True, help="URL pública de la API (ej. https://api.viajerosxp.com/)")
+    parser.add_argument("--batch-size", type=int, default=500, help="Filas por commit")
+    parser.add_argument("--dry-run", action="store_true", help="Solo contar, sin escribir")
+    args = parser.parse_args()
+
+    base_url = args.base_url if args.base_url.endswith("/") else f"{args.base_url}/"
+    tables = (
+        ("place_photos", PlacePhoto, PlacePhoto.url, "places"),
+        ("review_photos", ReviewPhoto, ReviewPhoto.url, "reviews"),
+        ("users", User, User.photo_url, "avatars"),
+    )
+    for label, model, url_column, kind in tables:
+        started = time.perf_counter()
+        scanned, rewritten = backfill_table(model, url_column, kind, base_url, args.batch_size, args.dry_run)
+        _log(
+            f"{label}{' (dry run)' if args.dry_run else ''}: revisadas {scanned}  "
+            f"reescritas {rewritten}  {time.perf_counter() - started:.1f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Benchmark de la recuperación de contexto del asistente.
+
+Genera una base de conocimiento sintética (por defecto 10.000 fragmentos armados con
+el vocabulario de data/knowledge), construye el índice BM25 y mide la latencia de
+consulta contra el recorrido lineal que se usaba antes (buscar cada keyword como
+substring de la pregunta, fragmento por fragmento).
+
+    python bench_knowledge_index.py --chunks 10000 --queries 500
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import time
+
+from services.knowledge_index import KnowledgeChunk, KnowledgeIndex, load_knowledge_chunks, tokenize
+from settings import get_settings
+
+
+def _synthetic_chunks(seed_chunks: list[KnowledgeChunk], count: int, rng: random.Random) -> list[KnowledgeChunk]:
+    words = sorted({token for chunk in seed_chunks for token in tokenize(chunk.text)})
+    keywords = sorted({keyword for chunk in seed_chunks for keyword in chunk.keywords})
+    chunks = list(seed_chunks)
+    for index in range(len(chunks), count):
+        chunks.append(
+            KnowledgeChunk(
+                id=f"synthetic_{index}",
+                keywords=tuple(rng.sample(keywords, 5)),
+                text=" ".join(rng.choices(words, k=rng.randint(25, 60))),
+            )
+        )
+    return chunks
+
+
+def _linear_search(chunks: list[KnowledgeChunk], text: str, limit: int) -> list[KnowledgeChunk]:
+    normalized = text.lower()
+    scored = []
+    for index, chunk in enumerate(chunks):
+        score = sum(1 for keyword in chunk.keywords if keyword and keyword in normalized)
+        if score:
+            scored.append((-score, index, chunk))
+    scored.sort(key=lambda item: item[:2])
+    return [chunk for _, _, chunk in scored[:limit]]
+
+
+def _measure(label: str, search, queries: list[str]) -> None:
+    latencies = []
+    for query in queries:
+        started = time.perf_counter()
+        search(query)
+        latencies.append(time.perf_counter() - started)
+    ordered = sorted(latencies)
+    print(
+        "{:<8} p50 {:.3f} ms  p95 {:.3f} ms  media {:.3f} ms".format(
+            label,
+            ordered[len(ordered) // 2] * 1000,
+            ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)] * 1000,
+            statistics.mean(latencies) * 1000,
+        )
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark del índice BM25 de la base de conocimiento")
+    parser.add_argument("--chunks", type=int, default=10_000, help="Fragmentos en la base sintética")
+    parser.add_argument("--queries", type=int, default=500, help="Consultas a medir")
+    parser.add_argument("--limit", type=int, default=4, help="Fragmentos devueltos por consulta")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    seed_chunks = load_knowledge_chunks(get_settings().assistant_knowledge_dir)
+    chunks = _synthetic_chunks(seed_chunks, args.chunks, rng)
+    words = sorted({token for chunk in seed_chunks for token in tokenize(chunk.text)})
+    queries = [" ".join(rng.choices(words, k=rng.randint(3, 12))) for _ in range(args.queries)]
+
+    started = time.perf_counter()
+    index = KnowledgeIndex(chunks)
+    build_seconds = time.perf_counter() - started
+    print(
+        f"{len(chunks)} fragmentos, {len(index.vocabulary)} términos, "
+        f"{index.weights.size} postings: índice construido en {build_seconds * 1000:.0f} ms"
+    )
+
+    _measure("bm25", lambda query: index.search(query, args.limit), queries)
+    _measure("lineal", lambda query: _linear_search(chunks, query, args.limit), queries)
+
+
+if __name__ == "__main__":
+    main()
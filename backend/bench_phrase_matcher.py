@@ -0,0 +1,88 @@
+"""
+Microbenchmark del matcher de frases del asistente (Aho-Corasick) contra el recorrido
+lineal de siempre (`any(trigger in texto)` regla por regla), a medida que crece la
+cantidad de reglas.
+
+Las reglas sintéticas se arman con el vocabulario de los disparadores reales; los
+mensajes mezclan palabras de ese vocabulario, así que algunos coinciden y otros no.
+
+    python bench_phrase_matcher.py --rules 10 100 500 1000 --messages 2000
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import time
+
+from services.phrase_matcher import PhraseMatcher
+from services.virtual_assistant_rules import _RULES
+
+
+def _synthetic_rules(count: int, rng: random.Random) -> list[tuple[str, ...]]:
+    words = sorted({word for rule in _RULES for trigger in rule.triggers for word in trigger.split()})
+    rules = [rule.triggers for rule in _RULES]
+    while len(rules) < count:
+        rules.append(tuple(" ".join(rng.choices(words, k=rng.randint(2, 5))) for _ in range(rng.randint(2, 5))))
+    return rules[:count]
+
+
+def _linear_first(rules: list[tuple[str, ...]], text: str):
+    for index, triggers in enumerate(rules):
+        if any(trigger in text for trigger in triggers):
+            return index
+    return None
+
+
+def _linear_all(rules: list[tuple[str, ...]], text: str) -> list[int]:
+    return [index for index, triggers in enumerate(rules) if any(trigger in text for trigger in triggers)]
+
+
+def _time_per_call(function, messages: list[str], repeat: int = 3) -> float:
+    # Mejor de `repeat` corridas, en microsegundos por mensaje.
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for message in messages:
+            function(message)
+        best = min(best, time.perf_counter() - started)
+    return best / len(messages) * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark del matcher Aho-Corasick de reglas del asistente")
+    parser.add_argument("--rules", type=int, nargs="+", default=[len(_RULES), 100, 500, 1000])
+    parser.add_argument("--messages", type=int, default=2000, help="Mensajes por medición")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    words = sorted({word for rule in _RULES for trigger in rule.triggers for word in trigger.split()})
+    messages = [" ".join(rng.choices(words, k=rng.randint(3, 15))) for _ in range(args.messages)]
+
+    print(f"{'reglas':>7} {'frases':>7} {'build ms':>9} {'lineal 1ra':>11} {'ac 1ra':>8} {'lineal todas':>13} {'ac todas':>9}  (µs/mensaje)")
+    for count in args.rules:
+        rules = _synthetic_rules(count, rng)
+        started = time.perf_counter()
+        matcher = PhraseMatcher((trigger, index) for index, triggers in enumerate(rules) for trigger in triggers)
+        build_ms = (time.perf_counter() - started) * 1000
+
+        mismatches = sum(
+            matcher.find_all(message) != _linear_all(rules, message) for message in messages
+        )
+        if mismatches:
+            raise SystemExit(f"{mismatches} mensajes con resultados distintos para {count} reglas")
+
+        print(
+            f"{count:>7} {len(matcher):>7} {build_ms:>9.1f} "
+            f"{_time_per_call(lambda m: _linear_first(rules, m), messages):>11.1f} "
+            f"{_time_per_call(matcher.first, messages):>8.1f} "
+            f"{_time_per_call(lambda m: _linear_all(rules, m), messages):>13.1f} "
+            f"{_time_per_call(matcher.find_all, messages):>9.1f}"
+        )
+    lengths = [len(message) for message in messages]
+    print(f"Largo de mensaje: media {statistics.mean(lengths):.0f} caracteres, máximo {max(lengths)}")
+
+
+if __name__ == "__main__":
+    main()
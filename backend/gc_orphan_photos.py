@@ -0,0 +1,178 @@
+"""
+Borra las fotos huérfanas: archivos del almacenamiento de fotos que ninguna fila de
+place_photos, review_photos o users referencia (subidas fallidas, lugares borrados,
+avatares reemplazados).
+
+Los ids referenciados se leen de Postgres en streaming y ordenados, y se cruzan con
+los ids de cada bucket (también ordenados) con un merge, así que la memoria no crece
+con la cantidad de fotos.
+
+Con la deduplicación una subida nueva puede reutilizar un id viejo (solo suma una
+referencia), así que el período de gracia cuenta desde el último cambio de la entrada
+de referencias, no desde la creación del archivo. Además se conservan los archivos con
+un borrado pendiente en photo_purge_queue (lo resuelve el worker; no cuentan los que
+agotaron sus intentos) y los que todavía tienen referencias vivas; esos últimos solo
+se borran con --collect-live-refs, para recuperar lo que dejó un worker de purga que se
+cayó a mitad de un lote o una purga que agotó sus intentos.
+
+    python gc_orphan_photos.py --dry-run
+    python gc_orphan_photos.py --grace-hours 48 --bucket place_photos
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Iterator, Optional
+
+from sqlalchemy import select
+
+from database import engine
+from models import PhotoPurgeJob, PlacePhoto, ReviewPhoto, User
+from services.photo_backends import PhotoBackend, get_photo_backend
+from services.photo_bucket import parse_file_id
+from settings import get_settings
+
+_YIELD_PER = 1000
+
+
+def _log(message: str) -> None:
+    sys.stdout.write(f"{message}\n")
+
+
+def _referenced_file_ids(column) -> Iterator[str]:
+    # COLLATE "C" orders like Python string comparison, which the merge relies on.
+    stmt = select(column).where(column.isnot(None)).order_by(column.collate("C"))
+    with engine.connect() as connection:
+        result = connection.execution_options(yield_per=_YIELD_PER).execute(stmt)
+        for (file_id,) in result:
+            yield file_id
+
+
+def _pending_purge_file_ids(bucket_name: str, max_attempts: int) -> set[str]:
+    # Son pocos (se drenan enseguida), así que alcanza con tenerlos en memoria. Los trabajos
+    # que agotaron sus intentos ya no se reintentan: sus archivos quedan para el GC.
+    stmt = select(PhotoPurgeJob.file_id).where(
+        PhotoPurgeJob.bucket == bucket_name,
+        PhotoPurgeJob.attempts < max_attempts,
+    )
+    with engine.connect() as connection:
+        return set(connection.scalars(stmt))
+
+
+def find_orphans(stored_ids: Iterator[str], referenced_ids: Iterator[str]) -> Iterator[str]:
+    """Sorted merge: yield the stored ids that are not in ``referenced_ids`` (both ascending)."""
+    referenced: Optional[str] = next(referenced_ids, None)
+    for file_id in stored_ids:
+        while referenced is not None and referenced < file_id:
+            referenced = next(referenced_ids, None)
+        if referenced != file_id:
+            yield file_id
+
+
+def collect_bucket(
+    backend: PhotoBackend,
+    column,
+    grace: timedelta,
+    dry_run: bool,
+    pending_purge: set[str],
+    collect_live_refs: bool = False,
+) -> dict[str, float]:
+    stats = {
+        "scanned": 0,
+        "orphans": 0,
+        "too_recent": 0,
+        "pending_purge": 0,
+        "live_refs": 0,
+        "deleted": 0,
+        "errors": 0,
+    }
+    cutoff = datetime.now(timezone.utc) - grace
+
+    def stored_ids() -> Iterator[str]:
+        for file_id in backend.iter_file_ids():
+            stats["scanned"] += 1
+            yield file_id
+
+    started = time.perf_counter()
+    for file_id in find_orphans(stored_ids(), _referenced_file_ids(column)):
+        stats["orphans"] += 1
+        object_id = parse_file_id(file_id)
+        if object_id is None or object_id.generation_time > cutoff:
+            stats["too_recent"] += 1
+            continue
+        if file_id in pending_purge:
+            stats["pending_purge"] += 1
+            continue
+        reference = backend.reference(file_id)
+        if reference is not None:
+            # Un id reutilizado por una subida cuya fila todavía no se commiteó
+            if reference.updated_at is not None and reference.updated_at > cutoff:
+                stats["too_recent"] += 1
+                continue
+            if reference.refcount > 0 and not collect_live_refs:
+                stats["live_refs"] += 1
+                continue
+        if dry_run:
+            continue
+        try:
+            backend.remove(file_id)
+            stats["deleted"] += 1
+        except Exception as exc:
+            stats["errors"] += 1
+            _log(f"  [ERROR] {file_id}: {exc}")
+    stats["seconds"] = time.perf_counter() - started
+    return stats
+
+
+def main() -> None:
+    settings = get_settings()
+    buckets = {
+        settings.mongodb_avatars_bucket: User.photo_file_id,
+        settings.mongodb_place_photos_bucket: PlacePhoto.photo_file_id,
+        settings.mongodb_review_photos_bucket: ReviewPhoto.photo_file_id,
+    }
+    parser = argparse.ArgumentParser(description="Borrar fotos que ninguna fila referencia")
+    parser.add_argument("--bucket", choices=list(buckets), action="append", help="Bucket a limpiar (por defecto, todos)")
+    parser.add_argument(
+        "--grace-hours",
+        type=float,
+        default=24.0,
+        help="Tiempo mínimo desde la creación del archivo y el último cambio de sus referencias",
+    )
+    parser.add_argument(
+        "--collect-live-refs",
+        action="store_true",
+        help="Borrar también huérfanos con referencias vivas (purgas interrumpidas)",
+    )
+    parser.add_argument("--dry-run", action="store_true", help="Solo reportar, sin borrar")
+    args = parser.parse_args()
+
+    grace = timedelta(hours=args.grace_hours)
+    for bucket_name in args.bucket or list(buckets):
+        backend = get_photo_backend(bucket_name)
+        _log(f"Bucket {bucket_name} ({backend.name}){' (dry run)' if args.dry_run else ''}")
+        stats = collect_bucket(
+            backend,
+            buckets[bucket_name],
+            grace,
+            args.dry_run,
+            _pending_purge_file_ids(bucket_name, settings.photo_purge_max_attempts),
+            args.collect_live_refs,
+        )
+        seconds = stats["seconds"] or 1e-9
+        _log(
+            f"  revisados: {stats['scanned']}  huérfanos: {stats['orphans']}  "
+            f"recientes (se conservan): {stats['too_recent']}  con purga pendiente: {stats['pending_purge']}  "
+            f"con referencias vivas: {stats['live_refs']}  borrados: {stats['deleted']}  "
+            f"errores: {stats['errors']}"
+        )
+        _log(
+            f"  {seconds:.1f}s  {stats['scanned'] / seconds:.0f} archivos/s  "
+            f"{stats['deleted'] / seconds:.1f} borrados/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
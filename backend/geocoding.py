@@ -1,7 +1,43 @@
-import requests
-from typing import List, Dict, Optional
-from settings import get_settings
+import asyncio
 import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+from starlette.concurrency import run_in_threadpool
+
+from services.geocoding_cache import MISS, geocoding_cache_key, get_geocoding_cache
+from settings import get_settings
+
+
+class AsyncTokenBucket:
+    """
+    Rate limiter compartido por todos los requests del proceso: cada llamada espera
+    (sin bloquear el event loop) hasta que haya un token disponible.
+    """
+
+    def __init__(self, rate_per_second: float, burst: int) -> None:
+        self.rate_per_second = rate_per_second
+        self.capacity = max(1, burst)
+        self._tokens = float(self.capacity)
+        self._updated_at = time.monotonic()
+        self._lock: Optional[asyncio.Lock] = None
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate_per_second)
+        self._updated_at = now
+
+    async def acquire(self) -> None:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        # El lock mantiene el orden de llegada mientras se espera el próximo token
+        async with self._lock:
+            self._refill()
+            if self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate_per_second)
+                self._refill()
+            self._tokens -= 1
+
 
 class LocationIQClient:
     def __init__(self):
@@ -9,72 +45,161 @@ class LocationIQClient:
         self.api_key = settings.locationiq_api_key
         if not self.api_key:
             raise ValueError("LOCATIONIQ_API_KEY no está configurada")
-        self.base_url = "https://us1.locationiq.com/v1"
-        self.last_request_time = 0
-        self.min_request_interval = 0.2  # 200ms entre requests
-    
-    def search_places(self, query: str, country: str = None, limit: int = 3) -> List[Dict]:
-        """Busca lugares usando LocationIQ con rate limiting"""
-        # Rate limiting simple
-        current_time = time.time()
-        time_since_last_request = current_time - self.last_request_time
-        if time_since_last_request < self.min_request_interval:
-            time.sleep(self.min_request_interval - time_since_last_request)
-        
-        self.last_request_time = time.time()
-        
+        self.base_url = settings.locationiq_base_url
+        self.timeout = httpx.Timeout(
+            settings.locationiq_timeout_seconds,
+            connect=min(3.0, settings.locationiq_timeout_seconds),
+        )
+        self.limits = httpx.Limits(
+            max_connections=settings.locationiq_max_connections,
+            max_keepalive_connections=settings.locationiq_max_connections,
+        )
+        # 5 requests/segundo equivale a los 200ms entre requests de antes
+        self.rate_limiter = AsyncTokenBucket(
+            settings.locationiq_requests_per_second,
+            settings.locationiq_burst,
+        )
+        self._http: Optional[httpx.AsyncClient] = None
+        # Búsquedas en vuelo por clave de caché (singleflight)
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._upstream_requests = 0
+        self._coalesced_requests = 0
+        self._cache_hits = 0
+
+    @property
+    def http(self) -> httpx.AsyncClient:
+        """Cliente HTTP con pool de conexiones keep-alive, compartido por todos los requests."""
+        if self._http is None or self._http.is_closed:
+            self._http = httpx.AsyncClient(base_url=self.base_url, timeout=self.timeout, limits=self.limits)
+        return self._http
+
+    async def aclose(self) -> None:
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    def _cache_local(self, cache_key: str) -> Any:
+        """Lookup en la LRU en memoria: no bloquea y evita pasar por el singleflight."""
+        cached = get_geocoding_cache().get_local(cache_key)
+        if cached is not MISS:
+            self._cache_hits += 1
+        return cached
+
+    async def _cache_get(self, cache_key: str) -> Any:
+        # La tabla de caché está en Postgres (sesión sincrónica): se consulta en el threadpool
+        return await run_in_threadpool(get_geocoding_cache().get, cache_key)
+
+    async def _cache_set(self, cache_key: str, query: str, value: Any) -> None:
+        await run_in_threadpool(get_geocoding_cache().set, cache_key, query, value)
+
+    async def _singleflight(self, cache_key: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Requests concurrentes con la misma clave (misma query normalizada) comparten una
+        sola llamada en vuelo y su resultado. La llamada corre en su propia task, así que
+        si el cliente que la inició se desconecta el resto igual recibe la respuesta.
+        """
+        task = self._inflight.get(cache_key)
+        if task is not None:
+            self._coalesced_requests += 1
+            return await asyncio.shield(task)
+
+        task = asyncio.ensure_future(self._cached(cache_key, fetch))
+        self._inflight[cache_key] = task
+        task.add_done_callback(lambda _: self._inflight.pop(cache_key, None))
+        return await asyncio.shield(task)
+
+    async def _cached(self, cache_key: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        cached = await self._cache_get(cache_key)
+        if cached is not MISS:
+            self._cache_hits += 1
+            return cached
+        return await fetch()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "upstream_requests": self._upstream_requests,
+            "coalesced_requests": self._coalesced_requests,
+            "cache_hits": self._cache_hits,
+            "in_flight": len(self._inflight),
+        }
+
+    async def _get_search(self, params: Dict) -> Optional[List[Dict]]:
+        """GET /search con rate limiting. Devuelve None ante errores (no se cachean)."""
+        await self.rate_limiter.acquire()
+        self._upstream_requests += 1
         try:
-            params = {
-                'key': self.api_key,
+            response = await self.http.get("/search", params={'key': self.api_key, **params})
+            if response.status_code == 429:
+                print(f"Rate limit alcanzado para query: {params.get('q')}")
+                return None
+            elif response.status_code == 404:
+                # No results found - no es un error, solo no hay resultados
+                return []
+            response.raise_for_status()
+            return response.json()
+        except httpx.HTTPError as e:
+            print(f"Error en búsqueda LocationIQ: {e}")
+            return None
+
+    async def search_places(self, query: str, country: str = None, limit: int = 3) -> List[Dict]:
+        """Busca lugares usando LocationIQ con rate limiting (las respuestas se cachean)"""
+        cache_key = geocoding_cache_key("search", query, limit=limit, country=country, language="es")
+        cached = self._cache_local(cache_key)
+        if cached is not MISS:
+            return cached or []
+
+        async def fetch() -> Optional[List[Dict]]:
+            results = await self._get_search({
                 'q': query,
                 'format': 'json',
                 'limit': limit,
                 'addressdetails': 1,
                 'dedupe': 1,
                 'accept-language': 'es'
-            }
+            })
+            # Los errores no se cachean; una lista vacía sí (caché negativa)
+            if results is not None:
+                await self._cache_set(cache_key, query, results)
+            return results
 
-            response = requests.get(f"{self.base_url}/search", params=params, timeout=5)
-            
-            if response.status_code == 429:
-                print(f"Rate limit alcanzado para query: {query}. Esperando...")
-                time.sleep(1)  # Esperar 1 segundo antes de reintentar
-                return []
-            elif response.status_code == 404:
-                # No results found - no es un error, solo no hay resultados
-                return []
-            response.raise_for_status()
-            return response.json()
+        return await self._singleflight(cache_key, fetch) or []
 
-        except requests.exceptions.RequestException as e:
-            print(f"Error en búsqueda LocationIQ: {e}")
-            return []
-    
-    def geocode_address(self, address: Dict) -> Optional[Dict]:
-        """Convierte una dirección en coordenadas"""
-        try:
-            address_str = self._build_address_string(address)
-            params = {
-                'key': self.api_key,
+    async def geocode_address(self, address: Dict) -> Optional[Dict]:
+        """
+        Convierte una dirección en coordenadas y la dirección completa de LocationIQ
+        (``display_name``, la que parsea ``parse_full_address``). Las respuestas se cachean.
+        """
+        address_str = self._build_address_string(address)
+        cache_key = geocoding_cache_key("geocode", address_str, limit=1, fields="display_name")
+        cached = self._cache_local(cache_key)
+        if cached is not MISS:
+            return cached
+
+        async def fetch() -> Optional[Dict]:
+            results = await self._get_search({
                 'q': address_str,
                 'format': 'json',
                 'limit': 1
-            }
-            
-            response = requests.get(f"{self.base_url}/search", params=params)
-            response.raise_for_status()
-            results = response.json()
-            
-            if results:
-                return {
-                    'latitude': float(results[0]['lat']),
-                    'longitude': float(results[0]['lon'])
-                }
-            return None
-        except Exception as e:
-            print(f"Error en geocoding: {e}")
-            return None
-    
+            })
+            if results is None:
+                return None
+
+            coordinates = None
+            try:
+                if results:
+                    coordinates = {
+                        'latitude': float(results[0]['lat']),
+                        'longitude': float(results[0]['lon']),
+                        'display_name': results[0].get('display_name'),
+                    }
+            except (KeyError, TypeError, ValueError) as e:
+                print(f"Error en geocoding: {e}")
+                return None
+            await self._cache_set(cache_key, address_str, coordinates)
+            return coordinates
+
+        return await self._singleflight(cache_key, fetch)
+
     def _build_address_string(self, address: Dict) -> str:
         """Construye string de dirección para geocoding"""
         parts = []
@@ -82,13 +207,13 @@ class LocationIQClient:
             parts.append(f"{address['street']} {address['street_number']}")
         elif address.get('street'):
             parts.append(address['street'])
-        
+
         if address.get('city_state'):
             parts.append(address['city_state'])
-        
+
         if address.get('country'):
             parts.append(address['country'])
-        
+
         return ", ".join(parts)
 
 # Instancia global
@@ -96,4 +221,4 @@ try:
     locationiq_client = LocationIQClient()
 except ValueError as e:
     print(f"Advertencia: {e}. El servicio de geocoding no estará disponible.")
-    locationiq_client = None
\ No newline at end of file
+    locationiq_client = None
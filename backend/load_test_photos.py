@@ -0,0 +1,117 @@
+"""
+Prueba de carga para los endpoints de fotos.
+
+Lanza N descargas concurrentes contra una o más URLs de foto y reporta throughput
+y latencias. Para comparar antes/después, levantá la API con cada versión (por
+ejemplo en los puertos 8000 y 8001) y pasá ambas URLs: la primera se toma como base.
+
+    python load_test_photos.py http://localhost:8001/api/places/1/photos/1 \\
+        http://localhost:8000/api/places/1/photos/1 --concurrency 30 --requests 600
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import time
+from dataclasses import dataclass
+
+import httpx
+
+
+@dataclass
+class LoadTestResult:
+    url: str
+    requests: int
+    errors: int
+    total_bytes: int
+    elapsed: float
+    latencies: list[float]
+
+    @property
+    def requests_per_second(self) -> float:
+        return self.requests / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def megabytes_per_second(self) -> float:
+        return self.total_bytes / (1024 * 1024) / self.elapsed if self.elapsed else 0.0
+
+    def percentile(self, fraction: float) -> float:
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        index = min(int(len(ordered) * fraction), len(ordered) - 1)
+        return ordered[index]
+
+
+async def _run_worker(
+    client: httpx.AsyncClient,
+    url: str,
+    queue: asyncio.Queue[int],
+    result: LoadTestResult,
+) -> None:
+    while True:
+        try:
+            queue.get_nowait()
+        except asyncio.QueueEmpty:
+            return
+        started = time.perf_counter()
+        try:
+            # Sin caché del cliente: se pide siempre el cuerpo completo.
+            async with client.stream("GET", url, headers={"Cache-Control": "no-cache"}) as response:
+                async for chunk in response.aiter_bytes():
+                    result.total_bytes += len(chunk)
+                if response.status_code != 200:
+                    result.errors += 1
+        except httpx.HTTPError:
+            result.errors += 1
+        result.latencies.append(time.perf_counter() - started)
+
+
+async def run_load_test(url: str, concurrency: int, total_requests: int, timeout: float) -> LoadTestResult:
+    queue: asyncio.Queue[int] = asyncio.Queue()
+    for index in range(total_requests):
+        queue.put_nowait(index)
+    result = LoadTestResult(url=url, requests=total_requests, errors=0, total_bytes=0, elapsed=0.0, latencies=[])
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(timeout=timeout, limits=limits) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(_run_worker(client, url, queue, result) for _ in range(concurrency)))
+        result.elapsed = time.perf_counter() - started
+    return result
+
+
+def _print_result(result: LoadTestResult, baseline: LoadTestResult | None) -> None:
+    print(f"URL: {result.url}")
+    print(f"  requests: {result.requests}  errores: {result.errors}  tiempo: {result.elapsed:.2f}s")
+    print(f"  throughput: {result.requests_per_second:.1f} req/s  {result.megabytes_per_second:.2f} MB/s")
+    if result.latencies:
+        print(
+            "  latencia: p50 {:.1f} ms  p95 {:.1f} ms  media {:.1f} ms".format(
+                result.percentile(0.5) * 1000,
+                result.percentile(0.95) * 1000,
+                statistics.mean(result.latencies) * 1000,
+            )
+        )
+    if baseline is not None and baseline.requests_per_second:
+        ratio = result.requests_per_second / baseline.requests_per_second
+        print(f"  vs base: x{ratio:.2f} req/s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Prueba de carga de descargas de fotos concurrentes")
+    parser.add_argument("urls", nargs="+", help="URLs de foto a medir (la primera es la base)")
+    parser.add_argument("--concurrency", type=int, default=30)
+    parser.add_argument("--requests", type=int, default=600)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    args = parser.parse_args()
+
+    baseline = None
+    for url in args.urls:
+        result = asyncio.run(run_load_test(url, args.concurrency, args.requests, args.timeout))
+        _print_result(result, baseline)
+        baseline = baseline or result
+
+
+if __name__ == "__main__":
+    main()
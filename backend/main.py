@@ -1,19 +1,20 @@
 from __future__ import annotations
 from datetime import date
-from typing import Dict, List, Optional, Literal
+from typing import Callable, Dict, List, Optional, Literal
 from datetime import date, datetime, time
 from typing import List, Optional
+import json
 import re
-import unicodedata
-import random
+import secrets
+from time import perf_counter
 
 # ... otros imports ...
 from routers import places # Router que ya existe
 
 
-from fastapi import Depends, FastAPI, HTTPException, Query
+from fastapi import Depends, FastAPI, Header, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 from sqlalchemy import select, distinct, func, asc, case
 from sqlalchemy.orm import Session, joinedload
@@ -40,9 +41,34 @@ from models import (
 )
 from routers import auth, places, geocoding, reviews, users
 from auth import get_current_user
-from routers import auth, places, geocoding, reviews, rewards, users
+from routers import auth, places, geocoding, photos, reviews, rewards, users
+from geocoding import locationiq_client
+from services.assistant_response_cache import get_assistant_response_cache
+from services.conversation_store import Conversation, get_conversation_store, new_conversation_id, trim_to_budget
+from services.gazetteer import get_gazetteer
+from services.geocoding_cache import get_geocoding_cache
+from services.locations import places_in_locations, resolve_location_ids
+from services.mongo_storage import get_mongo_storage
+from services.photo_disk_cache import get_photo_cache
+from services.photo_purge import get_photo_purge_worker
+from services.photo_urls import LIST_AVATAR_SIZE, LIST_PHOTO_SIZE, list_photo_urls, sized_photo_url
+from services.phrase_matcher import PhraseMatcher
+from services.recommendation_candidates import lodging_candidates, restaurant_candidates, sample_recommendations
+from services.rewards_index import get_rewards_index_cache
+from services.static_uploads import UploadsStaticFiles
+from services.text_normalization import normalize_text
 from services.user_profile import UserProfile, build_user_profile
-from services.virtual_assistant_ai import FALLBACK_MESSAGE, generate_ai_response, is_ai_enabled
+from services.virtual_assistant_context import get_knowledge_index
+from services.virtual_assistant_ai import (
+    FALLBACK_MESSAGE,
+    AIStreamInterrupted,
+    ai_call_guard,
+    generate_ai_response,
+    is_ai_enabled,
+    stream_ai_response,
+    stream_latency_stats,
+    timed_stream,
+)
 from services.virtual_assistant_rules import (
     detect_category_keyword,
     get_category_label,
@@ -68,14 +94,39 @@ app.include_router(geocoding.router)
 app.include_router(reviews.router)
 app.include_router(users.router)
 app.include_router(rewards.router)
+app.include_router(photos.router)
 
 uploads_root = settings.uploads_root
 uploads_root.mkdir(parents=True, exist_ok=True)
-app.mount("/uploads", StaticFiles(directory=uploads_root), name="uploads")
+# Las fotos del backend filesystem y la caché en disco viven bajo uploads_root pero
+# solo se sirven por los endpoints firmados
+app.mount(
+    "/uploads",
+    UploadsStaticFiles(
+        directory=uploads_root,
+        private_dirs=[settings.photo_storage_dir, settings.photo_cache_dir],
+    ),
+    name="uploads",
+)
 
 @app.on_event("startup")
 def on_startup() -> None:
     Base.metadata.create_all(bind=engine)
+    get_geocoding_cache().purge_expired()
+    get_gazetteer()
+    get_knowledge_index()
+    get_rewards_index_cache().get()
+    get_conversation_store().purge_expired()
+    get_photo_cache().load()
+    get_photo_purge_worker().start()
+
+
+@app.on_event("shutdown")
+async def on_shutdown() -> None:
+    if locationiq_client is not None:
+        await locationiq_client.aclose()
+    get_photo_purge_worker().stop()
+    get_mongo_storage().close()
 
 class Availability(BaseModel):
     start: date
@@ -193,10 +244,13 @@ class ChatbotAIRequest(BaseModel):
     messages: list[ChatbotAIMessage] = Field(min_length=1)
     state: Optional[AssistantState] = None
     user_name: Optional[str] = None
+    # Con conversation_id el servidor guarda historial y estado: alcanza con mandar el mensaje nuevo
+    conversation_id: Optional[str] = Field(default=None, max_length=32)
 
 class ChatbotAIResponse(BaseModel):
     message: str
     state: Optional[AssistantState] = None
+    conversation_id: Optional[str] = None
 
 def _shorten(text: str, n: int = 140) -> str:
     if text is None:
@@ -208,12 +262,35 @@ def _shorten(text: str, n: int = 140) -> str:
 def health():
     return {"ok": True}
 
-@app.post("/api/chatbot/ai/respond", response_model=ChatbotAIResponse)
-def chatbot_ai_respond(
+
+def require_metrics_token(authorization: Optional[str] = Header(default=None)) -> None:
+    # Las métricas exponen estado interno: sin METRICS_TOKEN el endpoint no existe
+    if not settings.metrics_token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    expected = f"Bearer {settings.metrics_token}".encode("utf-8")
+    if authorization is None or not secrets.compare_digest(authorization.encode("utf-8"), expected):
+        raise HTTPException(status_code=401, detail="Token de métricas inválido")
+
+
+@app.get("/api/metrics", dependencies=[Depends(require_metrics_token)])
+def metrics():
+    return {
+        "mongo_pool": get_mongo_storage().pool_metrics(),
+        "photo_purge": get_photo_purge_worker().stats(),
+        "geocoding": locationiq_client.stats() if locationiq_client is not None else None,
+        "assistant_stream": stream_latency_stats.snapshot(),
+        "assistant_ai": ai_call_guard.stats(),
+        "assistant_cache": get_assistant_response_cache().stats(),
+        "rewards_index": get_rewards_index_cache().stats(),
+        "assistant_conversations": get_conversation_store().stats(),
+    }
+
+def _answer_without_ai(
     payload: ChatbotAIRequest,
-    db: Session = Depends(get_session),
-    current_user: Optional[User] = Depends(get_optional_user),
-) -> ChatbotAIResponse:
+    db: Session,
+    current_user: Optional[User],
+) -> Optional[ChatbotAIResponse]:
+    """Respuestas guiadas (recomendaciones, retos, guiones); None si hay que preguntarle a la IA."""
     last_user_message = next((msg.content for msg in reversed(payload.messages) if msg.role == "user"), "").strip()
     if not last_user_message:
         raise HTTPException(status_code=400, detail="El mensaje no puede estar vacío.")
@@ -286,11 +363,171 @@ def chatbot_ai_respond(
             next_state = AssistantState(pending_intent=scripted.next_intent)
         return ChatbotAIResponse(message=scripted.message, state=_normalize_state(next_state))
 
+    return None
+
+
+def _open_conversation(
+    payload: ChatbotAIRequest, current_user: Optional[User]
+) -> tuple[ChatbotAIRequest, Conversation]:
+    """
+    Suma los mensajes nuevos al historial guardado de la conversación (o abre una
+    nueva si no existe, venció o es de otro usuario) y lo recorta al presupuesto de
+    tokens. Si el cliente manda "state" (aunque sea null), pisa al guardado.
+    """
+    user_id = current_user.id if current_user else None
+    conversation = get_conversation_store().get(payload.conversation_id) if payload.conversation_id else None
+    if conversation is None or conversation.user_id not in (None, user_id):
+        conversation = Conversation(id=new_conversation_id(), user_id=user_id)
+    elif conversation.user_id is None:
+        conversation.user_id = user_id
+
+    messages = trim_to_budget(
+        conversation.messages + [msg.model_dump() for msg in payload.messages],
+        settings.assistant_history_token_budget,
+    )
+    state = payload.state
+    if "state" not in payload.model_fields_set and conversation.state:
+        state = AssistantState.model_validate(conversation.state)
+    request = payload.model_copy(
+        update={"messages": [ChatbotAIMessage(**msg) for msg in messages], "state": state}
+    )
+    return request, conversation
+
+
+def _save_conversation_turn(
+    conversation: Conversation,
+    payload: ChatbotAIRequest,
+    message: str,
+    state: Optional[AssistantState],
+) -> None:
+    history = [msg.model_dump() for msg in payload.messages] + [{"role": "assistant", "content": message}]
+    conversation.messages = trim_to_budget(history, settings.assistant_history_token_budget)
+    conversation.state = state.model_dump(mode="json") if state else None
+    get_conversation_store().save(conversation)
+
+
+@app.post("/api/chatbot/ai/respond", response_model=ChatbotAIResponse)
+def chatbot_ai_respond(
+    payload: ChatbotAIRequest,
+    db: Session = Depends(get_session),
+    current_user: Optional[User] = Depends(get_optional_user),
+) -> ChatbotAIResponse:
+    payload, conversation = _open_conversation(payload, current_user)
+    response = _answer_without_ai(payload, db, current_user)
+    if response is None:
+        response = ChatbotAIResponse(message=_ai_answer(payload))
+    _save_conversation_turn(conversation, payload, response.message, response.state)
+    response.conversation_id = conversation.id
+    return response
+
+
+def _ai_answer(payload: ChatbotAIRequest) -> str:
     if not is_ai_enabled():
-        return ChatbotAIResponse(message=FALLBACK_MESSAGE)
+        return FALLBACK_MESSAGE
+
+    messages = [msg.model_dump() for msg in payload.messages]
+    cache = get_assistant_response_cache()
+    cache_key = cache.key_for(messages)
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    message = generate_ai_response(messages)
+    if message != FALLBACK_MESSAGE:
+        cache.set(cache_key, message)
+    return message
+
+
+def _sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def _sse_chatbot_events(
+    chunks,
+    state: Optional[AssistantState],
+    source: str,
+    started: float,
+    conversation_id: str,
+    on_done: Callable[[str], None],
+):
+    parts: list[str] = []
+    first_token_at: Optional[float] = None
+    try:
+        for chunk, elapsed in timed_stream(chunks, source, started):
+            if first_token_at is None:
+                first_token_at = elapsed
+            parts.append(chunk)
+            yield _sse_event("delta", {"text": chunk})
+    except AIStreamInterrupted:
+        # Respuesta a medias: no se guarda en la conversación ni se manda "done"
+        yield _sse_event(
+            "error",
+            {
+                "message": "La respuesta se interrumpió. Probá de nuevo en unos segundos.",
+                "conversation_id": conversation_id,
+                "source": source,
+            },
+        )
+        return
+    message = "".join(parts).strip()
+    on_done(message)
+    yield _sse_event(
+        "done",
+        {
+            "message": message,
+            "state": state.model_dump(mode="json") if state else None,
+            "conversation_id": conversation_id,
+            "source": source,
+            "ttft_ms": round((first_token_at or 0.0) * 1000, 1),
+            "total_ms": round((perf_counter() - started) * 1000, 1),
+        },
+    )
+
+
+@app.post("/api/chatbot/ai/respond/stream")
+def chatbot_ai_respond_stream(
+    payload: ChatbotAIRequest,
+    db: Session = Depends(get_session),
+    current_user: Optional[User] = Depends(get_optional_user),
+) -> StreamingResponse:
+    """
+    Igual que /api/chatbot/ai/respond pero como Server-Sent Events: eventos "delta"
+    con cada fragmento de texto y un "done" final con el mensaje completo, el estado,
+    el conversation_id y el tiempo hasta el primer token. Si la IA falla a mitad de
+    la respuesta se manda un "error" en lugar del "done" y el turno no se guarda.
+    Las respuestas guiadas salen en un solo delta.
+    """
+    started = perf_counter()
+    payload, conversation = _open_conversation(payload, current_user)
+    local_answer = _answer_without_ai(payload, db, current_user)
+    if local_answer is not None:
+        chunks, state, source = [local_answer.message], local_answer.state, "scripted"
+    elif not is_ai_enabled():
+        chunks, state, source = [FALLBACK_MESSAGE], None, "fallback"
+    else:
+        messages = [msg.model_dump() for msg in payload.messages]
+        cache = get_assistant_response_cache()
+        cache_key = cache.key_for(messages)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            chunks, state, source = [cached], None, "cache"
+        else:
+            chunks = stream_ai_response(messages, on_complete=lambda answer: cache.set(cache_key, answer))
+            state, source = None, "ai"
 
-    message = generate_ai_response([msg.model_dump() for msg in payload.messages])
-    return ChatbotAIResponse(message=message)
+    return StreamingResponse(
+        _sse_chatbot_events(
+            chunks,
+            state,
+            source,
+            started,
+            conversation.id,
+            on_done=lambda message: _save_conversation_turn(conversation, payload, message, state),
+        ),
+        media_type="text/event-stream",
+        # Sin buffering en proxies (nginx) para que cada delta llegue apenas se genera
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 def _normalize_state(state: Optional[AssistantState]) -> Optional[AssistantState]:
@@ -660,55 +897,25 @@ def _build_lodging_recommendations(
     *,
     current_user: Optional[User],
 ) -> tuple[str, list[RecommendedPlace]]:
-    stmt = (
-        select(Place)
-        .where(func.lower(Place.category) == (prefs.category or ""))
-        .options(joinedload(Place.unavailabilities))
+    candidates = lodging_candidates(
+        db,
+        category=prefs.category or "",
+        location=prefs.location,
+        min_price=prefs.min_price,
+        max_price=prefs.max_price,
+        guests=prefs.guests,
+        check_in=_parse_date(prefs.check_in),
+        check_out=_parse_date(prefs.check_out),
+        user_id=current_user.id if current_user else None,
     )
-    if prefs.location:
-        pattern = f"%{prefs.location.strip()}%"
-        stmt = stmt.where(
-            (Place.city_state.ilike(pattern))
-            | (Place.name.ilike(pattern))
-            | (Place.country.ilike(pattern))
-        )
-    if prefs.min_price is not None:
-        stmt = stmt.where(Place.price_per_night >= prefs.min_price)
-    if prefs.max_price is not None:
-        stmt = stmt.where(Place.price_per_night <= prefs.max_price)
-    if prefs.guests:
-        stmt = stmt.where(Place.capacity.is_(None) | (Place.capacity >= prefs.guests))
-
-    stmt = stmt.order_by(Place.rating_avg.desc(), Place.name.asc()).limit(15)
-    places = db.scalars(stmt).unique().all()
 
-    reviewed_ids: set[int] = set()
-    if current_user:
-        reviewed_ids = {
-            row[0]
-            for row in db.execute(
-                select(ReviewModel.place_id).where(ReviewModel.user_id == current_user.id)
-            ).all()
-        }
-
-    check_in = _parse_date(prefs.check_in)
-    check_out = _parse_date(prefs.check_out)
-
-    filtered: list[Place] = []
-    for place in places:
-        if check_in and check_out and not _is_place_available_for_dates(place, check_in, check_out):
-            continue
-        filtered.append(place)
-
-    if not filtered:
+    if not candidates:
         return (
             "Ningún establecimiento coincide con todos los criterios (zona, precios, fechas y capacidad). "
             "Podés ajustar los montos o las fechas y volver a intentarlo."
         ), []
 
-    preferred = [p for p in filtered if p.id not in reviewed_ids]
-    pool = preferred if len(preferred) >= 3 else preferred + [p for p in filtered if p.id in reviewed_ids]
-    sampled = random.sample(pool, k=min(3, len(pool)))
+    sampled = sample_recommendations(candidates, k=3)
 
     lines = []
     recommended: list[RecommendedPlace] = []
@@ -736,50 +943,23 @@ def _build_restaurant_recommendations(
     *,
     current_user: Optional[User],
 ) -> tuple[str, list[RecommendedPlace]]:
-    stmt = (
-        select(Place)
-        .where(func.lower(Place.category) == "restaurante")
-        .options(joinedload(Place.unavailabilities), joinedload(Place.schedules))
-    )
-    if prefs.location:
-        pattern = f"%{prefs.location.strip()}%"
-        stmt = stmt.where(
-            (Place.city_state.ilike(pattern))
-            | (Place.name.ilike(pattern))
-            | (Place.country.ilike(pattern))
-        )
-
-    stmt = stmt.order_by(Place.rating_avg.desc(), Place.name.asc()).limit(20)
-    places = db.scalars(stmt).unique().all()
-
-    reviewed_ids: set[int] = set()
-    if current_user:
-        reviewed_ids = {
-            row[0]
-            for row in db.execute(
-                select(ReviewModel.place_id).where(ReviewModel.user_id == current_user.id)
-            ).all()
-        }
-
     visit_date = _parse_date(prefs.visit_date)
     visit_time = _parse_time(prefs.visit_time) if prefs.visit_time else None
+    candidates = restaurant_candidates(
+        db,
+        location=prefs.location,
+        visit_date=visit_date,
+        visit_time=visit_time,
+        user_id=current_user.id if current_user else None,
+    )
 
-    filtered: list[Place] = []
-    for place in places:
-        if visit_date and visit_time:
-            if not _is_restaurant_available(place, visit_date, visit_time):
-                continue
-        filtered.append(place)
-
-    if not filtered:
+    if not candidates:
         return (
             "No encontré restaurantes disponibles con esa zona, fecha y horario. "
             "Podés ajustar alguno de los datos y volver a preguntar."
         ), []
 
-    preferred = [p for p in filtered if p.id not in reviewed_ids]
-    pool = preferred if len(preferred) >= 3 else preferred + [p for p in filtered if p.id in reviewed_ids]
-    sampled = random.sample(pool, k=min(3, len(pool)))
+    sampled = sample_recommendations(candidates, k=3)
 
     intro = f"{user_name or 'Te'} sugiero estos restaurantes para vos:\n\n"
 
@@ -800,44 +980,6 @@ def _build_restaurant_recommendations(
     return intro + " ".join(lines), recommended
 
 
-def _is_place_available_for_dates(place: Place, check_in: date, check_out: date) -> bool:
-    for unavailability in place.unavailabilities or []:
-        start = unavailability.start_date
-        end = unavailability.end_date
-        if start and end and not (check_out <= start or check_in >= end):
-            return False
-    return True
-
-
-def _is_restaurant_available(place: Place, visit_date: date, visit_time: time) -> bool:
-    for unavailability in place.unavailabilities or []:
-        start = unavailability.start_date
-        end = unavailability.end_date
-        if start and end and start <= visit_date <= end:
-            return False
-
-    weekday = visit_date.weekday()
-    schedules = place.schedules or []
-    schedule = next(
-        (
-            sch
-            for sch in schedules
-            if _normalize_schedule_day(sch.day_of_week) == weekday
-        ),
-        None,
-    )
-    if not schedule:
-        return True
-    if schedule.is_closed:
-        return False
-
-    opening = _parse_time(schedule.opening_time) if schedule.opening_time else time(0, 0)
-    closing = _parse_time(schedule.closing_time) if schedule.closing_time else time(23, 59)
-    if closing <= opening:
-        closing = time(23, 59)
-    return opening <= visit_time <= closing
-
-
 def _format_price(value: Optional[float]) -> str:
     if value is None:
         return "Precio a consultar"
@@ -856,16 +998,6 @@ def _format_rating(value: Optional[float], fallback: str = "N/D") -> str:
         return fallback
 
 
-def _normalize_schedule_day(value: Optional[int]) -> Optional[int]:
-    if value is None:
-        return None
-    if 0 <= value <= 6:
-        return value
-    if 1 <= value <= 7:
-        return (value - 1) % 7
-    return value % 7
-
-
 def _prefill_from_text(prefs: TravelPreferences, text: str) -> TravelPreferences:
     # Helper to keep compatibility; currently returns prefs unchanged.
     return prefs
@@ -879,34 +1011,18 @@ CATEGORY_TERMS = {
 
 
 def detect_rewards_scope(text: str, state: Optional[AssistantState] = None) -> tuple[Optional[str], Optional[str]]:
-    normalized = _normalize_text(text)
-    has_keywords = any(keyword in normalized for keyword in ("reto", "retos", "logro", "logros", "recompensa", "recompensas"))
-    if not has_keywords:
-        if state and state.rewards_context and ("en general" in normalized or "todos los lugares" in normalized):
+    found = _REWARDS_SCOPE_MATCHER.find_all(normalize_text(text))
+    kinds = {kind for kind, _ in found}
+    if "rewards" not in kinds:
+        if state and state.rewards_context and "general" in kinds:
             return "category", None
         return None, None
 
-    place_tokens = (
-        "esos lugares",
-        "estos lugares",
-        "esos hoteles",
-        "estos hoteles",
-        "esos restaurantes",
-        "estos restaurantes",
-        "esos alojamientos",
-        "estos alojamientos",
-    )
-    if any(token in normalized for token in place_tokens):
+    if "places" in kinds:
         return "places", None
 
-    category = _detect_category_from_text(normalized)
-    if (
-        "todos los lugares" in normalized
-        or "en general" in normalized
-        or "todos" in normalized
-        or "categoria" in normalized
-        or category
-    ):
+    category = next((category for kind, category in found if kind == "category" and category), None)
+    if category or kinds & {"general", "category"}:
         return "category", category
 
     return None, None
@@ -915,13 +1031,12 @@ def detect_rewards_scope(text: str, state: Optional[AssistantState] = None) -> t
 def describe_rewards_for_places(places: list[RecommendedPlace], db: Session, current_user: Optional[User] = None) -> str:
     if not places:
         return "Todavía no te recomendé lugares, pedime una búsqueda primero."
-    challenges = db.scalars(select(Challenge)).all()
+    index = get_rewards_index_cache().get()
     completed_challenge_ids = _completed_challenge_ids(db, current_user) if current_user else set()
 
     found_sections: list[str] = []
     for place in places:
-        terms = [_normalize_text(place.name)]
-        place_challenges = _filter_entries_by_terms(challenges, terms)
+        place_challenges = index.challenges_matching((place.name,))
         place_challenges = [c for c in place_challenges if c.id not in completed_challenge_ids][:3]
         if not place_challenges:
             continue
@@ -938,11 +1053,8 @@ def describe_rewards_for_places(places: list[RecommendedPlace], db: Session, cur
 
 
 def describe_rewards_for_category(category: str, db: Session, current_user: Optional[User] = None) -> str:
-    rewards = db.scalars(select(Reward).options(joinedload(Reward.challenge))).all()
     completed_challenge_ids = _completed_challenge_ids(db, current_user) if current_user else set()
-    terms = _category_terms(category)
-
-    matched_rewards = _filter_entries_by_terms(rewards, terms)
+    matched_rewards = get_rewards_index_cache().get().rewards_matching(_category_terms(category))
     matched_rewards = [
         r for r in matched_rewards if not r.challenge_id or r.challenge_id not in completed_challenge_ids
     ][:3]
@@ -953,29 +1065,16 @@ def describe_rewards_for_category(category: str, db: Session, current_user: Opti
 
     parts: list[str] = []
     for idx, reward in enumerate(matched_rewards, start=1):
-        challenge = reward.challenge
-        requirement = (challenge.description or "Sin descripción de requisito").strip() if challenge else "Sin reto asociado"
+        if reward.challenge_id is not None:
+            requirement = (reward.challenge_description or "Sin descripción de requisito").strip()
+        else:
+            requirement = "Sin reto asociado"
         prize = (reward.description or "Sin descripción de recompensa").strip()
         parts.append(f"{idx}) {reward.title} - requiere: {requirement} - consigues: {prize}")
 
     return f"Para la categoría {label} encontré los siguientes retos: " + "; ".join(parts) + "."
 
 
-def _filter_entries_by_terms(entries: list, terms: tuple[str, ...]) -> list:
-    normalized_terms = tuple(term for term in (term.lower() for term in terms) if term)
-    results = []
-    for entry in entries:
-        text_parts = [getattr(entry, "title", ""), getattr(entry, "description", "")]
-        challenge = getattr(entry, "challenge", None)
-        if challenge:
-            text_parts.extend([getattr(challenge, "title", ""), getattr(challenge, "description", "")])
-        text = " ".join(filter(None, text_parts))
-        normalized = _normalize_text(text)
-        if any(term in normalized for term in normalized_terms):
-            results.append(entry)
-    return results
-
-
 def _format_rewards_section(
     title: str,
     challenges: list[Challenge],
@@ -1017,21 +1116,27 @@ def _category_terms(category: Optional[str]) -> tuple[str, ...]:
     return CATEGORY_TERMS.get(key, (key,))
 
 
-def _normalize_text(text: str) -> str:
-    normalized = unicodedata.normalize("NFD", (text or "").lower())
-    return "".join(ch for ch in normalized if unicodedata.category(ch) != "Mn")
-
-
-def _detect_category_from_text(normalized_text: str) -> Optional[str]:
-    for category, terms in CATEGORY_TERMS.items():
-        if any(term in normalized_text for term in terms):
-            return category
-    return None
-
+# Frases que deciden el alcance de una pregunta sobre retos, en un solo autómata.
+# Las categorías siguen el orden de CATEGORY_TERMS, que define cuál gana si aparecen varias.
+_REWARDS_SCOPE_MATCHER: PhraseMatcher[tuple[str, Optional[str]]] = PhraseMatcher(
+    [(keyword, ("rewards", None)) for keyword in ("reto", "logro", "recompensa")]
+    + [
+        (f"{determiner} {noun}", ("places", None))
+        for noun in ("lugares", "hoteles", "restaurantes", "alojamientos")
+        for determiner in ("esos", "estos")
+    ]
+    + [
+        (normalize_text(term), ("category", category))
+        for category, terms in CATEGORY_TERMS.items()
+        for term in terms
+    ]
+    + [(phrase, ("general", None)) for phrase in ("todos los lugares", "en general")]
+    + [(phrase, ("category", None)) for phrase in ("todos", "categoria")]
+)
 
-def _is_new_recommendation_request(text: str) -> bool:
-    normalized = _normalize_text(text)
-    triggers = (
+_NEW_RECOMMENDATION_MATCHER: PhraseMatcher[bool] = PhraseMatcher(
+    (trigger, True)
+    for trigger in (
         "que otros lugares",
         "que otro lugar",
         "otros lugares",
@@ -1040,7 +1145,11 @@ def _is_new_recommendation_request(text: str) -> bool:
         "otros destinos",
         "algo diferente",
     )
-    return any(trigger in normalized for trigger in triggers)
+)
+
+
+def _is_new_recommendation_request(text: str) -> bool:
+    return _NEW_RECOMMENDATION_MATCHER.matches(normalize_text(text))
 
 @app.get("/api/featured", response_model=List[PlaceSummary])
 def get_featured_places(db: Session = Depends(get_session)):
@@ -1058,7 +1167,7 @@ def get_featured_places(db: Session = Depends(get_session)):
     for place in places:
         from services.place_service import get_place_badges
 
-        photos = [photo.url for photo in place.photos]
+        photos = list_photo_urls([photo.url for photo in place.photos[:3]])
         badges = get_place_badges(db, place.id)
 
         results.append(
@@ -1091,6 +1200,8 @@ def search(
     check_in: Optional[date] = Query(default=None),
     check_out: Optional[date] = Query(default=None),
     guests: Optional[int] = Query(default=None, ge=1),
+    location: Optional[str] = Query(default=None, description="País, región, ciudad o barrio (acepta alias como CABA)"),
+    location_id: Optional[int] = Query(default=None),
     db: Session = Depends(get_session),
 ):
     stmt = (
@@ -1110,6 +1221,13 @@ def search(
             Place.city_state_filter.ilike(pattern) |
             Place.country_filter.ilike(pattern)
         )
+    if location_id is not None:
+        stmt = stmt.where(Place.id.in_(places_in_locations([location_id])))
+    if location:
+        location_ids = resolve_location_ids(db, location)
+        if not location_ids:
+            return []
+        stmt = stmt.where(Place.id.in_(places_in_locations(location_ids)))
     if category:
         stmt = stmt.where(func.lower(Place.category) == category.lower())
     if min_price is not None:
@@ -1155,7 +1273,7 @@ def search(
     for place in places:
         from services.place_service import get_place_badges
 
-        photos = [photo.url for photo in place.photos]
+        photos = list_photo_urls([photo.url for photo in place.photos[:3]])
         badges = get_place_badges(db, place.id)
 
         # SIMPLEMENTE DEJAR availability COMO LISTA VACÍA
@@ -1367,10 +1485,12 @@ def get_reviews(
                 "rating": review.rating,
                 "title": review.title,
                 "comment": review.comment,
-                "photos": [photo.url for photo in review.photos],
+                "photos": list_photo_urls([photo.url for photo in review.photos]),
                 "author_name": review.author_name,
                 "author_photo_url": (
-                    review.user.photo_url if review.user else DEFAULT_AVATAR_URL
+                    sized_photo_url(review.user.photo_url, LIST_AVATAR_SIZE)
+                    if review.user
+                    else DEFAULT_AVATAR_URL
                 ),
                 "author_id": review.user_id,
                 "place_name": review.place.name if review.place else None,
@@ -1378,7 +1498,7 @@ def get_reviews(
                     float(place.rating_avg) if place and place.rating_avg is not None else None
                 ),
                 "place_photo_url": (
-                    review.place.photos[0].url
+                    sized_photo_url(review.place.photos[0].url, LIST_PHOTO_SIZE)
                     if review.place and review.place.photos
                     else None
                 ),
@@ -0,0 +1,94 @@
+"""
+Copia las fotos de un backend de almacenamiento a otro (GridFS <-> sistema de archivos).
+
+Los ids se conservan, así que las filas en Postgres no cambian: después de migrar
+alcanza con cambiar PHOTO_STORAGE_BACKEND y reiniciar la API. Cada foto se verifica
+comparando el SHA-256 del original en origen y destino; si no coincide se borra la
+copia y se reporta. El origen no se modifica. Es idempotente: las fotos que ya
+están en el destino con el mismo checksum se saltean.
+
+    python migrate_photo_storage.py --source gridfs --target filesystem
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+
+from services.photo_backends import PHOTO_STORAGE_BACKENDS, PhotoBackend, create_photo_backend
+from settings import get_settings
+
+
+def _log(message: str) -> None:
+    sys.stdout.write(f"{message}\n")
+
+
+def migrate_bucket(source: PhotoBackend, target: PhotoBackend, dry_run: bool = False) -> dict[str, int]:
+    stats = {"copied": 0, "skipped": 0, "failed": 0}
+    for file_id in source.iter_file_ids():
+        source_checksum = source.checksum(file_id)
+        if source_checksum is None:
+            continue
+        if target.checksum(file_id) == source_checksum:
+            stats["skipped"] += 1
+            continue
+        if dry_run:
+            stats["copied"] += 1
+            continue
+
+        photo = source.export_photo(file_id)
+        if photo is None:
+            continue
+        try:
+            # Files stored before deduplication have no hash in their metadata.
+            photo.sha256 = photo.sha256 or source_checksum
+            target.remove(file_id)
+            target.import_photo(photo)
+        except Exception as exc:
+            target.remove(file_id)
+            stats["failed"] += 1
+            _log(f"  [ERROR] {file_id}: {exc}")
+            continue
+        finally:
+            photo.content.close()
+
+        if target.checksum(file_id) != source_checksum:
+            target.remove(file_id)
+            stats["failed"] += 1
+            _log(f"  [ERROR] {file_id}: checksum distinto en el destino")
+            continue
+        stats["copied"] += 1
+    return stats
+
+
+def main() -> None:
+    settings = get_settings()
+    buckets = [
+        settings.mongodb_avatars_bucket,
+        settings.mongodb_place_photos_bucket,
+        settings.mongodb_review_photos_bucket,
+    ]
+    parser = argparse.ArgumentParser(description="Migrar fotos entre backends de almacenamiento")
+    parser.add_argument("--source", choices=PHOTO_STORAGE_BACKENDS, required=True)
+    parser.add_argument("--target", choices=PHOTO_STORAGE_BACKENDS, required=True)
+    parser.add_argument("--bucket", choices=buckets, action="append", help="Bucket a migrar (por defecto, todos)")
+    parser.add_argument("--dry-run", action="store_true", help="Solo contar lo que se copiaría")
+    args = parser.parse_args()
+
+    if args.source == args.target:
+        parser.error("--source y --target deben ser distintos")
+
+    failed = 0
+    for bucket_name in args.bucket or buckets:
+        _log(f"Migrando {bucket_name}: {args.source} -> {args.target}{' (dry run)' if args.dry_run else ''}")
+        stats = migrate_bucket(
+            create_photo_backend(args.source, bucket_name),
+            create_photo_backend(args.target, bucket_name),
+            dry_run=args.dry_run,
+        )
+        failed += stats["failed"]
+        _log(f"  copiadas: {stats['copied']}  ya presentes: {stats['skipped']}  con error: {stats['failed']}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
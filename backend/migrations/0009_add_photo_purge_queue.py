@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+import sys
+
+from sqlalchemy import text
+
+from database import engine
+
+
+def _log(message: str) -> None:
+    sys.stdout.write(f"{message}\n")
+
+
+def upgrade() -> None:
+    _log("Starting migration 0009_add_photo_purge_queue...")
+
+    with engine.begin() as connection:
+        _log("Creating table photo_purge_queue (if missing)...")
+        connection.execute(text("""
+            CREATE TABLE IF NOT EXISTS photo_purge_queue (
+                id SERIAL PRIMARY KEY,
+                bucket VARCHAR(120) NOT NULL,
+                file_id VARCHAR(96) NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                last_error TEXT,
+                available_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+                created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now()
+            )
+        """))
+
+        _log("Creating index on photo_purge_queue.available_at (if missing)...")
+        connection.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_photo_purge_queue_available_at ON photo_purge_queue (available_at)"
+        ))
+
+    _log("Migration completed successfully.")
+
+
+if __name__ == "__main__":
+    try:
+        upgrade()
+    except Exception as exc:
+        sys.stderr.write(f"Migration failed: {exc}\n")
+        sys.exit(1)
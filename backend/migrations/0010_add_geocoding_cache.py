@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+import sys
+
+from sqlalchemy import text
+
+from database import engine
+
+
+def _log(message: str) -> None:
+    sys.stdout.write(f"{message}\n")
+
+
+def upgrade() -> None:
+    _log("Starting migration 0010_add_geocoding_cache...")
+
+    with engine.begin() as connection:
+        _log("Creating table geocoding_cache (if missing)...")
+        connection.execute(text("""
+            CREATE TABLE IF NOT EXISTS geocoding_cache (
+                cache_key VARCHAR(64) PRIMARY KEY,
+                query TEXT NOT NULL,
+                response JSON,
+                is_negative BOOLEAN NOT NULL DEFAULT FALSE,
+                created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+                expires_at TIMESTAMP WITH TIME ZONE NOT NULL
+            )
+        """))
+
+        _log("Creating index on geocoding_cache.expires_at (if missing)...")
+        connection.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_geocoding_cache_expires_at ON geocoding_cache (expires_at)"
+        ))
+
+    _log("Migration completed successfully.")
+
+
+if __name__ == "__main__":
+    try:
+        upgrade()
+    except Exception as exc:
+        sys.stderr.write(f"Migration failed: {exc}\n")
+        sys.exit(1)
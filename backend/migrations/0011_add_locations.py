@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import sys
+
+from sqlalchemy import text
+
+from database import engine
+
+
+def _log(message: str) -> None:
+    sys.stdout.write(f"{message}\n")
+
+
+def upgrade() -> None:
+    _log("Starting migration 0011_add_locations...")
+
+    with engine.begin() as connection:
+        _log("Creating table locations (if missing)...")
+        connection.execute(text("""
+            CREATE TABLE IF NOT EXISTS locations (
+                id SERIAL PRIMARY KEY,
+                parent_id INTEGER REFERENCES locations(id) ON DELETE CASCADE,
+                level VARCHAR(20) NOT NULL,
+                name VARCHAR(255) NOT NULL,
+                normalized_name VARCHAR(255) NOT NULL,
+                country_code VARCHAR(2)
+            )
+        """))
+
+        _log("Creating indexes on locations (if missing)...")
+        connection.execute(text(
+            "CREATE UNIQUE INDEX IF NOT EXISTS uq_locations_parent_level_name "
+            "ON locations (coalesce(parent_id, 0), level, normalized_name)"
+        ))
+        connection.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_locations_parent_id ON locations (parent_id)"
+        ))
+        connection.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_locations_normalized_name ON locations (normalized_name)"
+        ))
+
+        _log("Creating table location_aliases (if missing)...")
+        connection.execute(text("""
+            CREATE TABLE IF NOT EXISTS location_aliases (
+                normalized_alias VARCHAR(255) NOT NULL,
+                location_id INTEGER NOT NULL REFERENCES locations(id) ON DELETE CASCADE,
+                PRIMARY KEY (normalized_alias, location_id)
+            )
+        """))
+
+        _log("Creating table place_locations (if missing)...")
+        connection.execute(text("""
+            CREATE TABLE IF NOT EXISTS place_locations (
+                place_id INTEGER NOT NULL REFERENCES places(id) ON DELETE CASCADE,
+                location_id INTEGER NOT NULL REFERENCES locations(id) ON DELETE CASCADE,
+                PRIMARY KEY (place_id, location_id)
+            )
+        """))
+        connection.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_place_locations_location_id ON place_locations (location_id)"
+        ))
+
+    _log("Migration completed successfully. Run backfill_place_locations.py to map existing places.")
+
+
+if __name__ == "__main__":
+    try:
+        upgrade()
+    except Exception as exc:
+        sys.stderr.write(f"Migration failed: {exc}\n")
+        sys.exit(1)
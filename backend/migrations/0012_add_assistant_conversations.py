@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+import sys
+
+from sqlalchemy import text
+
+from database import engine
+
+
+def _log(message: str) -> None:
+    sys.stdout.write(f"{message}\n")
+
+
+def upgrade() -> None:
+    _log("Starting migration 0012_add_assistant_conversations...")
+
+    with engine.begin() as connection:
+        _log("Creating table assistant_conversations (if missing)...")
+        connection.execute(text("""
+            CREATE TABLE IF NOT EXISTS assistant_conversations (
+                id VARCHAR(32) PRIMARY KEY,
+                user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
+                messages JSON NOT NULL,
+                state JSON,
+                updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+                expires_at TIMESTAMP WITH TIME ZONE NOT NULL
+            )
+        """))
+
+        _log("Creating index on assistant_conversations.expires_at (if missing)...")
+        connection.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_assistant_conversations_expires_at "
+            "ON assistant_conversations (expires_at)"
+        ))
+
+    _log("Migration completed successfully.")
+
+
+if __name__ == "__main__":
+    try:
+        upgrade()
+    except Exception as exc:
+        sys.stderr.write(f"Migration failed: {exc}\n")
+        sys.exit(1)
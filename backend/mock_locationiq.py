@@ -0,0 +1,93 @@
+"""
+Servidor LocationIQ falso para probar el geocoding (backfill, autocomplete, load tests)
+sin red ni cuota. Responde GET /v1/search con resultados deterministas armados a
+partir de la query, con latencia configurable, y devuelve 429 si se supera el rate
+limit (como el servicio real). GET /stats muestra cuántos requests recibió.
+
+    python mock_locationiq.py --port 8900 --latency-ms 80 --rate-limit 5
+    LOCATIONIQ_BASE_URL=http://127.0.0.1:8900/v1 LOCATIONIQ_API_KEY=test python backfill_place_geocoding.py
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import time
+from collections import deque
+
+import uvicorn
+from fastapi import FastAPI, Query
+from fastapi.responses import JSONResponse
+
+_NOT_FOUND_MARKER = "noexiste"
+
+
+def build_app(latency_ms: float, rate_limit: float) -> FastAPI:
+    app = FastAPI(title="LocationIQ mock")
+    stats = {"requests": 0, "rate_limited": 0, "not_found": 0}
+    recent: deque[float] = deque()
+
+    def _over_rate_limit() -> bool:
+        if rate_limit <= 0:
+            return False
+        now = time.monotonic()
+        while recent and now - recent[0] >= 1.0:
+            recent.popleft()
+        if len(recent) >= rate_limit:
+            return True
+        recent.append(now)
+        return False
+
+    @app.get("/v1/search")
+    async def search(
+        q: str = Query(...),
+        key: str = Query(...),
+        limit: int = Query(1),
+    ):
+        stats["requests"] += 1
+        if _over_rate_limit():
+            stats["rate_limited"] += 1
+            return JSONResponse({"error": "Rate Limited Second"}, status_code=429)
+        if latency_ms:
+            await asyncio.sleep(latency_ms / 1000)
+        if _NOT_FOUND_MARKER in q.lower():
+            stats["not_found"] += 1
+            return JSONResponse({"error": "Unable to geocode"}, status_code=404)
+
+        # "Calle 123, Ciudad, País" -> "123, Calle, Barrio, Ciudad, C1000AAA, País"
+        parts = [part.strip() for part in q.split(",") if part.strip()]
+        country = parts[-1] if parts else "Argentina"
+        city = parts[-2] if len(parts) >= 2 else country
+        street = parts[0] if len(parts) >= 3 else "Calle Principal"
+        digest = hashlib.sha256(q.lower().encode("utf-8")).digest()
+        lat = -55 + digest[0] / 255 * 90
+        lon = -73 + digest[1] / 255 * 20
+        return [
+            {
+                "place_id": str(int.from_bytes(digest[:6], "big")),
+                "lat": f"{lat:.7f}",
+                "lon": f"{lon:.7f}",
+                "display_name": f"{street}, Centro, {city}, C1000AAA, {country}",
+                "address": {"country": country, "country_code": "ar", "city": city},
+            }
+        ][:limit]
+
+    @app.get("/stats")
+    def get_stats():
+        return stats
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Mock local de la API de LocationIQ")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Demora artificial por request")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="Requests/segundo antes de responder 429 (0 = sin límite)")
+    args = parser.parse_args()
+    uvicorn.run(build_app(args.latency_ms, args.rate_limit), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
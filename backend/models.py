@@ -4,7 +4,7 @@ from datetime import date, datetime, time
 from enum import Enum
 from typing import List
 
-from sqlalchemy import Boolean, Date, DateTime, Float, ForeignKey, Integer, String, Text, Time, UniqueConstraint, func
+from sqlalchemy import JSON, Boolean, Date, DateTime, Float, ForeignKey, Index, Integer, String, Text, Time, UniqueConstraint, func, text
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
 from constants import DEFAULT_AVATAR_URL
@@ -457,3 +457,110 @@ class UserReward(Base):
     user: Mapped["User"] = relationship(back_populates="user_rewards")
     reward: Mapped["Reward"] = relationship(back_populates="user_rewards")
     place: Mapped["Place | None"] = relationship(back_populates="user_rewards")
+
+
+# -------------------------------------------------------------
+# 4. COLA DE BORRADO DE FOTOS (blobs a purgar en segundo plano)
+# -------------------------------------------------------------
+class PhotoPurgeJob(Base):
+    __tablename__ = "photo_purge_queue"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    bucket: Mapped[str] = mapped_column(String(120), nullable=False)
+    file_id: Mapped[str] = mapped_column(String(96), nullable=False)
+    attempts: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    last_error: Mapped[str | None] = mapped_column(Text)
+    available_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False, index=True
+    )
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+
+
+# -------------------------------------------------------------
+# 5. CACHÉ DE GEOCODING (respuestas de LocationIQ con vencimiento)
+# -------------------------------------------------------------
+class GeocodingCacheEntry(Base):
+    __tablename__ = "geocoding_cache"
+
+    # SHA-256 de la consulta normalizada y sus parámetros
+    cache_key: Mapped[str] = mapped_column(String(64), primary_key=True)
+    query: Mapped[str] = mapped_column(Text, nullable=False)
+    response: Mapped[object | None] = mapped_column(JSON)
+    # True cuando LocationIQ no devolvió resultados (caché negativa)
+    is_negative: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, index=True)
+
+
+# -------------------------------------------------------------
+# 6. UBICACIONES NORMALIZADAS (país → región → ciudad → barrio)
+# -------------------------------------------------------------
+class Location(Base):
+    __tablename__ = "locations"
+    __table_args__ = (
+        # Un mismo nombre no se repite bajo el mismo padre (los países tienen padre NULL)
+        Index(
+            "uq_locations_parent_level_name",
+            text("coalesce(parent_id, 0)"),
+            "level",
+            "normalized_name",
+            unique=True,
+        ),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    parent_id: Mapped[int | None] = mapped_column(
+        ForeignKey("locations.id", ondelete="CASCADE"), index=True
+    )
+    level: Mapped[str] = mapped_column(String(20), nullable=False)  # country | region | city | neighbourhood
+    name: Mapped[str] = mapped_column(String(255), nullable=False)
+    # Nombre sin tildes ni mayúsculas (services.gazetteer.fold_text), para buscar por igualdad
+    normalized_name: Mapped[str] = mapped_column(String(255), nullable=False, index=True)
+    country_code: Mapped[str | None] = mapped_column(String(2))
+
+    parent: Mapped["Location | None"] = relationship(remote_side="Location.id")
+
+
+class LocationAlias(Base):
+    __tablename__ = "location_aliases"
+
+    # "caba", "capital federal" -> la misma ciudad que "buenos aires"
+    normalized_alias: Mapped[str] = mapped_column(String(255), primary_key=True)
+    location_id: Mapped[int] = mapped_column(
+        ForeignKey("locations.id", ondelete="CASCADE"), primary_key=True
+    )
+
+
+class PlaceLocation(Base):
+    __tablename__ = "place_locations"
+
+    # Un lugar se asocia a todos los niveles de su ubicación, así filtrar por país,
+    # región o ciudad es siempre un join por igualdad sobre location_id
+    place_id: Mapped[int] = mapped_column(
+        ForeignKey("places.id", ondelete="CASCADE"), primary_key=True
+    )
+    location_id: Mapped[int] = mapped_column(
+        ForeignKey("locations.id", ondelete="CASCADE"), primary_key=True, index=True
+    )
+
+
+# -------------------------------------------------------------
+# 7. CONVERSACIONES DEL ASISTENTE (historial recortado + estado, con vencimiento)
+# -------------------------------------------------------------
+class AssistantConversation(Base):
+    __tablename__ = "assistant_conversations"
+
+    id: Mapped[str] = mapped_column(String(32), primary_key=True)
+    # Dueño de la conversación; NULL para visitantes sin sesión
+    user_id: Mapped[int | None] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"))
+    # Últimos mensajes [{"role", "content"}] que entran en el presupuesto de tokens
+    messages: Mapped[list] = mapped_column(JSON, nullable=False)
+    state: Mapped[dict | None] = mapped_column(JSON)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, index=True)
@@ -3,6 +3,8 @@ from typing import List, Optional
 from geocoding import locationiq_client
 from pydantic import BaseModel
 
+from services.gazetteer import get_gazetteer
+
 router = APIRouter(prefix="/api/places/autocomplete", tags=["autocomplete"])
 
 class ValidateAddressRequest(BaseModel):
@@ -32,7 +34,7 @@ async def validate_address(address_data: ValidateAddressRequest):
     print(f"Buscando dirección: {address_query}")
     
     # Hacer la búsqueda
-    results = locationiq_client.search_places(address_query, limit=1)
+    results = await locationiq_client.search_places(address_query, limit=1)
     
     if not results:
         return {"coordinates": None, "message": "No se encontró la dirección"}
@@ -54,30 +56,35 @@ async def validate_address(address_data: ValidateAddressRequest):
         "message": "Dirección encontrada correctamente"
     }
 
-# Mantenemos los endpoints de autocomplete simples para países como fallback
+# El autocomplete de países y ciudades se resuelve con el índice local; LocationIQ
+# queda solo para validar direcciones a nivel calle.
 @router.get("/countries")
-async def autocomplete_countries(
-    query: str = Query(..., min_length=1, description="Texto para buscar países")
+def autocomplete_countries(
+    query: str = Query(..., min_length=1, description="Texto para buscar países"),
+    limit: int = Query(3, ge=1, le=20),
 ):
-    if not locationiq_client:
-        raise HTTPException(status_code=500, detail="Servicio de geocoding no configurado")
-    
-    results = locationiq_client.search_places(query, limit=5)
-    countries = []
-    
-    for result in results:
-        address = result.get('address', {})
-        country = address.get('country')
-        if country and not any(c['name'] == country for c in countries):
-            countries.append({
-                'name': country,
-                'code': address.get('country_code', '').upper()
-            })
-    
-    # Ordenar alfabéticamente y devolver máximo 3
-    countries.sort(key=lambda x: x['name'])
-    return countries[:3]
-    
+    return [
+        {"name": country.name, "code": country.code}
+        for country in get_gazetteer().search_countries(query, limit=limit)
+    ]
+
+
+@router.get("/cities")
+def autocomplete_cities(
+    query: str = Query(..., min_length=1, description="Texto para buscar ciudades"),
+    country: Optional[str] = Query(None, description="Nombre o código ISO del país"),
+    limit: int = Query(5, ge=1, le=20),
+):
+    return [
+        {
+            "name": city.name,
+            "region": city.region,
+            "country": city.country,
+            "code": city.country_code,
+        }
+        for city in get_gazetteer().search_cities(query, country=country, limit=limit)
+    ]
+
 # Buenas, te comento, estoy haciendo un trabajo práctico y la idea es hacer una especie TripAdvisor, por ahora con los chicos del grupo ya hicimos lo siguiente:
 # registro
 # iniciar sesión
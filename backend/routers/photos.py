@@ -0,0 +1,42 @@
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query, Request, status
+
+from services.avatar_storage import open_avatar_async
+from services.image_derivatives import PhotoSize
+from services.photo_disk_cache import photo_cache_key
+from services.photo_response import IMMUTABLE_PHOTO_CACHE_CONTROL, stream_photo
+from services.photo_urls import PhotoKind, verify_photo_signature
+from services.place_photo_storage import open_place_photo_async
+from services.review_photo_storage import open_review_photo_async
+
+router = APIRouter(prefix="/api/photos", tags=["photos"])
+
+_OPENERS = {
+    "places": open_place_photo_async,
+    "reviews": open_review_photo_async,
+    "avatars": open_avatar_async,
+}
+
+
+@router.get("/{kind}/{file_id}/{signature}")
+async def get_photo(
+    kind: PhotoKind,
+    file_id: str,
+    signature: str,
+    request: Request,
+    size: Optional[PhotoSize] = Query(default=None),
+):
+    """
+    Serve a photo by its signed file id. The URL changes whenever the content does,
+    so the response is cacheable forever and no Postgres lookup is needed.
+    """
+    if not verify_photo_signature(kind, file_id, signature):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Foto no encontrada")
+    open_file = _OPENERS[kind]
+    return await stream_photo(
+        request,
+        photo_cache_key(file_id, size),
+        lambda: open_file(file_id, size),
+        cache_control=IMMUTABLE_PHOTO_CACHE_CONTROL,
+    )
@@ -1,20 +1,26 @@
 from datetime import date, time
 from pathlib import Path
-from typing import Iterator, List, Optional
-from urllib.parse import urlencode, urljoin
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, File, HTTPException, Request, Response, UploadFile, status
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, BackgroundTasks, Depends, File, HTTPException, Query, Request, Response, UploadFile, status
 from pydantic import BaseModel, field_validator
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import select
+from sqlalchemy.orm import Session
 
 from address_parser import parse_full_address
 from auth import get_current_user
 from constants import ALLOWED_PLACE_PHOTO_EXTENSIONS
 from database import get_session
 from geocoding import locationiq_client
-from models import Place, PlacePhoto, PlaceSchedule, PlaceUnavailability
-from services.place_photo_storage import delete_place_photo, open_place_photo, save_place_photo
+from models import Place, PlacePhoto, PlaceSchedule, PlaceUnavailability, Review, ReviewPhoto
+from services.image_derivatives import PhotoSize
+from services.locations import assign_place_locations_from_place
+from services.photo_purge import get_photo_purge_worker
+from services.photo_response import redirect_to_photo
+from services.photo_upload import discard_photos, prepare_uploads, save_photos_concurrently
+from services.photo_urls import signed_photo_url
+from services.place_photo_storage import delete_place_photo, queue_place_photo_deletion, save_place_photo
+from services.review_photo_storage import queue_review_photo_deletion
 from services.challenge_service import check_and_update_user_challenges
 
 router = APIRouter(prefix="/api/places", tags=["places"])
@@ -39,28 +45,18 @@ def _validate_place_photo_extension(upload: UploadFile) -> None:
         )
 
 
-def _store_place_photo(upload: UploadFile, place_id: int, sort_order: int) -> str:
-    _validate_place_photo_extension(upload)
-    filename = upload.filename or f"place_{place_id}_photo_{sort_order}"
-    return save_place_photo(upload.file, filename, upload.content_type)
-
-
-def _build_place_photo_url(request: Request, place_id: int, photo_id: int, file_id: str) -> str:
-    relative_path = f"api/places/{place_id}/photos/{photo_id}"
-    query = urlencode({"v": file_id})
-    return urljoin(str(request.base_url), f"{relative_path}?{query}")
+def _store_place_photos(uploads: List[UploadFile], place_id: int, first_sort_order: int) -> List[str]:
+    for upload in uploads:
+        _validate_place_photo_extension(upload)
+    pending = prepare_uploads(
+        uploads,
+        [f"place_{place_id}_photo_{first_sort_order + i}" for i in range(len(uploads))],
+    )
+    return save_photos_concurrently(save_place_photo, delete_place_photo, pending)
 
 
-def _stream_file(grid_out) -> Iterator[bytes]:
-    try:
-        chunk_size = 1024 * 256
-        while True:
-            chunk = grid_out.read(chunk_size)
-            if not chunk:
-                break
-            yield chunk
-    finally:
-        grid_out.close()
+def _build_place_photo_url(request: Request, file_id: str, size: Optional[str] = None) -> str:
+    return signed_photo_url(str(request.base_url), "places", file_id, size)
 
 
 class UnavailabilityInput(BaseModel):
@@ -174,6 +170,8 @@ def create_place(
         )
 
         db.add(place)
+        db.flush()
+        assign_place_locations_from_place(db, place)
         db.commit()
         db.refresh(place)
 
@@ -259,34 +257,38 @@ def upload_place_photos(
             detail="No tienes permiso para subir fotos a este lugar",
         )
 
-    try:
-        # Obtener el sort_order inicial (basado en cuántas fotos ya existen)
-        existing_photos_count = len(place.photos)
-        photo_responses = []
-
-        for i, photo in enumerate(photos):
-            sort_order = existing_photos_count + i
+    # Obtener el sort_order inicial (basado en cuántas fotos ya existen)
+    existing_photos_count = len(place.photos)
 
-            # Validar y almacenar la foto en GridFS
-            file_id = _store_place_photo(photo, place_id, sort_order)
+    # Validar y almacenar todas las fotos en GridFS en paralelo
+    try:
+        file_ids = _store_place_photos(photos, place_id, existing_photos_count)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al subir las fotos: {str(e)}",
+        )
 
-            # Crear registro en la base de datos (sin guardar aún)
-            place_photo = PlacePhoto(
+    try:
+        # Crear todos los registros en un solo INSERT para obtener sus IDs
+        place_photos = [
+            PlacePhoto(
                 place_id=place_id,
-                url="",  # URL temporal, la actualizaremos después
+                url=_build_place_photo_url(request, file_id),
                 photo_file_id=file_id,
-                sort_order=sort_order,
+                sort_order=existing_photos_count + i,
             )
-            db.add(place_photo)
-            db.flush()  # Obtener el ID sin hacer commit
-
-            # Construir la URL con el photo_id
-            photo_url = _build_place_photo_url(request, place_id, place_photo.id, file_id)
-            place_photo.url = photo_url
+            for i, file_id in enumerate(file_ids)
+        ]
+        db.add_all(place_photos)
+        db.flush()
 
-            photo_responses.append(
-                {"id": place_photo.id, "url": photo_url, "sort_order": sort_order}
-            )
+        photo_responses = [
+            {"id": place_photo.id, "url": place_photo.url, "sort_order": place_photo.sort_order}
+            for place_photo in place_photos
+        ]
 
         db.commit()
 
@@ -295,19 +297,16 @@ def upload_place_photos(
             "photos": photo_responses,
         }
 
-    except HTTPException:
-        db.rollback()
-        raise
     except Exception as e:
         db.rollback()
+        discard_photos(delete_place_photo, file_ids)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error al subir las fotos: {str(e)}",
         )
 
 
-@router.get("/{place_id}/photos/{photo_id}")
-def get_place_photo(place_id: int, photo_id: int, db: Session = Depends(get_session)):
+def _get_place_photo_file_id(db: Session, place_id: int, photo_id: int) -> str:
     # Verificar que el lugar existe
     place = db.get(Place, place_id)
     if not place:
@@ -320,25 +319,20 @@ def get_place_photo(place_id: int, photo_id: int, db: Session = Depends(get_sess
 
     if not photo.photo_file_id:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Foto no disponible")
+    return photo.photo_file_id
 
-    # Abrir el stream de GridFS
-    photo_stream = open_place_photo(photo.photo_file_id)
-    if photo_stream is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Foto no encontrada")
 
-    # Obtener el content_type de los metadatos
-    metadata = photo_stream.metadata or {}
-    content_type = metadata.get("contentType", "application/octet-stream")
-    headers = {
-        "Cache-Control": "public, max-age=86400",
-        "ETag": photo.photo_file_id,
-    }
-
-    return StreamingResponse(
-        _stream_file(photo_stream),
-        media_type=content_type,
-        headers=headers,
-    )
+@router.get("/{place_id}/photos/{photo_id}")
+def get_place_photo(
+    place_id: int,
+    photo_id: int,
+    request: Request,
+    size: Optional[PhotoSize] = Query(default=None),
+    db: Session = Depends(get_session),
+):
+    # URL anterior a las URLs firmadas: redirige a /api/photos, que no consulta Postgres
+    file_id = _get_place_photo_file_id(db, place_id, photo_id)
+    return redirect_to_photo(_build_place_photo_url(request, file_id, size))
 
 
 @router.put("/{place_id}", status_code=status.HTTP_200_OK)
@@ -387,6 +381,10 @@ def update_place(
         for key, value in filter_fields.items():
             setattr(place, key, value)
 
+        # Recalcular la ubicación normalizada si cambió la dirección
+        if filter_fields or update_data.keys() & {'country', 'city_state'}:
+            assign_place_locations_from_place(db, place)
+
         # 5️⃣ Guardar cambios del lugar en base de datos
         db.add(place)
         db.commit()
@@ -453,15 +451,11 @@ def update_place(
 @router.delete("/{place_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_place(
     place_id: int,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_session),
     current_user=Depends(get_current_user),
 ) -> Response:
-    place = (
-        db.query(Place)
-        .options(joinedload(Place.photos))
-        .filter(Place.id == place_id)
-        .one_or_none()
-    )
+    place = db.get(Place, place_id)
     if not place:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Lugar no encontrado")
     if place.owner_id != current_user.id:
@@ -471,11 +465,19 @@ def delete_place(
         )
 
     try:
-        for photo in place.photos:
-            if photo.photo_file_id:
-                delete_place_photo(photo.photo_file_id)
+        # Las fotos del lugar y de sus reseñas se borran en segundo plano: se encolan
+        # en la misma transacción que elimina las filas.
+        place_file_ids = db.scalars(
+            select(PlacePhoto.photo_file_id).where(PlacePhoto.place_id == place_id)
+        ).all()
+        review_file_ids = db.scalars(
+            select(ReviewPhoto.photo_file_id).join(Review).where(Review.place_id == place_id)
+        ).all()
+        queue_place_photo_deletion(db, place_file_ids)
+        queue_review_photo_deletion(db, review_file_ids)
         db.delete(place)
         db.commit()
+        background_tasks.add_task(get_photo_purge_worker().notify)
         check_and_update_user_challenges(current_user.id, db)
         return Response(status_code=status.HTTP_204_NO_CONTENT)
     except Exception:
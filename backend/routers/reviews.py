@@ -2,11 +2,9 @@ from __future__ import annotations
 
 from typing import Optional, List, Literal
 
-from fastapi import APIRouter, BackgroundTasks, Depends, File, HTTPException, Request, Response, UploadFile, status
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, BackgroundTasks, Depends, File, HTTPException, Query, Request, Response, UploadFile, status
 from pydantic import BaseModel, Field
 from pathlib import Path
-from urllib.parse import urlencode, urljoin
 from sqlalchemy import func, select, case
 from sqlalchemy.orm import Session, joinedload
 
@@ -14,7 +12,11 @@ from auth import get_current_user
 from constants import DEFAULT_AVATAR_URL
 from database import get_session
 from models import Place, Review as ReviewModel, ReviewVote, User
-from services.review_photo_storage import delete_review_photo, open_review_photo, save_review_photo
+from services.image_derivatives import PhotoSize
+from services.photo_urls import LIST_AVATAR_SIZE, LIST_PHOTO_SIZE, list_photo_urls, signed_photo_url, sized_photo_url
+from services.photo_response import redirect_to_photo
+from services.photo_upload import discard_photos, prepare_uploads, save_photos_concurrently
+from services.review_photo_storage import delete_review_photo, save_review_photo
 from services.challenge_service import check_and_update_user_challenges, update_challenge_for_place_owner
 from services.email_service import get_email_service
 from constants import ALLOWED_PLACE_PHOTO_EXTENSIONS
@@ -39,16 +41,15 @@ def _validate_review_photo_extension(upload: UploadFile) -> None:
         )
 
 
-def _store_review_photo(upload: UploadFile, review_id: int) -> str:
-    _validate_review_photo_extension(upload)
-    filename = upload.filename or f"review_{review_id}_photo"
-    return save_review_photo(upload.file, filename, upload.content_type)
+def _store_review_photos(uploads: List[UploadFile], review_id: int) -> List[str]:
+    for upload in uploads:
+        _validate_review_photo_extension(upload)
+    pending = prepare_uploads(uploads, [f"review_{review_id}_photo"] * len(uploads))
+    return save_photos_concurrently(save_review_photo, delete_review_photo, pending)
 
 
-def _build_review_photo_url(request: Request, review_id: int, photo_id: int, file_id: str) -> str:
-    relative_path = f"api/reviews/{review_id}/photos/{photo_id}"
-    query = urlencode({"v": file_id})
-    return urljoin(str(request.base_url), f"{relative_path}?{query}")
+def _build_review_photo_url(request: Request, file_id: str, size: Optional[str] = None) -> str:
+    return signed_photo_url(str(request.base_url), "reviews", file_id, size)
 
 
 class ReviewUpdate(BaseModel):
@@ -100,7 +101,9 @@ def _build_review_response(
     user_vote: Optional[str] = None,
 ) -> ReviewResponse:
     place = review.place
-    author_photo = review.user.photo_url if review.user else DEFAULT_AVATAR_URL
+    author_photo = (
+        sized_photo_url(review.user.photo_url, LIST_AVATAR_SIZE) if review.user else DEFAULT_AVATAR_URL
+    )
     return ReviewResponse(
         id=review.id,
         place_id=review.place_id,
@@ -108,13 +111,15 @@ def _build_review_response(
         rating=review.rating,
         title=review.title,
         comment=review.comment,
-        photos=[p.url for p in review.photos],
+        photos=list_photo_urls([p.url for p in review.photos]),
         author_name=review.author_name,
         author_photo_url=author_photo,
         created_at=review.created_at.isoformat(),
         place_name=place.name if place else "",
         place_rating_avg=float(place.rating_avg) if place and place.rating_avg is not None else None,
-        place_photo_url=place.photos[0].url if place and place.photos else None,
+        place_photo_url=(
+            sized_photo_url(place.photos[0].url, LIST_PHOTO_SIZE) if place and place.photos else None
+        ),
         helpful_votes=helpful_votes,
         not_helpful_votes=not_helpful_votes,
         user_vote=user_vote,
@@ -329,34 +334,35 @@ def upload_review_photos(
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No puedes subir fotos a esta reseña")
 
     try:
-        photo_responses = []
-        for upload in photos:
-            file_id = _store_review_photo(upload, review_id)
-            from models import ReviewPhoto
-
-            rp = ReviewPhoto(review_id=review_id, url="")
-            db.add(rp)
-            db.flush()
-            photo_url = _build_review_photo_url(request, review_id, rp.id, file_id)
-            rp.url = photo_url
-            rp.photo_file_id = file_id
-            db.add(rp)
-            photo_responses.append({"id": rp.id, "url": photo_url})
+        file_ids = _store_review_photos(photos, review_id)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error al subir las fotos: {str(e)}")
+
+    try:
+        from models import ReviewPhoto
+
+        review_photos = [
+            ReviewPhoto(review_id=review_id, url=_build_review_photo_url(request, file_id), photo_file_id=file_id)
+            for file_id in file_ids
+        ]
+        db.add_all(review_photos)
+        db.flush()
+
+        photo_responses = [{"id": rp.id, "url": rp.url} for rp in review_photos]
 
         db.commit()
 
         return {"message": f"{len(photos)} fotos subidas exitosamente", "photos": photo_responses}
 
-    except HTTPException:
-        db.rollback()
-        raise
     except Exception as e:
         db.rollback()
+        discard_photos(delete_review_photo, file_ids)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error al subir las fotos: {str(e)}")
 
 
-@router.get("/{review_id}/photos/{photo_id}")
-def get_review_photo(review_id: int, photo_id: int, db: Session = Depends(get_session)):
+def _get_review_photo_file_id(db: Session, review_id: int, photo_id: int) -> str:
     review = db.get(ReviewModel, review_id)
     if not review:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Reseña no encontrada")
@@ -370,27 +376,19 @@ def get_review_photo(review_id: int, photo_id: int, db: Session = Depends(get_se
     file_id = getattr(photo, "photo_file_id", None)
     if not file_id:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Foto no disponible")
+    return file_id
 
-    photo_stream = open_review_photo(file_id)
-    if photo_stream is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Foto no encontrada")
 
-    metadata = photo_stream.metadata or {}
-    content_type = metadata.get("contentType", "application/octet-stream")
-    headers = {"Cache-Control": "public, max-age=86400", "ETag": file_id}
-
-    def _stream_file(grid_out):
-        try:
-            chunk_size = 1024 * 256
-            while True:
-                chunk = grid_out.read(chunk_size)
-                if not chunk:
-                    break
-                yield chunk
-        finally:
-            grid_out.close()
-
-    return StreamingResponse(_stream_file(photo_stream), media_type=content_type, headers=headers)
+@router.get("/{review_id}/photos/{photo_id}")
+def get_review_photo(
+    review_id: int,
+    photo_id: int,
+    request: Request,
+    size: Optional[PhotoSize] = Query(default=None),
+    db: Session = Depends(get_session),
+):
+    file_id = _get_review_photo_file_id(db, review_id, photo_id)
+    return redirect_to_photo(_build_review_photo_url(request, file_id, size))
 
 
 @router.delete("/{review_id}/photos/{photo_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -1,8 +1,7 @@
 from __future__ import annotations
 
 from pathlib import Path
-from typing import Iterator, Optional
-from urllib.parse import urlencode, urljoin
+from typing import Optional
 
 from fastapi import (
     APIRouter,
@@ -10,11 +9,11 @@ from fastapi import (
     File,
     Form,
     HTTPException,
+    Query,
     Request,
     UploadFile,
     status,
 )
-from fastapi.responses import StreamingResponse
 from sqlalchemy import select
 from sqlalchemy.orm import Session
 
@@ -22,7 +21,10 @@ from auth import get_current_user
 from constants import DEFAULT_AVATAR_URL
 from database import get_session
 from models import User
-from services.avatar_storage import delete_avatar, open_avatar, save_avatar
+from services.avatar_storage import delete_avatar, save_avatar
+from services.image_derivatives import PhotoSize
+from services.photo_response import redirect_to_photo
+from services.photo_urls import signed_photo_url
 from services.user_profile import UserProfile, build_user_profile
 from services.place_service import get_owner_places
 from services.place_schemas import PlaceSummarySchema
@@ -61,26 +63,14 @@ def _store_avatar(upload: UploadFile, user: User) -> str:
     return save_avatar(upload.file, filename, upload.content_type)
 
 
-def _build_avatar_url(request: Request, username: str, file_id: str) -> str:
-    relative_path = f"api/users/{username}/avatar"
-    query = urlencode({"v": file_id})
-    return urljoin(str(request.base_url), f"{relative_path}?{query}")
-
-
-def _stream_file(grid_out) -> Iterator[bytes]:
-    try:
-        chunk_size = 1024 * 256
-        while True:
-            chunk = grid_out.read(chunk_size)
-            if not chunk:
-                break
-            yield chunk
-    finally:
-        grid_out.close()
+def _build_avatar_url(request: Request, file_id: str, size: Optional[str] = None) -> str:
+    return signed_photo_url(str(request.base_url), "avatars", file_id, size)
 
 
+# Síncrono a propósito: FastAPI lo corre en el threadpool, así la decodificación y el
+# redimensionado del avatar (Pillow) y la sesión de Postgres no bloquean el event loop.
 @router.patch("/me", response_model=UserProfile)
-async def update_profile(
+def update_profile(
     request: Request,
     full_name: Optional[str] = Form(None),
     bio: Optional[str] = Form(None),
@@ -111,7 +101,7 @@ async def update_profile(
         _delete_previous_avatar(db_user.photo_file_id)
         new_file_id = _store_avatar(avatar, db_user)
         db_user.photo_file_id = new_file_id
-        db_user.photo_url = _build_avatar_url(request, db_user.username, new_file_id)
+        db_user.photo_url = _build_avatar_url(request, new_file_id)
         updates_applied = True
 
     if not updates_applied:
@@ -130,29 +120,24 @@ async def update_profile(
     return build_user_profile(db_user, db)
 
 
-@router.get("/{username}/avatar")
-def get_user_avatar(username: str, db: Session = Depends(get_session)):
+def _get_avatar_file_id(db: Session, username: str) -> str:
     stmt = select(User).where(User.username == username)
     user = db.scalar(stmt)
     if not user or not user.photo_file_id:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Avatar no encontrado")
+    return user.photo_file_id
 
-    avatar_stream = open_avatar(user.photo_file_id)
-    if avatar_stream is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Avatar no encontrado")
 
-    metadata = avatar_stream.metadata or {}
-    content_type = metadata.get("contentType", "application/octet-stream")
-    headers = {
-        "Cache-Control": "public, max-age=86400",
-        "ETag": user.photo_file_id,
-    }
-
-    return StreamingResponse(
-        _stream_file(avatar_stream),
-        media_type=content_type,
-        headers=headers,
-    )
+@router.get("/{username}/avatar")
+def get_user_avatar(
+    username: str,
+    request: Request,
+    size: Optional[PhotoSize] = Query(default=None),
+    db: Session = Depends(get_session),
+):
+    # Esta URL sigue al avatar actual del usuario, así que la redirección no es permanente
+    file_id = _get_avatar_file_id(db, username)
+    return redirect_to_photo(_build_avatar_url(request, file_id, size), permanent=False)
 
 @router.get("/{user_id}/places", response_model=List[PlaceSummarySchema])
 async def fetch_published_places(
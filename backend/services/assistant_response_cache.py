@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import hashlib
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Optional
+
+from services.virtual_assistant_context import select_context_chunks
+from settings import get_settings
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+# Words that do not change what is being asked.
+_STOPWORDS = frozenset(
+    """
+    a al como con cual cuales de del donde el en es esta este hay la las lo los me mi mis
+    para por puedo que se si su sus te tu tus un una unos unas y yo hola gracias porfa
+    favor quiero queria necesito podria podes puede saber decime explicame ayuda
+    """.split()
+)
+
+# Only words that mean the same thing in the app; broader verbs ("hacer", "dejar",
+# "crear") change the question and must stay as typed.
+_SYNONYMS = {
+    "escribo": "publicar", "escribir": "publicar", "publico": "publicar", "subo": "publicar",
+    "subir": "publicar",
+    "edito": "editar", "modifico": "editar", "modificar": "editar",
+    "borro": "borrar", "elimino": "borrar", "eliminar": "borrar",
+    "busco": "buscar",
+    "opinion": "resena", "opiniones": "resena",
+}
+
+# "de" after these verbs turns the question into its opposite ("¿cómo dejo de recibir
+# mails?"), so it is kept even though it is a stopword. "no", "sin" and "nunca" are
+# never stopwords.
+_NEGATING_VERBS = frozenset({"dejo", "dejar", "deje", "dejas", "paro", "parar"})
+
+
+def normalize_question(text: str) -> str:
+    """
+    Fold accents and case, drop filler words and map a few same-meaning verbs, so
+    "¿Cómo publico una reseña?" and "como escribo una resena" share a key. Negations
+    are kept and token order too: it is cheap insurance against merging questions
+    that only share words.
+    """
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    folded = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    words = _WORD.findall(folded)
+    tokens = []
+    for index, word in enumerate(words):
+        if word in _STOPWORDS and not (word == "de" and index and words[index - 1] in _NEGATING_VERBS):
+            continue
+        if word in _SYNONYMS:
+            word = _SYNONYMS[word]
+        elif word.endswith("s") and len(word) > 3:
+            word = word[:-1]
+        tokens.append(word)
+    return " ".join(tokens)
+
+
+class AssistantResponseCache:
+    """
+    In-process TTL + LRU cache of AI answers. The key is the normalized last user
+    question plus the ids of the knowledge chunks that would go into the prompt, so
+    the same wording in a different context is a different entry.
+    """
+
+    def __init__(self, ttl_seconds: int, max_entries: int) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    @staticmethod
+    def key_for(messages: list[dict[str, str]]) -> Optional[str]:
+        question = next((msg["content"] for msg in reversed(messages) if msg["role"] == "user"), "")
+        normalized = normalize_question(question)
+        if not normalized:
+            return None
+        chunk_ids = ",".join(chunk.id for chunk in select_context_chunks(messages))
+        return hashlib.sha256(f"{normalized}|{chunk_ids}".encode("utf-8")).hexdigest()
+
+    def get(self, key: Optional[str]) -> Optional[str]:
+        if key is None or self.max_entries <= 0:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self._misses += 1
+            return None
+
+    def set(self, key: Optional[str], answer: str) -> None:
+        if key is None or self.max_entries <= 0 or self.ttl_seconds <= 0 or not answer:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, answer)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def stats(self) -> dict[str, float]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "hit_ratio": round(self._hits / lookups, 3) if lookups else 0.0,
+            }
+
+
+@lru_cache()
+def get_assistant_response_cache() -> AssistantResponseCache:
+    settings = get_settings()
+    return AssistantResponseCache(
+        ttl_seconds=settings.assistant_cache_ttl_seconds,
+        max_entries=settings.assistant_cache_max_entries,
+    )
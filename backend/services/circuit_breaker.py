@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+@dataclass(frozen=True)
+class BreakerTicket:
+    """Handed out by ``CircuitBreaker.allow()``; ``probe`` marks the half-open trial call."""
+
+    probe: bool = False
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker. After ``failure_threshold`` failures in a
+    row it opens and rejects calls for ``reset_seconds``; then it lets a single
+    probe through (half-open). The probe closes the breaker on success and
+    reopens it on failure. Every ticket returned by ``allow()`` must be reported
+    exactly once with ``record_success()``, ``record_failure()`` or, when the call
+    was abandoned without an outcome, ``release()``. Only the probe's ticket moves
+    a half-open breaker; late outcomes of calls admitted before it opened are ignored.
+    """
+
+    def __init__(self, name: str, failure_threshold: int, reset_seconds: float) -> None:
+        self.name = name
+        self.failure_threshold = max(failure_threshold, 1)
+        self.reset_seconds = reset_seconds
+        self._state = CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+        self._times_opened = 0
+        self._rejected = 0
+        self._last_failure_at: Optional[float] = None
+
+    def allow(self) -> Optional[BreakerTicket]:
+        """Return a ticket for an admitted call, or ``None`` when the call is rejected."""
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_seconds:
+                self._state = HALF_OPEN
+                self._probe_in_flight = False
+            if self._state == CLOSED:
+                return BreakerTicket()
+            if self._state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return BreakerTicket(probe=True)
+            self._rejected += 1
+            return None
+
+    def record_success(self, ticket: BreakerTicket) -> None:
+        with self._lock:
+            if ticket.probe:
+                self._state = CLOSED
+                self._probe_in_flight = False
+            elif self._state != CLOSED:
+                return
+            self._consecutive_failures = 0
+
+    def record_failure(self, ticket: BreakerTicket) -> None:
+        with self._lock:
+            self._last_failure_at = time.time()
+            if not ticket.probe and self._state != CLOSED:
+                return
+            self._consecutive_failures += 1
+            if ticket.probe or self._consecutive_failures >= self.failure_threshold:
+                self._times_opened += 1
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+                self._probe_in_flight = False
+
+    def release(self, ticket: BreakerTicket) -> None:
+        """Report a call abandoned with no outcome; a released probe lets the next one through."""
+        if ticket.probe:
+            with self._lock:
+                self._probe_in_flight = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_seconds:
+                return HALF_OPEN
+            return self._state
+
+    def stats(self) -> dict[str, object]:
+        state = self.state
+        with self._lock:
+            retry_in = self.reset_seconds - (time.monotonic() - self._opened_at) if state == OPEN else 0.0
+            return {
+                "state": state,
+                "consecutive_failures": self._consecutive_failures,
+                "times_opened": self._times_opened,
+                "rejected": self._rejected,
+                "retry_in_seconds": round(max(retry_in, 0.0), 1),
+                "last_failure_at": self._last_failure_at,
+            }
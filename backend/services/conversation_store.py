@@ -0,0 +1,208 @@
+from __future__ import annotations
+
+import logging
+import secrets
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert
+
+from database import SessionLocal
+from models import AssistantConversation
+from settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+CONVERSATION_BACKENDS = ("memory", "postgres")
+
+# Rough tokens per message for role and separators in the chat format.
+_MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """About 4 characters per token, which is close enough for Spanish prose without a tokenizer."""
+    return (len(text) + 3) // 4 + _MESSAGE_OVERHEAD_TOKENS
+
+
+def trim_to_budget(messages: list[dict[str, str]], budget: int) -> list[dict[str, str]]:
+    """
+    Keep the most recent messages whose estimated tokens fit in ``budget``. The last
+    message is always kept, and the window never starts with an assistant reply
+    whose question was dropped.
+    """
+    kept: list[dict[str, str]] = []
+    used = 0
+    for message in reversed(messages):
+        cost = estimate_tokens(message["content"])
+        if kept and used + cost > budget:
+            break
+        kept.append(message)
+        used += cost
+    kept.reverse()
+    while len(kept) > 1 and kept[0]["role"] == "assistant":
+        kept.pop(0)
+    return kept
+
+
+def new_conversation_id() -> str:
+    return secrets.token_hex(16)
+
+
+@dataclass
+class Conversation:
+    id: str
+    user_id: Optional[int] = None
+    messages: list[dict[str, str]] = field(default_factory=list)
+    state: Optional[dict] = None
+
+
+class ConversationStore(ABC):
+    """Where assistant conversations live between turns, keyed by conversation id."""
+
+    @abstractmethod
+    def get(self, conversation_id: str) -> Optional[Conversation]:
+        """The conversation, or None when it never existed or has expired."""
+
+    @abstractmethod
+    def save(self, conversation: Conversation) -> None:
+        """Insert or replace the conversation and restart its expiry."""
+
+    @abstractmethod
+    def purge_expired(self) -> int:
+        """Drop expired conversations; returns how many were removed."""
+
+    @abstractmethod
+    def stats(self) -> dict[str, object]: ...
+
+
+class MemoryConversationStore(ConversationStore):
+    """Per-process TTL + LRU store; conversations are lost on restart and not shared between workers."""
+
+    def __init__(self, ttl_seconds: int, max_entries: int) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, Conversation]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, conversation_id: str) -> Optional[Conversation]:
+        with self._lock:
+            entry = self._entries.get(conversation_id)
+            if entry is None:
+                return None
+            expires_at, conversation = entry
+            if expires_at <= time.monotonic():
+                del self._entries[conversation_id]
+                return None
+            return Conversation(conversation.id, conversation.user_id, list(conversation.messages), conversation.state)
+
+    def save(self, conversation: Conversation) -> None:
+        with self._lock:
+            self._entries[conversation.id] = (time.monotonic() + self.ttl_seconds, conversation)
+            self._entries.move_to_end(conversation.id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def purge_expired(self) -> int:
+        now = time.monotonic()
+        with self._lock:
+            expired = [key for key, (expires_at, _) in self._entries.items() if expires_at <= now]
+            for key in expired:
+                del self._entries[key]
+        return len(expired)
+
+    def stats(self) -> dict[str, object]:
+        with self._lock:
+            return {"backend": "memory", "conversations": len(self._entries)}
+
+
+class PostgresConversationStore(ConversationStore):
+    """
+    ``assistant_conversations`` table, shared by every worker. Each save pushes the
+    expiry forward. Database errors are logged: a failed read starts a new
+    conversation and a failed write only loses that turn's history.
+    """
+
+    def __init__(self, ttl_seconds: int) -> None:
+        self.ttl_seconds = ttl_seconds
+
+    def get(self, conversation_id: str) -> Optional[Conversation]:
+        try:
+            with SessionLocal() as db:
+                row = db.scalar(
+                    select(AssistantConversation).where(
+                        AssistantConversation.id == conversation_id,
+                        AssistantConversation.expires_at > datetime.now(timezone.utc),
+                    )
+                )
+        except Exception:
+            logger.exception("Assistant conversation lookup failed")
+            return None
+        if row is None:
+            return None
+        return Conversation(row.id, row.user_id, list(row.messages or []), row.state)
+
+    def save(self, conversation: Conversation) -> None:
+        now = datetime.now(timezone.utc)
+        stmt = insert(AssistantConversation).values(
+            id=conversation.id,
+            user_id=conversation.user_id,
+            messages=conversation.messages,
+            state=conversation.state,
+            updated_at=now,
+            expires_at=now + timedelta(seconds=self.ttl_seconds),
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[AssistantConversation.id],
+            set_={
+                "user_id": stmt.excluded.user_id,
+                "messages": stmt.excluded.messages,
+                "state": stmt.excluded.state,
+                "updated_at": stmt.excluded.updated_at,
+                "expires_at": stmt.excluded.expires_at,
+            },
+        )
+        try:
+            with SessionLocal() as db:
+                db.execute(stmt)
+                db.commit()
+        except Exception:
+            logger.exception("Assistant conversation write failed")
+
+    def purge_expired(self) -> int:
+        try:
+            with SessionLocal() as db:
+                result = db.execute(
+                    delete(AssistantConversation).where(
+                        AssistantConversation.expires_at <= datetime.now(timezone.utc)
+                    )
+                )
+                db.commit()
+        except Exception:
+            logger.exception("Assistant conversation cleanup failed")
+            return 0
+        return result.rowcount or 0
+
+    def stats(self) -> dict[str, object]:
+        return {"backend": "postgres"}
+
+
+@lru_cache()
+def get_conversation_store() -> ConversationStore:
+    """Store for this deployment (``ASSISTANT_CONVERSATION_BACKEND``)."""
+    settings = get_settings()
+    kind = settings.assistant_conversation_backend
+    if kind == "memory":
+        return MemoryConversationStore(
+            ttl_seconds=settings.assistant_conversation_ttl_seconds,
+            max_entries=settings.assistant_conversation_max_entries,
+        )
+    if kind == "postgres":
+        return PostgresConversationStore(ttl_seconds=settings.assistant_conversation_ttl_seconds)
+    raise ValueError(f"Unknown conversation backend: {kind!r} (expected one of {CONVERSATION_BACKENDS})")
@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import json
+import re
+import unicodedata
+from bisect import bisect_left
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable, Iterator, Optional, Sequence
+
+from settings import get_settings
+
+_NON_WORD = re.compile(r"[\W_]+")
+
+# A match at the start of the name (or an alias) ranks above one at a later word.
+_RANK_NAME = 0
+_RANK_WORD = 1
+
+
+def fold_text(text: str) -> str:
+    """Strip accents, case-fold and collapse punctuation/whitespace: "Bogotá D.C." -> "bogota d c"."""
+    decomposed = unicodedata.normalize("NFKD", text)
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return _NON_WORD.sub(" ", stripped.casefold()).strip()
+
+
+@dataclass(frozen=True)
+class GazetteerCountry:
+    code: str
+    name: str
+    aliases: tuple[str, ...] = ()
+
+
+@dataclass(frozen=True)
+class GazetteerCity:
+    name: str
+    country_code: str
+    country: str
+    region: Optional[str]
+    population: int
+    aliases: tuple[str, ...] = ()
+
+
+class PrefixIndex:
+    """
+    Sorted array of folded keys answering prefix queries with a bisection. Each
+    name is indexed whole and from every later word ("aires" finds "Buenos Aires").
+    """
+
+    def __init__(self, names: Iterable[tuple[int, Sequence[str]]]) -> None:
+        rows: list[tuple[str, int, int]] = []
+        for item_id, item_names in names:
+            for name in item_names:
+                words = fold_text(name).split()
+                for start in range(len(words)):
+                    rank = _RANK_NAME if start == 0 else _RANK_WORD
+                    rows.append((" ".join(words[start:]), rank, item_id))
+        rows.sort()
+        self._keys = [key for key, _, _ in rows]
+        self._rows = [(rank, item_id) for _, rank, item_id in rows]
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def search(self, prefix: str) -> Iterator[tuple[int, int, bool]]:
+        """Yield ``(rank, item_id, exact)`` for every key starting with the folded ``prefix``."""
+        position = bisect_left(self._keys, prefix)
+        while position < len(self._keys) and self._keys[position].startswith(prefix):
+            rank, item_id = self._rows[position]
+            yield rank, item_id, self._keys[position] == prefix
+            position += 1
+
+
+def _best_matches(index: PrefixIndex, query: str, population: Sequence[int], names: Sequence[str]) -> list[int]:
+    prefix = fold_text(query)
+    if not prefix:
+        return []
+    best: dict[int, tuple[int, int]] = {}
+    for rank, item_id, exact in index.search(prefix):
+        score = (rank, 0 if exact else 1)
+        if item_id not in best or score < best[item_id]:
+            best[item_id] = score
+    return sorted(best, key=lambda item_id: (*best[item_id], -population[item_id], names[item_id]))
+
+
+class Gazetteer:
+    """In-memory country and city autocomplete built from the bundled gazetteer file."""
+
+    def __init__(self, countries: Sequence[dict], cities: Sequence[dict]) -> None:
+        self.countries = [
+            GazetteerCountry(code=item["code"], name=item["name"], aliases=tuple(item.get("aliases", [])))
+            for item in countries
+        ]
+        self._countries_by_code = {country.code: country for country in self.countries}
+        country_names = {country.code: country.name for country in self.countries}
+        self.cities = [
+            GazetteerCity(
+                name=item["name"],
+                country_code=item["country_code"],
+                country=country_names[item["country_code"]],
+                region=item.get("region"),
+                population=int(item.get("population", 0)),
+                aliases=tuple(item.get("aliases", [])),
+            )
+            for item in cities
+        ]
+        self._country_index = PrefixIndex((i, [c.name, *c.aliases]) for i, c in enumerate(self.countries))
+        self._city_index = PrefixIndex((i, [c.name, *c.aliases]) for i, c in enumerate(self.cities))
+        # Los países empatados se ordenan alfabéticamente
+        self._country_population = [0] * len(self.countries)
+        self._city_population = [city.population for city in self.cities]
+        self._country_names = [country.name for country in self.countries]
+        self._city_names = [city.name for city in self.cities]
+        # Nombre o alias (plegado) -> ciudades, para resolver nombres exactos
+        self._cities_by_name: dict[str, list[int]] = {}
+        for i, city in enumerate(self.cities):
+            for name in {fold_text(name) for name in (city.name, *city.aliases)}:
+                self._cities_by_name.setdefault(name, []).append(i)
+        # Código o nombre (plegado) -> código ISO, para filtrar ciudades por país
+        self._country_codes: dict[str, str] = {}
+        for country in self.countries:
+            for name in (country.code, country.name, *country.aliases):
+                self._country_codes.setdefault(fold_text(name), country.code)
+
+    @classmethod
+    def from_file(cls, path: Path) -> "Gazetteer":
+        with open(path, encoding="utf-8") as fh:
+            data = json.load(fh)
+        return cls(data.get("countries", []), data.get("cities", []))
+
+    def resolve_country_code(self, country: str) -> Optional[str]:
+        return self._country_codes.get(fold_text(country))
+
+    def country_by_code(self, code: str) -> Optional[GazetteerCountry]:
+        return self._countries_by_code.get(code)
+
+    def find_city(self, name: str, country_code: Optional[str] = None) -> Optional[GazetteerCity]:
+        """Exact (folded) match on a city name or alias; the most populated one wins."""
+        ids = self._cities_by_name.get(fold_text(name), [])
+        if country_code:
+            ids = [i for i in ids if self.cities[i].country_code == country_code]
+        if not ids:
+            return None
+        return self.cities[max(ids, key=lambda i: self.cities[i].population)]
+
+    def search_countries(self, query: str, limit: int = 5) -> list[GazetteerCountry]:
+        ids = _best_matches(self._country_index, query, self._country_population, self._country_names)
+        return [self.countries[i] for i in ids[:limit]]
+
+    def search_cities(self, query: str, country: Optional[str] = None, limit: int = 5) -> list[GazetteerCity]:
+        ids = _best_matches(self._city_index, query, self._city_population, self._city_names)
+        if country:
+            code = self.resolve_country_code(country)
+            if code is None:
+                return []
+            ids = [i for i in ids if self.cities[i].country_code == code]
+        return [self.cities[i] for i in ids[:limit]]
+
+
+@lru_cache()
+def get_gazetteer() -> Gazetteer:
+    return Gazetteer.from_file(get_settings().gazetteer_path)
@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Any
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert
+
+from database import SessionLocal
+from models import GeocodingCacheEntry
+from settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Returned by ``GeocodingCache.get`` on a miss; ``None``/``[]`` are cached "no results".
+MISS = object()
+
+
+def normalize_query(query: str) -> str:
+    """Case-fold, NFKC-normalize and collapse whitespace so equivalent inputs share a key."""
+    return " ".join(unicodedata.normalize("NFKC", query).casefold().split())
+
+
+def geocoding_cache_key(kind: str, query: str, **params: Any) -> str:
+    payload = json.dumps(
+        {"kind": kind, "q": normalize_query(query), "params": params},
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class GeocodingCache:
+    """
+    Two-level cache of LocationIQ answers: a bounded in-process LRU in front of the
+    ``geocoding_cache`` table, which survives restarts and is shared by every worker.
+    Empty answers are cached too (negative caching) with a shorter TTL. Database
+    errors are logged and treated as misses, so the cache never breaks geocoding.
+    """
+
+    def __init__(self, ttl_seconds: int, negative_ttl_seconds: int, lru_size: int) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.lru_size = lru_size
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _is_negative(value: Any) -> bool:
+        return value is None or value == []
+
+    def _remember(self, key: str, value: Any, expires_at: float) -> None:
+        if self.lru_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.lru_size:
+                self._entries.popitem(last=False)
+
+    def get_local(self, key: str) -> Any:
+        """In-process lookup only (never blocks on the database); ``MISS`` if absent."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return MISS
+            expires_at, value = entry
+            if expires_at > now:
+                self._entries.move_to_end(key)
+                return value
+            del self._entries[key]
+            return MISS
+
+    def get(self, key: str) -> Any:
+        """Return the cached value (possibly ``None`` or ``[]``) or ``MISS``."""
+        value = self.get_local(key)
+        if value is not MISS:
+            return value
+
+        try:
+            with SessionLocal() as db:
+                row = db.execute(
+                    select(GeocodingCacheEntry.response, GeocodingCacheEntry.expires_at).where(
+                        GeocodingCacheEntry.cache_key == key,
+                        GeocodingCacheEntry.expires_at > datetime.now(timezone.utc),
+                    )
+                ).one_or_none()
+        except Exception:
+            logger.exception("Geocoding cache lookup failed")
+            return MISS
+        if row is None:
+            return MISS
+        self._remember(key, row.response, row.expires_at.timestamp())
+        return row.response
+
+    def set(self, key: str, query: str, value: Any) -> None:
+        negative = self._is_negative(value)
+        ttl = self.negative_ttl_seconds if negative else self.ttl_seconds
+        if ttl <= 0:
+            return
+        expires_at = datetime.now(timezone.utc) + timedelta(seconds=ttl)
+        self._remember(key, value, expires_at.timestamp())
+
+        values = {
+            "cache_key": key,
+            "query": query,
+            "response": value,
+            "is_negative": negative,
+            "expires_at": expires_at,
+        }
+        stmt = insert(GeocodingCacheEntry).values(**values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[GeocodingCacheEntry.cache_key],
+            set_={
+                "response": stmt.excluded.response,
+                "is_negative": stmt.excluded.is_negative,
+                "expires_at": stmt.excluded.expires_at,
+            },
+        )
+        try:
+            with SessionLocal() as db:
+                db.execute(stmt)
+                db.commit()
+        except Exception:
+            logger.exception("Geocoding cache write failed")
+
+    def purge_expired(self) -> int:
+        """Delete expired rows; returns how many were removed."""
+        try:
+            with SessionLocal() as db:
+                result = db.execute(
+                    delete(GeocodingCacheEntry).where(GeocodingCacheEntry.expires_at <= datetime.now(timezone.utc))
+                )
+                db.commit()
+        except Exception:
+            logger.exception("Geocoding cache cleanup failed")
+            return 0
+        return result.rowcount or 0
+
+
+@lru_cache()
+def get_geocoding_cache() -> GeocodingCache:
+    settings = get_settings()
+    return GeocodingCache(
+        ttl_seconds=settings.geocoding_cache_ttl_seconds,
+        negative_ttl_seconds=settings.geocoding_negative_cache_ttl_seconds,
+        lru_size=settings.geocoding_cache_lru_size,
+    )
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from io import BytesIO
+from typing import BinaryIO, Literal
+
+from PIL import Image, ImageFilter, ImageOps, UnidentifiedImageError, features
+
+PhotoSize = Literal["thumb", "card", "full", "placeholder"]
+
+# Longest side (in pixels) of each derivative generated on upload.
+DERIVATIVE_MAX_SIDES: dict[str, int] = {
+    "thumb": 320,
+    "card": 800,
+    "full": 1600,
+}
+PLACEHOLDER_MAX_SIDE = 24
+PLACEHOLDER_BLUR_RADIUS = 2
+
+_WEBP_SUPPORTED = features.check("webp")
+_ENCODE_QUALITY = 82
+_PLACEHOLDER_QUALITY = 40
+
+
+@dataclass(frozen=True)
+class ImageDerivative:
+    size: str
+    data: bytes
+    content_type: str
+    extension: str
+    width: int
+    height: int
+
+
+def _encode(image: Image.Image, quality: int) -> tuple[bytes, str, str]:
+    buffer = BytesIO()
+    if _WEBP_SUPPORTED:
+        image.save(buffer, format="WEBP", quality=quality, method=4)
+        return buffer.getvalue(), "image/webp", ".webp"
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    image.save(buffer, format="JPEG", quality=quality, optimize=True, progressive=True)
+    return buffer.getvalue(), "image/jpeg", ".jpg"
+
+
+def _resized(image: Image.Image, max_side: int) -> Image.Image:
+    copy = image.copy()
+    # thumbnail() keeps the aspect ratio and never upscales.
+    copy.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+    return copy
+
+
+def build_derivatives(content: BinaryIO) -> list[ImageDerivative]:
+    """
+    Generate the fixed-size derivatives (thumb, card, full) and a blurred placeholder
+    for an uploaded image. Returns an empty list when the upload cannot be decoded
+    (or is animated), in which case only the original is stored.
+    """
+    content.seek(0)
+    try:
+        with Image.open(content) as source:
+            if getattr(source, "is_animated", False):
+                return []
+            image = ImageOps.exif_transpose(source)
+            image.load()
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError):
+        return []
+    finally:
+        content.seek(0)
+
+    has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+    image = image.convert("RGBA" if has_alpha and _WEBP_SUPPORTED else "RGB")
+
+    derivatives: list[ImageDerivative] = []
+    for size, max_side in DERIVATIVE_MAX_SIDES.items():
+        resized = _resized(image, max_side)
+        data, content_type, extension = _encode(resized, _ENCODE_QUALITY)
+        derivatives.append(
+            ImageDerivative(size, data, content_type, extension, resized.width, resized.height)
+        )
+
+    placeholder = _resized(image, PLACEHOLDER_MAX_SIDE).filter(
+        ImageFilter.GaussianBlur(PLACEHOLDER_BLUR_RADIUS)
+    )
+    data, content_type, extension = _encode(placeholder, _PLACEHOLDER_QUALITY)
+    derivatives.append(
+        ImageDerivative("placeholder", data, content_type, extension, placeholder.width, placeholder.height)
+    )
+    return derivatives
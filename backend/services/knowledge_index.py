@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import json
+import re
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Sequence
+
+import numpy as np
+
+from services.gazetteer import fold_text
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+_STOPWORDS = frozenset(
+    """
+    a al como con cual de del donde el en es esta este hay la las lo los me mi mis o para
+    por que se si sin su sus te tu tus un una unos unas y ya
+    """.split()
+)
+
+# Keywords are curated, so a keyword hit counts as much as this many mentions in the text.
+_KEYWORD_BOOST = 3
+_BM25_K1 = 1.2
+_BM25_B = 0.75
+
+
+@dataclass(frozen=True)
+class KnowledgeChunk:
+    id: str
+    keywords: tuple[str, ...]
+    text: str
+
+
+def tokenize(text: str) -> list[str]:
+    """Accent-folded words without stopwords, with a trailing plural "s" removed."""
+    tokens = []
+    for word in _WORD.findall(fold_text(text)):
+        if word in _STOPWORDS:
+            continue
+        if len(word) > 3 and word.endswith("s"):
+            word = word[:-1]
+        tokens.append(word)
+    return tokens
+
+
+def load_knowledge_chunks(directory: Path) -> list[KnowledgeChunk]:
+    """Read every ``*.json`` (a list of chunks) and ``*.jsonl`` (one chunk per line) file, sorted by name."""
+    chunks: list[KnowledgeChunk] = []
+    for path in sorted(directory.glob("*.json*")):
+        with open(path, encoding="utf-8") as fh:
+            if path.suffix == ".jsonl":
+                items = [json.loads(line) for line in fh if line.strip()]
+            elif path.suffix == ".json":
+                items = json.load(fh)
+            else:
+                continue
+        for item in items:
+            chunks.append(
+                KnowledgeChunk(id=item["id"], keywords=tuple(item.get("keywords", ())), text=item["text"])
+            )
+    return chunks
+
+
+class KnowledgeIndex:
+    """
+    BM25 index over knowledge chunks, stored as a term-major sparse matrix (CSR by
+    term: ``indptr``, ``doc_ids``, ``weights``) with the per-posting BM25 weight
+    precomputed. Scoring a query is a sparse matrix-vector product: gather the
+    postings of the query terms and ``bincount`` them into one score per chunk.
+    """
+
+    def __init__(self, chunks: Sequence[KnowledgeChunk]) -> None:
+        self.chunks = list(chunks)
+        self._by_id = {chunk.id: chunk for chunk in self.chunks}
+        doc_terms: list[Counter[str]] = []
+        for chunk in self.chunks:
+            counts = Counter(tokenize(chunk.text))
+            for keyword in chunk.keywords:
+                for token in tokenize(keyword):
+                    counts[token] += _KEYWORD_BOOST
+            doc_terms.append(counts)
+
+        self.vocabulary: dict[str, int] = {}
+        postings: list[list[tuple[int, int]]] = []
+        for doc_id, counts in enumerate(doc_terms):
+            for term, tf in counts.items():
+                term_id = self.vocabulary.setdefault(term, len(postings))
+                if term_id == len(postings):
+                    postings.append([])
+                postings[term_id].append((doc_id, tf))
+
+        n_docs = max(len(self.chunks), 1)
+        lengths = np.array([sum(counts.values()) for counts in doc_terms] or [0], dtype=np.float32)
+        avg_length = float(lengths.mean()) or 1.0
+        norm = _BM25_K1 * (1 - _BM25_B + _BM25_B * lengths / avg_length)
+
+        self.indptr = np.zeros(len(postings) + 1, dtype=np.int64)
+        self.indptr[1:] = np.cumsum([len(p) for p in postings])
+        self.doc_ids = np.fromiter((d for p in postings for d, _ in p), dtype=np.int32, count=int(self.indptr[-1]))
+        tf = np.fromiter((t for p in postings for _, t in p), dtype=np.float32, count=int(self.indptr[-1]))
+        doc_freq = np.diff(self.indptr).astype(np.float32)
+        idf = np.log1p((n_docs - doc_freq + 0.5) / (doc_freq + 0.5))
+        term_of_posting = np.repeat(np.arange(len(postings)), np.diff(self.indptr))
+        self.weights = (
+            idf[term_of_posting] * tf * (_BM25_K1 + 1) / (tf + norm[self.doc_ids])
+        ).astype(np.float32)
+
+    def __len__(self) -> int:
+        return len(self.chunks)
+
+    def chunk_by_id(self, chunk_id: str) -> Optional[KnowledgeChunk]:
+        return self._by_id.get(chunk_id)
+
+    def scores(self, text: str) -> np.ndarray:
+        term_ids = {self.vocabulary[token] for token in tokenize(text) if token in self.vocabulary}
+        if not term_ids:
+            return np.zeros(len(self.chunks), dtype=np.float32)
+        slices = [slice(self.indptr[t], self.indptr[t + 1]) for t in term_ids]
+        doc_ids = np.concatenate([self.doc_ids[s] for s in slices])
+        weights = np.concatenate([self.weights[s] for s in slices])
+        return np.bincount(doc_ids, weights=weights, minlength=len(self.chunks))
+
+    def search(self, text: str, limit: int) -> list[tuple[KnowledgeChunk, float]]:
+        """Top ``limit`` chunks with a positive score, best first (ties keep file order)."""
+        scores = self.scores(text)
+        matched = np.flatnonzero(scores > 0)
+        if matched.size > limit:
+            matched = matched[np.argpartition(-scores[matched], limit - 1)[:limit]]
+        ordered = sorted(matched.tolist(), key=lambda i: (-scores[i], i))
+        return [(self.chunks[i], float(scores[i])) for i in ordered]
+
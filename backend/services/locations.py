@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Optional, Sequence
+
+from sqlalchemy import delete, insert, select, union
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from models import Location, LocationAlias, Place, PlaceLocation
+from services.gazetteer import fold_text, get_gazetteer
+
+LOCATION_LEVELS = ("country", "region", "city", "neighbourhood")
+
+_REGION_PREFIXES = ("provincia de ", "provincia del ", "province of ", "estado de ", "state of ")
+
+
+@dataclass(frozen=True)
+class LocationNode:
+    level: str
+    name: str
+    aliases: tuple[str, ...] = field(default=())
+
+
+def _same_region(name: str, region: str) -> bool:
+    def strip(value: str) -> str:
+        folded = fold_text(value)
+        for prefix in _REGION_PREFIXES:
+            if folded.startswith(prefix):
+                return folded[len(prefix):]
+        return folded
+
+    return strip(name) == strip(region)
+
+
+def _is_city_state(city) -> bool:
+    """The city's region is the city itself under another name (CABA), not a province named after it."""
+    if not city.region or _same_region(city.name, city.region):
+        return False
+    return any(_same_region(alias, city.region) for alias in city.aliases)
+
+
+def location_chain(country: Optional[str], city_state: Optional[str]) -> list[LocationNode]:
+    """
+    Turn a country plus a ``city_state_filter`` (LocationIQ lists areas from smallest
+    to largest: "Microcentro, San Nicolás, Buenos Aires, Comuna 1, Ciudad Autónoma de
+    Buenos Aires") into a country → region → city → neighbourhood chain.
+
+    With more than one part, the last one is the region (province/state). A part
+    before it anchors the chain only if the gazetteer knows it as a city of that
+    region, so "CABA", "Capital Federal" and the full name land on the same city,
+    while "Nordelta, Partido de Tigre, Buenos Aires" is not read as the capital
+    of the province of the same name. Otherwise the city is taken by position
+    inside the region.
+    """
+    gazetteer = get_gazetteer()
+    chain: list[LocationNode] = []
+
+    country_code = gazetteer.resolve_country_code(country) if country else None
+    known_country = gazetteer.country_by_code(country_code) if country_code else None
+    if known_country is not None:
+        chain.append(LocationNode("country", known_country.name, (known_country.code, *known_country.aliases)))
+    elif country and country.strip():
+        chain.append(LocationNode("country", country.strip()))
+
+    parts = [part.strip() for part in (city_state or "").split(",") if part.strip()]
+    if not parts:
+        return chain
+
+    def add_city(city, index: int) -> list[LocationNode]:
+        if city.region and not _is_city_state(city):
+            chain.append(LocationNode("region", city.region))
+        chain.append(LocationNode("city", city.name, city.aliases))
+        if index > 0:
+            chain.append(LocationNode("neighbourhood", parts[0]))
+        return chain
+
+    if len(parts) == 1:
+        city = gazetteer.find_city(parts[0], country_code)
+        if city is not None:
+            return add_city(city, 0)
+        chain.append(LocationNode("city", parts[0]))
+        return chain
+
+    region = parts[-1]
+    for index, part in enumerate(parts[:-1]):
+        city = gazetteer.find_city(part, country_code)
+        if city is not None and (city.region is None or _same_region(region, city.region)):
+            return add_city(city, index)
+
+    # City-states whose region is the city itself under another name
+    # ("..., Ciudad Autónoma de Buenos Aires"); "Godoy Cruz, Mendoza" stays in the province.
+    city = gazetteer.find_city(region, country_code)
+    if city is not None and _is_city_state(city) and _same_region(region, city.region):
+        return add_city(city, len(parts) - 1)
+
+    chain.append(LocationNode("region", region))
+    chain.append(LocationNode("city", parts[-2]))
+    if len(parts) >= 3:
+        chain.append(LocationNode("neighbourhood", parts[0]))
+    return chain
+
+
+def _get_or_create_location(
+    db: Session, parent_id: Optional[int], node: LocationNode, country_code: Optional[str]
+) -> int:
+    normalized = fold_text(node.name)
+    db.execute(
+        pg_insert(Location)
+        .values(
+            parent_id=parent_id,
+            level=node.level,
+            name=node.name,
+            normalized_name=normalized,
+            country_code=country_code,
+        )
+        .on_conflict_do_nothing()
+    )
+    parent_filter = Location.parent_id.is_(None) if parent_id is None else Location.parent_id == parent_id
+    location_id = db.scalar(
+        select(Location.id).where(
+            parent_filter,
+            Location.level == node.level,
+            Location.normalized_name == normalized,
+        )
+    )
+    aliases = {fold_text(alias) for alias in node.aliases} - {normalized, ""}
+    if aliases:
+        db.execute(
+            pg_insert(LocationAlias)
+            .values([{"normalized_alias": alias, "location_id": location_id} for alias in sorted(aliases)])
+            .on_conflict_do_nothing()
+        )
+    return location_id
+
+
+def assign_place_locations(
+    db: Session, place_id: int, country: Optional[str], city_state: Optional[str]
+) -> list[int]:
+    """
+    Replace the place's ``place_locations`` rows with every level of its location
+    (creating missing ``locations`` rows). Runs in the caller's transaction.
+    """
+    chain = location_chain(country, city_state)
+    country_code = get_gazetteer().resolve_country_code(country) if country else None
+
+    location_ids: list[int] = []
+    parent_id: Optional[int] = None
+    for node in chain:
+        parent_id = _get_or_create_location(db, parent_id, node, country_code)
+        location_ids.append(parent_id)
+
+    db.execute(delete(PlaceLocation).where(PlaceLocation.place_id == place_id))
+    if location_ids:
+        db.execute(
+            insert(PlaceLocation),
+            [{"place_id": place_id, "location_id": location_id} for location_id in location_ids],
+        )
+    return location_ids
+
+
+def assign_place_locations_from_place(db: Session, place: Place) -> list[int]:
+    """Map a place using its parsed filter columns, or the user-entered fields if missing."""
+    return assign_place_locations(
+        db,
+        place.id,
+        place.country_filter or place.country,
+        place.city_state_filter or place.city_state,
+    )
+
+
+def resolve_location_ids(db: Session, query: str) -> Sequence[int]:
+    """Ids of every location whose name or alias equals ``query`` after folding."""
+    normalized = fold_text(query)
+    if not normalized:
+        return []
+    stmt = union(
+        select(Location.id).where(Location.normalized_name == normalized),
+        select(LocationAlias.location_id).where(LocationAlias.normalized_alias == normalized),
+    )
+    return db.scalars(stmt).all()
+
+
+def places_in_locations(location_ids: Sequence[int]):
+    """Subquery of place ids mapped to any of ``location_ids``, for ``Place.id.in_(...)``."""
+    return select(PlaceLocation.place_id).where(PlaceLocation.location_id.in_(location_ids))
@@ -0,0 +1,216 @@
+from __future__ import annotations
+
+import threading
+from functools import lru_cache
+from typing import Optional
+
+from gridfs import GridFSBucket
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase, AsyncIOMotorGridFSBucket
+from pymongo import ASCENDING, MongoClient
+from pymongo.collection import Collection
+from pymongo.database import Database
+from pymongo.monitoring import ConnectionPoolListener
+
+from settings import Settings, get_settings
+
+
+class _PoolMetricsListener(ConnectionPoolListener):
+    """Aggregates connection pool events of the shared client into counters."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.open_connections = 0
+        self.checked_out = 0
+        self.checkouts = 0
+        self.checkout_failures = 0
+        self.pools_cleared = 0
+
+    def _add(self, **deltas: int) -> None:
+        with self._lock:
+            for name, delta in deltas.items():
+                setattr(self, name, getattr(self, name) + delta)
+
+    def snapshot(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "open_connections": self.open_connections,
+                "checked_out": self.checked_out,
+                "checkouts": self.checkouts,
+                "checkout_failures": self.checkout_failures,
+                "pools_cleared": self.pools_cleared,
+            }
+
+    def pool_created(self, event) -> None:
+        pass
+
+    def pool_ready(self, event) -> None:
+        pass
+
+    def pool_cleared(self, event) -> None:
+        self._add(pools_cleared=1)
+
+    def pool_closed(self, event) -> None:
+        pass
+
+    def connection_created(self, event) -> None:
+        self._add(open_connections=1)
+
+    def connection_ready(self, event) -> None:
+        pass
+
+    def connection_closed(self, event) -> None:
+        self._add(open_connections=-1)
+
+    def connection_check_out_started(self, event) -> None:
+        pass
+
+    def connection_check_out_failed(self, event) -> None:
+        self._add(checkout_failures=1)
+
+    def connection_checked_out(self, event) -> None:
+        self._add(checked_out=1, checkouts=1)
+
+    def connection_checked_in(self, event) -> None:
+        self._add(checked_out=-1)
+
+
+class MongoStorage:
+    """
+    Owns the MongoClient shared by every photo bucket, plus a Motor client on the same
+    settings for the async read path. Clients are created on first use with
+    ``connect=False``, so importing the app never waits for Mongo.
+    """
+
+    def __init__(self, settings: Settings) -> None:
+        self._settings = settings
+        self._lock = threading.Lock()
+        self._client: Optional[MongoClient] = None
+        self._async_client: Optional[AsyncIOMotorClient] = None
+        self._buckets: dict[str, GridFSBucket] = {}
+        self._async_buckets: dict[str, AsyncIOMotorGridFSBucket] = {}
+        self._refs_collections: dict[str, Collection] = {}
+        # Un listener por cliente: pymongo y Motor tienen pools separados
+        self._pool_listener = _PoolMetricsListener()
+        self._async_pool_listener = _PoolMetricsListener()
+
+    def _client_options(self, pool_listener: _PoolMetricsListener) -> dict[str, object]:
+        settings = self._settings
+        return {
+            "connect": False,
+            "maxPoolSize": settings.mongodb_max_pool_size,
+            "minPoolSize": settings.mongodb_min_pool_size,
+            "serverSelectionTimeoutMS": settings.mongodb_server_selection_timeout_ms,
+            "connectTimeoutMS": settings.mongodb_connect_timeout_ms,
+            "socketTimeoutMS": settings.mongodb_socket_timeout_ms,
+            "waitQueueTimeoutMS": settings.mongodb_wait_queue_timeout_ms,
+            "event_listeners": [pool_listener],
+        }
+
+    @property
+    def client(self) -> MongoClient:
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = MongoClient(
+                        self._settings.mongodb_uri, **self._client_options(self._pool_listener)
+                    )
+        return self._client
+
+    @property
+    def async_client(self) -> AsyncIOMotorClient:
+        if self._async_client is None:
+            with self._lock:
+                if self._async_client is None:
+                    self._async_client = AsyncIOMotorClient(
+                        self._settings.mongodb_uri, **self._client_options(self._async_pool_listener)
+                    )
+        return self._async_client
+
+    @property
+    def database(self) -> Database:
+        return self.client[self._settings.mongodb_database]
+
+    @property
+    def async_database(self) -> AsyncIOMotorDatabase:
+        return self.async_client[self._settings.mongodb_database]
+
+    def bucket(self, bucket_name: str) -> GridFSBucket:
+        bucket = self._buckets.get(bucket_name)
+        if bucket is None:
+            database = self.database
+            with self._lock:
+                bucket = self._buckets.get(bucket_name)
+                if bucket is None:
+                    bucket = GridFSBucket(database, bucket_name=bucket_name)
+                    self._buckets[bucket_name] = bucket
+        return bucket
+
+    def async_bucket(self, bucket_name: str) -> AsyncIOMotorGridFSBucket:
+        bucket = self._async_buckets.get(bucket_name)
+        if bucket is None:
+            database = self.async_database
+            with self._lock:
+                bucket = self._async_buckets.get(bucket_name)
+                if bucket is None:
+                    bucket = AsyncIOMotorGridFSBucket(database, bucket_name=bucket_name)
+                    self._async_buckets[bucket_name] = bucket
+        return bucket
+
+    def refs_collection(self, bucket_name: str) -> Collection:
+        """Content-hash → file id index (with reference counts) of a photo bucket."""
+        collection = self._refs_collections.get(bucket_name)
+        if collection is None:
+            collection = self.database[f"{bucket_name}.refs"]
+            collection.create_index([("file_id", ASCENDING)], unique=True)
+            with self._lock:
+                self._refs_collections.setdefault(bucket_name, collection)
+        return collection
+
+    @property
+    def avatars_bucket(self) -> GridFSBucket:
+        return self.bucket(self._settings.mongodb_avatars_bucket)
+
+    @property
+    def place_photos_bucket(self) -> GridFSBucket:
+        return self.bucket(self._settings.mongodb_place_photos_bucket)
+
+    @property
+    def review_photos_bucket(self) -> GridFSBucket:
+        return self.bucket(self._settings.mongodb_review_photos_bucket)
+
+    @property
+    def async_avatars_bucket(self) -> AsyncIOMotorGridFSBucket:
+        return self.async_bucket(self._settings.mongodb_avatars_bucket)
+
+    @property
+    def async_place_photos_bucket(self) -> AsyncIOMotorGridFSBucket:
+        return self.async_bucket(self._settings.mongodb_place_photos_bucket)
+
+    @property
+    def async_review_photos_bucket(self) -> AsyncIOMotorGridFSBucket:
+        return self.async_bucket(self._settings.mongodb_review_photos_bucket)
+
+    def pool_metrics(self) -> dict[str, object]:
+        return {
+            "max_pool_size": self._settings.mongodb_max_pool_size,
+            "min_pool_size": self._settings.mongodb_min_pool_size,
+            "sync": {"client_created": self._client is not None, **self._pool_listener.snapshot()},
+            "async": {"client_created": self._async_client is not None, **self._async_pool_listener.snapshot()},
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._client is not None:
+                self._client.close()
+            if self._async_client is not None:
+                self._async_client.close()
+            self._client = None
+            self._async_client = None
+            self._buckets.clear()
+            self._async_buckets.clear()
+            self._refs_collections.clear()
+
+
+@lru_cache()
+def get_mongo_storage() -> MongoStorage:
+    return MongoStorage(get_settings())
@@ -0,0 +1,594 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import mimetypes
+import os
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from functools import lru_cache
+from io import BytesIO
+from pathlib import Path
+from typing import BinaryIO, Iterator, Optional
+
+from bson import ObjectId
+from gridfs import GridFSBucket, NoFile
+from motor.motor_asyncio import AsyncIOMotorGridFSBucket
+from pymongo.collection import Collection
+from pymongo.errors import DuplicateKeyError
+from starlette.concurrency import run_in_threadpool
+
+from services.image_derivatives import build_derivatives
+from services.mongo_storage import MongoStorage, get_mongo_storage
+from services.photo_bucket import (
+    delete_blob,
+    delete_photo,
+    hash_content,
+    open_photo,
+    open_photo_async,
+    parse_file_id,
+    save_photo,
+)
+from services.photo_disk_cache import CachedPhoto, photo_cache_key
+from settings import get_settings
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows dev machines
+    fcntl = None
+
+PHOTO_STORAGE_BACKENDS = ("gridfs", "filesystem")
+
+_COPY_CHUNK_SIZE = 1024 * 256
+_TEMP_PREFIX = ".tmp-"
+
+
+@dataclass
+class PhotoVariant:
+    size: str
+    content_type: str
+    width: Optional[int]
+    height: Optional[int]
+    data: bytes
+
+
+@dataclass
+class PhotoExport:
+    """A stored photo as moved between backends: the original stream plus its derivatives."""
+
+    file_id: str
+    filename: str
+    content_type: Optional[str]
+    sha256: Optional[str]
+    refcount: int
+    content: BinaryIO
+    variants: list[PhotoVariant] = field(default_factory=list)
+
+
+@dataclass
+class PhotoReference:
+    """Deduplication entry of a stored photo: live references and when they last changed."""
+
+    refcount: int
+    updated_at: Optional[datetime]
+
+
+def _sha256_of(stream: BinaryIO) -> str:
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: stream.read(_COPY_CHUNK_SIZE), b""):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+class PhotoBackend(ABC):
+    """
+    Where the bytes of one photo bucket live. File ids are ObjectId strings in every
+    backend, so rows in Postgres stay valid when a bucket is migrated.
+    """
+
+    name: str
+
+    @abstractmethod
+    def save(
+        self,
+        content: BinaryIO,
+        filename: str,
+        content_type: Optional[str],
+        content_hash: Optional[str] = None,
+    ) -> str:
+        """Store an upload (deduplicated by SHA-256) with its derivatives and return its id."""
+
+    @abstractmethod
+    def delete(self, file_id: Optional[str]) -> None:
+        """Drop one reference; the data goes when the last reference does."""
+
+    @abstractmethod
+    def open(self, file_id: Optional[str], size: Optional[str] = None) -> Optional[BinaryIO]:
+        """Open the original (or the ``size`` derivative) for reading."""
+
+    @abstractmethod
+    async def open_async(self, file_id: Optional[str], size: Optional[str] = None):
+        """
+        Open a photo for the GET endpoints: either an async readable with ``length``
+        and ``metadata`` (GridFS) or a ``CachedPhoto`` already on local disk.
+        """
+
+    # Bulk migration between backends
+
+    @abstractmethod
+    def iter_file_ids(self) -> Iterator[str]:
+        """Ids of every original photo (derivatives excluded), in ascending order."""
+
+    @abstractmethod
+    def checksum(self, file_id: str) -> Optional[str]:
+        """SHA-256 of the stored original bytes, or ``None`` when it does not exist."""
+
+    @abstractmethod
+    def export_photo(self, file_id: str) -> Optional[PhotoExport]:
+        """Read a photo with its metadata and derivatives; the caller closes ``content``."""
+
+    @abstractmethod
+    def import_photo(self, photo: PhotoExport) -> None:
+        """Write an exported photo keeping its id (and its reference count)."""
+
+    @abstractmethod
+    def reference(self, file_id: str) -> Optional[PhotoReference]:
+        """Reference entry of a photo, or ``None`` for files stored before deduplication."""
+
+    @abstractmethod
+    def remove(self, file_id: str) -> None:
+        """Remove a photo regardless of its reference count (used to undo an import)."""
+
+
+class GridFSPhotoBackend(PhotoBackend):
+    name = "gridfs"
+
+    def __init__(self, storage: MongoStorage, bucket_name: str) -> None:
+        self._storage = storage
+        self.bucket_name = bucket_name
+
+    @property
+    def bucket(self) -> GridFSBucket:
+        return self._storage.bucket(self.bucket_name)
+
+    @property
+    def async_bucket(self) -> AsyncIOMotorGridFSBucket:
+        return self._storage.async_bucket(self.bucket_name)
+
+    @property
+    def refs(self) -> Collection:
+        return self._storage.refs_collection(self.bucket_name)
+
+    def save(self, content, filename, content_type, content_hash=None) -> str:
+        return save_photo(self.bucket, self.refs, content, filename, content_type, content_hash)
+
+    def delete(self, file_id):
+        delete_photo(self.bucket, self.refs, file_id)
+
+    def open(self, file_id, size=None):
+        return open_photo(self.bucket, file_id, size)
+
+    async def open_async(self, file_id, size=None):
+        return await open_photo_async(self.async_bucket, file_id, size)
+
+    def iter_file_ids(self) -> Iterator[str]:
+        cursor = self.bucket.find({"metadata.variant": {"$exists": False}}).sort("_id", 1)
+        for grid_out in cursor:
+            yield str(grid_out._id)
+
+    def checksum(self, file_id: str) -> Optional[str]:
+        grid_out = self.open(file_id)
+        if grid_out is None:
+            return None
+        try:
+            return _sha256_of(grid_out)
+        finally:
+            grid_out.close()
+
+    def export_photo(self, file_id: str) -> Optional[PhotoExport]:
+        bucket = self.bucket
+        grid_out = self.open(file_id)
+        if grid_out is None:
+            return None
+        metadata = grid_out.metadata or {}
+        variants: list[PhotoVariant] = []
+        for size, variant_id in (metadata.get("variants") or {}).items():
+            variant_object_id = parse_file_id(variant_id)
+            if variant_object_id is None:
+                continue
+            try:
+                variant = bucket.open_download_stream(variant_object_id)
+            except NoFile:
+                continue
+            variant_metadata = variant.metadata or {}
+            variants.append(
+                PhotoVariant(
+                    size=size,
+                    content_type=variant_metadata.get("contentType", "application/octet-stream"),
+                    width=variant_metadata.get("width"),
+                    height=variant_metadata.get("height"),
+                    data=variant.read(),
+                )
+            )
+            variant.close()
+        ref = self.refs.find_one({"file_id": file_id})
+        return PhotoExport(
+            file_id=file_id,
+            filename=grid_out.filename or file_id,
+            content_type=metadata.get("contentType"),
+            sha256=metadata.get("sha256"),
+            refcount=ref["refcount"] if ref else 1,
+            content=grid_out,
+            variants=variants,
+        )
+
+    def import_photo(self, photo: PhotoExport) -> None:
+        bucket = self.bucket
+        stem = Path(photo.filename).stem or photo.file_id
+        variants: dict[str, str] = {}
+        for variant in photo.variants:
+            extension = mimetypes.guess_extension(variant.content_type) or ""
+            variant_id = bucket.upload_from_stream(
+                f"{stem}_{variant.size}{extension}",
+                BytesIO(variant.data),
+                metadata={
+                    "contentType": variant.content_type,
+                    "variant": variant.size,
+                    "variant_of": photo.file_id,
+                    "width": variant.width,
+                    "height": variant.height,
+                },
+            )
+            variants[variant.size] = str(variant_id)
+        metadata: dict[str, object] = {"sha256": photo.sha256}
+        if photo.content_type:
+            metadata["contentType"] = photo.content_type
+        if variants:
+            metadata["variants"] = variants
+        bucket.upload_from_stream_with_id(ObjectId(photo.file_id), photo.filename, photo.content, metadata=metadata)
+        try:
+            self.refs.insert_one(
+                {
+                    "_id": photo.sha256,
+                    "file_id": photo.file_id,
+                    "refcount": photo.refcount,
+                    "updated_at": datetime.now(timezone.utc),
+                }
+            )
+        except DuplicateKeyError:
+            # Identical bytes stored under another id before deduplication existed:
+            # this copy stays unreferenced and is deleted directly, like legacy files.
+            pass
+
+    def reference(self, file_id: str) -> Optional[PhotoReference]:
+        ref = self.refs.find_one({"file_id": file_id})
+        if ref is None:
+            return None
+        updated_at = ref.get("updated_at")
+        if updated_at is not None and updated_at.tzinfo is None:
+            # pymongo returns naive datetimes in UTC.
+            updated_at = updated_at.replace(tzinfo=timezone.utc)
+        return PhotoReference(refcount=ref["refcount"], updated_at=updated_at)
+
+    def remove(self, file_id: str) -> None:
+        object_id = parse_file_id(file_id)
+        if object_id is None:
+            return
+        self.refs.delete_one({"file_id": file_id})
+        delete_blob(self.bucket, object_id)
+
+
+class FilesystemPhotoBackend(PhotoBackend):
+    """
+    Photos as plain files under ``root``, sharded by the last bytes of the id
+    (``<root>/<aa>/<bb>/<id>``) so no directory grows unbounded. Derivatives sit next
+    to the original as ``<id>-<size>``, and ``<id>.json`` holds the metadata; it is
+    written last, so a photo exists once its metadata does. Reference counts live in
+    ``<root>/refs/<hh>/<sha256>.json`` (with the epoch of their last change) and are
+    updated under a file lock, which keeps several worker processes on the same host
+    consistent.
+    """
+
+    name = "filesystem"
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+        self._lock = threading.Lock()
+
+    def _shard_dir(self, file_id: str) -> Path:
+        return self.root / file_id[-2:] / file_id[-4:-2]
+
+    def _blob_path(self, file_id: str, size: Optional[str] = None) -> Path:
+        return self._shard_dir(file_id) / photo_cache_key(file_id, size)
+
+    def _metadata_path(self, file_id: str) -> Path:
+        return self._shard_dir(file_id) / f"{file_id}.json"
+
+    def _ref_path(self, content_hash: str) -> Path:
+        return self.root / "refs" / content_hash[:2] / f"{content_hash}.json"
+
+    @contextmanager
+    def _refs_locked(self) -> Iterator[None]:
+        self.root.mkdir(parents=True, exist_ok=True)
+        with self._lock, open(self.root / ".refs.lock", "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _read_json(path: Path) -> Optional[dict]:
+        try:
+            with open(path, "r", encoding="utf-8") as handle:
+                return json.load(handle)
+        except FileNotFoundError:
+            return None
+
+    def _write_file(self, path: Path, content: BinaryIO) -> int:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        file_descriptor, temp_name = tempfile.mkstemp(prefix=_TEMP_PREFIX, dir=path.parent)
+        written = 0
+        try:
+            with os.fdopen(file_descriptor, "wb") as handle:
+                for chunk in iter(lambda: content.read(_COPY_CHUNK_SIZE), b""):
+                    handle.write(chunk)
+                    written += len(chunk)
+            os.replace(temp_name, path)
+        except Exception:
+            Path(temp_name).unlink(missing_ok=True)
+            raise
+        return written
+
+    def _write_json(self, path: Path, data: dict) -> None:
+        self._write_file(path, BytesIO(json.dumps(data).encode("utf-8")))
+
+    def _write_photo(
+        self,
+        file_id: str,
+        content: BinaryIO,
+        filename: str,
+        content_type: Optional[str],
+        content_hash: str,
+        variants: list[PhotoVariant],
+    ) -> None:
+        try:
+            variant_metadata: dict[str, dict] = {}
+            for variant in variants:
+                self._write_file(self._blob_path(file_id, variant.size), BytesIO(variant.data))
+                variant_metadata[variant.size] = {
+                    "contentType": variant.content_type,
+                    "width": variant.width,
+                    "height": variant.height,
+                }
+            content.seek(0)
+            length = self._write_file(self._blob_path(file_id), content)
+            self._write_json(
+                self._metadata_path(file_id),
+                {
+                    "filename": filename,
+                    "contentType": content_type,
+                    "sha256": content_hash,
+                    "length": length,
+                    "variants": variant_metadata,
+                },
+            )
+        except Exception:
+            self._remove_files(file_id)
+            raise
+
+    def _remove_files(self, file_id: str) -> None:
+        self._metadata_path(file_id).unlink(missing_ok=True)
+        shard_dir = self._shard_dir(file_id)
+        if not shard_dir.exists():
+            return
+        for path in shard_dir.glob(f"{file_id}*"):
+            if path.name == file_id or path.name.startswith(f"{file_id}-"):
+                path.unlink(missing_ok=True)
+
+    def _add_reference(self, content_hash: str) -> Optional[str]:
+        ref_path = self._ref_path(content_hash)
+        ref = self._read_json(ref_path)
+        if ref is None:
+            return None
+        ref["refcount"] += 1
+        ref["updated_at"] = time.time()
+        self._write_json(ref_path, ref)
+        return ref["file_id"]
+
+    def save(self, content, filename, content_type, content_hash=None) -> str:
+        if content_hash is None:
+            content_hash = hash_content(content)
+        with self._refs_locked():
+            existing_id = self._add_reference(content_hash)
+        if existing_id is not None:
+            return existing_id
+
+        file_id = str(ObjectId())
+        variants = [
+            PhotoVariant(
+                size=derivative.size,
+                content_type=derivative.content_type,
+                width=derivative.width,
+                height=derivative.height,
+                data=derivative.data,
+            )
+            for derivative in build_derivatives(content)
+        ]
+        self._write_photo(file_id, content, filename, content_type, content_hash, variants)
+
+        with self._refs_locked():
+            existing_id = self._add_reference(content_hash)
+            if existing_id is None:
+                self._write_json(
+                    self._ref_path(content_hash),
+                    {"file_id": file_id, "refcount": 1, "updated_at": time.time()},
+                )
+                return file_id
+        # Another request stored the same bytes meanwhile: keep theirs.
+        self._remove_files(file_id)
+        return existing_id
+
+    def delete(self, file_id):
+        if parse_file_id(file_id) is None:
+            return
+        metadata = self._read_json(self._metadata_path(file_id))
+        content_hash = (metadata or {}).get("sha256")
+        if content_hash:
+            with self._refs_locked():
+                ref_path = self._ref_path(content_hash)
+                ref = self._read_json(ref_path)
+                if ref is not None and ref["file_id"] == file_id:
+                    ref["refcount"] -= 1
+                    ref["updated_at"] = time.time()
+                    if ref["refcount"] > 0:
+                        self._write_json(ref_path, ref)
+                        return
+                    ref_path.unlink(missing_ok=True)
+        self._remove_files(file_id)
+
+    def local_file(self, file_id: Optional[str], size: Optional[str] = None) -> Optional[CachedPhoto]:
+        if parse_file_id(file_id) is None:
+            return None
+        metadata = self._read_json(self._metadata_path(file_id))
+        if metadata is None:
+            return None
+        candidates = []
+        variant = (metadata.get("variants") or {}).get(size) if size else None
+        if variant is not None:
+            candidates.append((self._blob_path(file_id, size), variant.get("contentType")))
+        candidates.append((self._blob_path(file_id), metadata.get("contentType")))
+        for path, content_type in candidates:
+            try:
+                length = path.stat().st_size
+            except FileNotFoundError:
+                continue
+            return CachedPhoto(path=path, content_type=content_type or "application/octet-stream", length=length)
+        return None
+
+    def open(self, file_id, size=None):
+        local = self.local_file(file_id, size)
+        return open(local.path, "rb") if local is not None else None
+
+    async def open_async(self, file_id, size=None):
+        return await run_in_threadpool(self.local_file, file_id, size)
+
+    def iter_file_ids(self) -> Iterator[str]:
+        if not self.root.exists():
+            return
+        # Shards follow the end of the id, so ordering needs the full listing.
+        file_ids = [
+            path.stem
+            for path in self.root.glob("*/*/*.json")
+            if path.parts[-3] != "refs" and parse_file_id(path.stem) is not None
+        ]
+        yield from sorted(file_ids)
+
+    def checksum(self, file_id: str) -> Optional[str]:
+        handle = self.open(file_id)
+        if handle is None:
+            return None
+        with handle:
+            return _sha256_of(handle)
+
+    def export_photo(self, file_id: str) -> Optional[PhotoExport]:
+        metadata = self._read_json(self._metadata_path(file_id))
+        if metadata is None:
+            return None
+        variants = []
+        for size, variant in (metadata.get("variants") or {}).items():
+            try:
+                data = self._blob_path(file_id, size).read_bytes()
+            except FileNotFoundError:
+                continue
+            variants.append(
+                PhotoVariant(
+                    size=size,
+                    content_type=variant.get("contentType") or "application/octet-stream",
+                    width=variant.get("width"),
+                    height=variant.get("height"),
+                    data=data,
+                )
+            )
+        refcount = 1
+        content_hash = metadata.get("sha256")
+        if content_hash:
+            ref = self._read_json(self._ref_path(content_hash))
+            if ref is not None and ref["file_id"] == file_id:
+                refcount = ref["refcount"]
+        return PhotoExport(
+            file_id=file_id,
+            filename=metadata.get("filename") or file_id,
+            content_type=metadata.get("contentType"),
+            sha256=content_hash,
+            refcount=refcount,
+            content=open(self._blob_path(file_id), "rb"),
+            variants=variants,
+        )
+
+    def import_photo(self, photo: PhotoExport) -> None:
+        self._write_photo(
+            photo.file_id,
+            photo.content,
+            photo.filename,
+            photo.content_type,
+            photo.sha256,
+            photo.variants,
+        )
+        with self._refs_locked():
+            ref_path = self._ref_path(photo.sha256)
+            # An existing ref means identical bytes under another id (stored before
+            # deduplication existed): this copy stays unreferenced, like legacy files.
+            if self._read_json(ref_path) is None:
+                self._write_json(
+                    ref_path,
+                    {"file_id": photo.file_id, "refcount": photo.refcount, "updated_at": time.time()},
+                )
+
+    def reference(self, file_id: str) -> Optional[PhotoReference]:
+        metadata = self._read_json(self._metadata_path(file_id))
+        content_hash = (metadata or {}).get("sha256")
+        if not content_hash:
+            return None
+        ref = self._read_json(self._ref_path(content_hash))
+        if ref is None or ref["file_id"] != file_id:
+            return None
+        updated_at = ref.get("updated_at")
+        return PhotoReference(
+            refcount=ref["refcount"],
+            updated_at=datetime.fromtimestamp(updated_at, timezone.utc) if updated_at is not None else None,
+        )
+
+    def remove(self, file_id: str) -> None:
+        if parse_file_id(file_id) is None:
+            return
+        metadata = self._read_json(self._metadata_path(file_id))
+        content_hash = (metadata or {}).get("sha256")
+        if content_hash:
+            with self._refs_locked():
+                ref_path = self._ref_path(content_hash)
+                ref = self._read_json(ref_path)
+                if ref is not None and ref["file_id"] == file_id:
+                    ref_path.unlink(missing_ok=True)
+        self._remove_files(file_id)
+
+
+def create_photo_backend(kind: str, bucket_name: str) -> PhotoBackend:
+    if kind == "gridfs":
+        return GridFSPhotoBackend(get_mongo_storage(), bucket_name)
+    if kind == "filesystem":
+        return FilesystemPhotoBackend(get_settings().photo_storage_dir / bucket_name)
+    raise ValueError(f"Unknown photo storage backend: {kind!r} (expected one of {PHOTO_STORAGE_BACKENDS})")
+
+
+@lru_cache()
+def get_photo_backend(bucket_name: str) -> PhotoBackend:
+    """Backend of a photo bucket for this deployment (``PHOTO_STORAGE_BACKEND``)."""
+    return create_photo_backend(get_settings().photo_storage_backend, bucket_name)
@@ -0,0 +1,238 @@
+from __future__ import annotations
+
+import hashlib
+from datetime import datetime, timezone
+from io import BytesIO
+from pathlib import Path
+from typing import BinaryIO, Optional
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from gridfs import GridFSBucket, NoFile
+from motor.motor_asyncio import AsyncIOMotorGridFSBucket
+from pymongo import ReturnDocument
+from pymongo.collection import Collection
+from pymongo.errors import DuplicateKeyError
+
+from services.image_derivatives import build_derivatives
+from services.photo_disk_cache import get_photo_cache
+
+_HASH_CHUNK_SIZE = 1024 * 256
+
+
+def parse_file_id(file_id: Optional[str]) -> Optional[ObjectId]:
+    if not file_id:
+        return None
+    try:
+        return ObjectId(file_id)
+    except (InvalidId, TypeError):
+        return None
+
+
+def _find_file_document(bucket: GridFSBucket, object_id: ObjectId):
+    return next(iter(bucket.find({"_id": object_id}).limit(1)), None)
+
+
+def hash_content(content: BinaryIO) -> str:
+    """SHA-256 of a seekable upload, read in chunks; leaves the stream at the start."""
+    digest = hashlib.sha256()
+    content.seek(0)
+    for chunk in iter(lambda: content.read(_HASH_CHUNK_SIZE), b""):
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()
+
+
+def _store_blob(
+    bucket: GridFSBucket,
+    content: BinaryIO,
+    filename: str,
+    content_type: Optional[str],
+    content_hash: str,
+) -> ObjectId:
+    """
+    Store the original upload plus its resized derivatives in GridFS.
+    The original keeps the ids of its derivatives in ``metadata.variants``.
+    """
+    file_id = ObjectId()
+    stem = Path(filename).stem or str(file_id)
+    variants: dict[str, str] = {}
+    try:
+        for derivative in build_derivatives(content):
+            variant_id = bucket.upload_from_stream(
+                f"{stem}_{derivative.size}{derivative.extension}",
+                BytesIO(derivative.data),
+                metadata={
+                    "contentType": derivative.content_type,
+                    "variant": derivative.size,
+                    "variant_of": str(file_id),
+                    "width": derivative.width,
+                    "height": derivative.height,
+                },
+            )
+            variants[derivative.size] = str(variant_id)
+
+        metadata: dict[str, object] = {"sha256": content_hash}
+        if content_type:
+            metadata["contentType"] = content_type
+        if variants:
+            metadata["variants"] = variants
+        content.seek(0)
+        bucket.upload_from_stream_with_id(
+            file_id,
+            filename,
+            content,
+            metadata=metadata,
+        )
+    except Exception:
+        for variant_id in variants.values():
+            _delete_file(bucket, ObjectId(variant_id))
+        raise
+    return file_id
+
+
+def save_photo(
+    bucket: GridFSBucket,
+    refs: Collection,
+    content: BinaryIO,
+    filename: str,
+    content_type: Optional[str],
+    content_hash: Optional[str] = None,
+) -> str:
+    """
+    Store an upload once per distinct content. ``refs`` maps the SHA-256 of the bytes
+    to the GridFS file id plus a reference count: a known hash just gains a reference,
+    otherwise the blob is written and registered. Every change stamps ``updated_at``,
+    which the orphan GC uses as the grace period of reused ids. Returns the file id as
+    a string.
+    """
+    if content_hash is None:
+        content_hash = hash_content(content)
+
+    while True:
+        ref = refs.find_one_and_update(
+            {"_id": content_hash},
+            {"$inc": {"refcount": 1}, "$set": {"updated_at": datetime.now(timezone.utc)}},
+        )
+        if ref is not None:
+            return ref["file_id"]
+
+        file_id = _store_blob(bucket, content, filename, content_type, content_hash)
+        try:
+            refs.insert_one(
+                {
+                    "_id": content_hash,
+                    "file_id": str(file_id),
+                    "refcount": 1,
+                    "updated_at": datetime.now(timezone.utc),
+                }
+            )
+        except DuplicateKeyError:
+            # Another request stored the same bytes meanwhile: keep theirs.
+            delete_blob(bucket, file_id)
+            continue
+        except Exception:
+            delete_blob(bucket, file_id)
+            raise
+        return str(file_id)
+
+
+def _delete_file(bucket: GridFSBucket, object_id: ObjectId) -> None:
+    try:
+        bucket.delete(object_id)
+    except NoFile:
+        return
+
+
+def delete_blob(bucket: GridFSBucket, object_id: ObjectId) -> None:
+    get_photo_cache().purge(str(object_id))
+    document = _find_file_document(bucket, object_id)
+    if document is not None:
+        variants = (document.metadata or {}).get("variants") or {}
+        for variant_id in variants.values():
+            variant_object_id = parse_file_id(variant_id)
+            if variant_object_id is not None:
+                _delete_file(bucket, variant_object_id)
+    _delete_file(bucket, object_id)
+
+
+def delete_photo(bucket: GridFSBucket, refs: Collection, file_id: Optional[str]) -> None:
+    """
+    Drop one reference to a stored photo. The blob and its derivatives are removed
+    only when the last reference goes (missing files are ignored).
+    """
+    object_id = parse_file_id(file_id)
+    if object_id is None:
+        return
+
+    ref = refs.find_one_and_update(
+        {"file_id": file_id},
+        {"$inc": {"refcount": -1}, "$set": {"updated_at": datetime.now(timezone.utc)}},
+        return_document=ReturnDocument.AFTER,
+    )
+    if ref is not None:
+        if ref["refcount"] > 0:
+            return
+        # Only delete if nobody re-referenced the content since the decrement.
+        result = refs.delete_one({"_id": ref["_id"], "refcount": {"$lte": 0}})
+        if result.deleted_count == 0:
+            return
+    # Files stored before deduplication have no ref and are owned by a single row.
+    delete_blob(bucket, object_id)
+
+
+def open_photo(bucket: GridFSBucket, file_id: Optional[str], size: Optional[str] = None):
+    """
+    Open a stored photo for streaming. When ``size`` names a derivative that exists,
+    that derivative is returned; otherwise the original upload is used.
+    """
+    object_id = parse_file_id(file_id)
+    if object_id is None:
+        return None
+    try:
+        grid_out = bucket.open_download_stream(object_id)
+    except NoFile:
+        return None
+
+    if not size:
+        return grid_out
+
+    variants = (grid_out.metadata or {}).get("variants") or {}
+    variant_object_id = parse_file_id(variants.get(size))
+    if variant_object_id is None:
+        return grid_out
+    try:
+        variant = bucket.open_download_stream(variant_object_id)
+    except NoFile:
+        return grid_out
+    grid_out.close()
+    return variant
+
+
+async def open_photo_async(
+    bucket: AsyncIOMotorGridFSBucket,
+    file_id: Optional[str],
+    size: Optional[str] = None,
+):
+    """Async (Motor) counterpart of ``open_photo`` used by the photo GET endpoints."""
+    object_id = parse_file_id(file_id)
+    if object_id is None:
+        return None
+    try:
+        grid_out = await bucket.open_download_stream(object_id)
+    except NoFile:
+        return None
+
+    if not size:
+        return grid_out
+
+    variants = (grid_out.metadata or {}).get("variants") or {}
+    variant_object_id = parse_file_id(variants.get(size))
+    if variant_object_id is None:
+        return grid_out
+    try:
+        variant = await bucket.open_download_stream(variant_object_id)
+    except NoFile:
+        return grid_out
+    grid_out.close()
+    return variant
@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+import mimetypes
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import BinaryIO, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from settings import get_settings
+
+_COPY_CHUNK_SIZE = 1024 * 256
+_TEMP_PREFIX = ".tmp-"
+
+
+@dataclass(frozen=True)
+class CachedPhoto:
+    path: Path
+    content_type: str
+    length: int
+
+
+class PhotoDiskCache:
+    """
+    Size-capped LRU cache of GridFS photos on local disk, keyed by GridFS file id
+    (plus derivative size). The in-memory index is rebuilt from the directory
+    (ordered by mtime) by ``load()`` at startup, or else the first time the cache is
+    used in a process. Async callers use ``get_async``/``put`` so disk access never
+    runs on the event loop.
+    """
+
+    def __init__(self, directory: Path, max_bytes: int, max_entry_bytes: int) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = min(max_entry_bytes, max_bytes)
+        self._entries: OrderedDict[str, tuple[Path, int]] = OrderedDict()
+        self._total_bytes = 0
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        files = []
+        for path in self.directory.iterdir():
+            if not path.is_file():
+                continue
+            if path.name.startswith(_TEMP_PREFIX):
+                path.unlink(missing_ok=True)
+                continue
+            stat = path.stat()
+            files.append((stat.st_mtime, path, stat.st_size))
+        for _, path, size in sorted(files):
+            self._entries[path.stem] = (path, size)
+            self._total_bytes += size
+        self._loaded = True
+        self._evict()
+
+    def load(self) -> None:
+        """Build the index now (a directory scan) instead of on the first request."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._ensure_loaded()
+
+    def _evict(self) -> None:
+        while self._total_bytes > self.max_bytes and self._entries:
+            _, (path, size) = self._entries.popitem(last=False)
+            self._total_bytes -= size
+            path.unlink(missing_ok=True)
+
+    def _forget(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._total_bytes -= entry[1]
+
+    def get(self, key: str) -> Optional[CachedPhoto]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            self._ensure_loaded()
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            path, size = entry
+            if not path.exists():
+                self._forget(key)
+                return None
+            self._entries.move_to_end(key)
+        try:
+            # Keeps the LRU order across restarts.
+            os.utime(path)
+        except OSError:
+            pass
+        content_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+        return CachedPhoto(path=path, content_type=content_type, length=size)
+
+    async def get_async(self, key: str) -> Optional[CachedPhoto]:
+        return await run_in_threadpool(self.get, key)
+
+    def _accepts(self, length: int) -> bool:
+        return self.enabled and length <= self.max_entry_bytes
+
+    def _open_temp_file(self) -> tuple[BinaryIO, Path]:
+        with self._lock:
+            self._ensure_loaded()
+        file_descriptor, temp_name = tempfile.mkstemp(prefix=_TEMP_PREFIX, dir=self.directory)
+        return os.fdopen(file_descriptor, "wb"), Path(temp_name)
+
+    def _commit(self, key: str, temp_path: Path, content_type: str) -> CachedPhoto:
+        extension = mimetypes.guess_extension(content_type) or ".bin"
+        path = self.directory / f"{key}{extension}"
+        os.replace(temp_path, path)
+        size = path.stat().st_size
+        with self._lock:
+            self._forget(key)
+            self._entries[key] = (path, size)
+            self._total_bytes += size
+            self._evict()
+        return CachedPhoto(path=path, content_type=content_type, length=size)
+
+    async def put(self, key: str, grid_out, content_type: str) -> Optional[CachedPhoto]:
+        """
+        Copy an open Motor GridOut into the cache (disk writes run in the threadpool).
+        Returns ``None``, leaving ``grid_out`` untouched, when the file is too large.
+        """
+        if not self._accepts(grid_out.length):
+            return None
+        handle, temp_path = await run_in_threadpool(self._open_temp_file)
+        try:
+            try:
+                while True:
+                    chunk = await grid_out.read(_COPY_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    await run_in_threadpool(handle.write, chunk)
+            finally:
+                handle.close()
+            return await run_in_threadpool(self._commit, key, temp_path, content_type)
+        except Exception:
+            temp_path.unlink(missing_ok=True)
+            raise
+        finally:
+            grid_out.close()
+
+    def purge(self, file_id: Optional[str]) -> None:
+        """Drop the cached original and every cached derivative of ``file_id``."""
+        if not self.enabled or not file_id:
+            return
+        with self._lock:
+            self._ensure_loaded()
+            for key in [key for key in self._entries if key == file_id or key.startswith(f"{file_id}-")]:
+                path, _ = self._entries[key]
+                self._forget(key)
+                path.unlink(missing_ok=True)
+        # Entries written by other worker processes are not in this index.
+        for path in self.directory.glob(f"{file_id}*"):
+            if path.stem == file_id or path.stem.startswith(f"{file_id}-"):
+                path.unlink(missing_ok=True)
+
+
+def photo_cache_key(file_id: str, size: Optional[str] = None) -> str:
+    return f"{file_id}-{size}" if size else file_id
+
+
+@lru_cache()
+def get_photo_cache() -> PhotoDiskCache:
+    settings = get_settings()
+    return PhotoDiskCache(
+        settings.photo_cache_dir,
+        max_bytes=settings.photo_cache_max_bytes,
+        max_entry_bytes=settings.photo_cache_max_entry_bytes,
+    )
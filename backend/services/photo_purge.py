@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Iterable, Optional
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+from models import PhotoPurgeJob
+from services.photo_backends import get_photo_backend
+from settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+_RETRY_BASE_SECONDS = 5
+_RETRY_MAX_SECONDS = 3600
+_MAX_ERROR_LENGTH = 1000
+
+
+def enqueue_photo_purge(db: Session, bucket: str, file_ids: Iterable[Optional[str]]) -> int:
+    """
+    Queue stored photos for deletion inside the caller's transaction, so the jobs are
+    committed together with the removal of the rows that referenced them.
+    """
+    rows = [{"bucket": bucket, "file_id": file_id} for file_id in file_ids if file_id]
+    if rows:
+        db.execute(insert(PhotoPurgeJob), rows)
+    return len(rows)
+
+
+def _retry_delay(attempts: int) -> timedelta:
+    return timedelta(seconds=min(_RETRY_BASE_SECONDS * 2 ** (attempts - 1), _RETRY_MAX_SECONDS))
+
+
+def process_photo_purge_batch(batch_size: int, max_attempts: int) -> tuple[int, int]:
+    """
+    Claim up to ``batch_size`` due jobs and delete their photos. Jobs are removed from
+    the queue before the delete (``FOR UPDATE SKIP LOCKED`` lets several workers share
+    the queue): a crash mid-batch can leak a blob, which ``gc_orphan_photos.py
+    --collect-live-refs`` collects, but never releases the same reference twice. Failures are queued again with
+    exponential backoff; after ``max_attempts`` they stay in the table for inspection
+    (see ``count_exhausted_photo_purges``) and the GC stops treating them as pending.
+    Returns ``(claimed, failed)``.
+    """
+    claimable = (
+        select(PhotoPurgeJob.id)
+        .where(PhotoPurgeJob.available_at <= func.now(), PhotoPurgeJob.attempts < max_attempts)
+        .order_by(PhotoPurgeJob.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    with SessionLocal() as db:
+        jobs = db.execute(
+            delete(PhotoPurgeJob)
+            .where(PhotoPurgeJob.id.in_(claimable))
+            .returning(PhotoPurgeJob.bucket, PhotoPurgeJob.file_id, PhotoPurgeJob.attempts, PhotoPurgeJob.created_at)
+            .execution_options(synchronize_session=False)
+        ).all()
+        db.commit()
+
+    retries = []
+    now = datetime.now(timezone.utc)
+    for job in jobs:
+        try:
+            get_photo_backend(job.bucket).delete(job.file_id)
+        except Exception as exc:
+            attempts = job.attempts + 1
+            retries.append(
+                {
+                    "bucket": job.bucket,
+                    "file_id": job.file_id,
+                    "attempts": attempts,
+                    "last_error": str(exc)[:_MAX_ERROR_LENGTH],
+                    "available_at": now + _retry_delay(attempts),
+                    "created_at": job.created_at,
+                }
+            )
+    if retries:
+        with SessionLocal() as db:
+            db.execute(insert(PhotoPurgeJob), retries)
+            db.commit()
+    return len(jobs), len(retries)
+
+
+def count_exhausted_photo_purges(max_attempts: int) -> int:
+    """Jobs that used up their attempts; the worker no longer retries them."""
+    stmt = select(func.count()).select_from(PhotoPurgeJob).where(PhotoPurgeJob.attempts >= max_attempts)
+    with SessionLocal() as db:
+        return db.scalar(stmt) or 0
+
+
+class PhotoPurgeWorker:
+    """
+    Background thread draining ``photo_purge_queue``. It runs a batch right away when
+    notified (after a delete) and otherwise polls every ``poll_seconds``.
+    """
+
+    def __init__(self, batch_size: int, poll_seconds: float, max_attempts: int) -> None:
+        self.batch_size = batch_size
+        self.poll_seconds = poll_seconds
+        self.max_attempts = max_attempts
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stats_lock = threading.Lock()
+        self._purged = 0
+        self._failed = 0
+        self._batches = 0
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="photo-purge", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stopping.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def notify(self) -> None:
+        self._wake.set()
+
+    def run_once(self) -> int:
+        claimed, failed = process_photo_purge_batch(self.batch_size, self.max_attempts)
+        with self._stats_lock:
+            self._batches += 1 if claimed else 0
+            self._purged += claimed - failed
+            self._failed += failed
+        return claimed
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                claimed = self.run_once()
+            except Exception:
+                logger.exception("Photo purge batch failed")
+                claimed = 0
+            if claimed >= self.batch_size:
+                continue
+            self._wake.wait(self.poll_seconds)
+            self._wake.clear()
+
+    def stats(self) -> dict[str, object]:
+        try:
+            exhausted: Optional[int] = count_exhausted_photo_purges(self.max_attempts)
+        except Exception:
+            logger.exception("Counting exhausted photo purge jobs failed")
+            exhausted = None
+        with self._stats_lock:
+            return {
+                "running": self._thread is not None and self._thread.is_alive(),
+                "batches": self._batches,
+                "purged": self._purged,
+                "failed_attempts": self._failed,
+                "exhausted": exhausted,
+            }
+
+
+@lru_cache()
+def get_photo_purge_worker() -> PhotoPurgeWorker:
+    settings = get_settings()
+    return PhotoPurgeWorker(
+        batch_size=settings.photo_purge_batch_size,
+        poll_seconds=settings.photo_purge_poll_seconds,
+        max_attempts=settings.photo_purge_max_attempts,
+    )
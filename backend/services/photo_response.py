@@ -0,0 +1,236 @@
+from __future__ import annotations
+
+import re
+from pathlib import Path
+from typing import AsyncIterator, Awaitable, Callable, Iterator, Optional
+
+from fastapi import HTTPException, Request, Response, status
+from fastapi.responses import FileResponse, RedirectResponse, StreamingResponse
+
+from services.photo_disk_cache import CachedPhoto, get_photo_cache
+from settings import get_settings
+
+PHOTO_CACHE_CONTROL = "public, max-age=86400"
+IMMUTABLE_PHOTO_CACHE_CONTROL = "public, max-age=31536000, immutable"
+STREAM_CHUNK_SIZE = 1024 * 256
+
+_RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def quote_etag(value: str) -> str:
+    return f'"{value}"'
+
+
+def _etag_matches(header_value: Optional[str], etag: str, strong: bool = False) -> bool:
+    """
+    Weak comparison of an ``If-None-Match`` list by default. ``strong=True`` is for
+    ``If-Range``: a single tag that must match exactly, so weak tags never match.
+    """
+    if not header_value:
+        return False
+    if strong:
+        return header_value.strip() == etag
+    for candidate in header_value.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def parse_range_header(header_value: Optional[str], length: int) -> Optional[tuple[int, int]]:
+    """
+    Parse a single ``bytes=start-end`` range into inclusive offsets.
+    Returns ``None`` when the header is absent or uses an unsupported form (multiple
+    ranges), and raises a 416 when the range cannot be satisfied.
+    """
+    if not header_value:
+        return None
+    match = _RANGE_PATTERN.match(header_value.strip())
+    if not match:
+        return None
+    raw_start, raw_end = match.groups()
+    if not raw_start and not raw_end:
+        return None
+
+    if raw_start:
+        start = int(raw_start)
+        end = int(raw_end) if raw_end else length - 1
+    else:
+        # Suffix range: the last N bytes.
+        suffix_length = int(raw_end)
+        if suffix_length == 0:
+            start, end = length, length - 1
+        else:
+            start = max(length - suffix_length, 0)
+            end = length - 1
+
+    end = min(end, length - 1)
+    if start >= length or start > end:
+        raise HTTPException(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            detail="Rango no satisfacible",
+            headers={"Content-Range": f"bytes */{length}"},
+        )
+    return start, end
+
+
+def _stream_range(stream, start: int, length: int) -> Iterator[bytes]:
+    try:
+        if start:
+            stream.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = stream.read(min(STREAM_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+    finally:
+        stream.close()
+
+
+async def _stream_grid_out(grid_out, start: int, length: int) -> AsyncIterator[bytes]:
+    try:
+        if start:
+            grid_out.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = await grid_out.read(min(STREAM_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+    finally:
+        grid_out.close()
+
+
+def _resolve_range(request: Request, quoted_etag: str, total_length: int) -> Optional[tuple[int, int]]:
+    if_range = request.headers.get("if-range")
+    if if_range and not _etag_matches(if_range, quoted_etag, strong=True):
+        return None
+    return parse_range_header(request.headers.get("range"), total_length)
+
+
+def _accel_redirect_uri(path: Path) -> Optional[str]:
+    settings = get_settings()
+    if not settings.photo_accel_redirect_prefix:
+        return None
+    try:
+        relative_path = path.relative_to(settings.uploads_root)
+    except ValueError:
+        return None
+    return f"{settings.photo_accel_redirect_prefix.rstrip('/')}/{relative_path.as_posix()}"
+
+
+def _serve_cached(request: Request, cached: CachedPhoto, headers: dict[str, str]) -> Response:
+    accel_uri = _accel_redirect_uri(cached.path)
+    if accel_uri is not None:
+        # The proxy sends the file (with sendfile) and answers Range requests itself.
+        headers["X-Accel-Redirect"] = accel_uri
+        return Response(media_type=cached.content_type, headers=headers)
+
+    byte_range = _resolve_range(request, headers["ETag"], cached.length)
+    if byte_range is None:
+        # FileResponse sets Content-Length and lets the server use sendfile.
+        return FileResponse(cached.path, media_type=cached.content_type, headers=headers)
+
+    start, end = byte_range
+    content_length = end - start + 1
+    headers["Content-Length"] = str(content_length)
+    headers["Content-Range"] = f"bytes {start}-{end}/{cached.length}"
+    return StreamingResponse(
+        _stream_range(open(cached.path, "rb"), start, content_length),
+        status_code=status.HTTP_206_PARTIAL_CONTENT,
+        media_type=cached.content_type,
+        headers=headers,
+    )
+
+
+async def stream_photo(
+    request: Request,
+    photo_key: str,
+    open_file: Callable[[], Awaitable[object]],
+    not_found_detail: str = "Foto no encontrada",
+    cache_control: str = PHOTO_CACHE_CONTROL,
+) -> Response:
+    """
+    Serve a stored photo honouring ``If-None-Match`` (304) and single ``Range``
+    requests (206). ``photo_key`` (file id plus derivative size) is both the ETag and
+    the local disk cache key; GridFS is only opened on a cache miss, through Motor, so
+    a download never holds a threadpool worker. Backends that already keep the photo
+    on local disk return a ``CachedPhoto`` from ``open_file`` and skip the cache.
+    The 304 is only sent for a photo that still exists.
+    """
+    quoted_etag = quote_etag(photo_key)
+    headers = {
+        "Cache-Control": cache_control,
+        "ETag": quoted_etag,
+        "Accept-Ranges": "bytes",
+    }
+    cache = get_photo_cache()
+    grid_out = None
+    cached = await cache.get_async(photo_key)
+    if cached is None:
+        grid_out = await open_file()
+        if grid_out is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=not_found_detail)
+        if isinstance(grid_out, CachedPhoto):
+            cached, grid_out = grid_out, None
+
+    # Only answered once the photo is known to exist, so a deleted photo is a 404
+    if _etag_matches(request.headers.get("if-none-match"), quoted_etag):
+        if grid_out is not None:
+            grid_out.close()
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    if cached is not None:
+        return _serve_cached(request, cached, headers)
+
+    metadata = grid_out.metadata or {}
+    content_type = metadata.get("contentType", "application/octet-stream")
+    cached = await cache.put(photo_key, grid_out, content_type)
+    if cached is not None:
+        return _serve_cached(request, cached, headers)
+
+    total_length = grid_out.length
+    try:
+        byte_range = _resolve_range(request, quoted_etag, total_length)
+    except HTTPException:
+        grid_out.close()
+        raise
+
+    if byte_range is None:
+        headers["Content-Length"] = str(total_length)
+        return StreamingResponse(
+            _stream_grid_out(grid_out, 0, total_length),
+            media_type=content_type,
+            headers=headers,
+        )
+
+    start, end = byte_range
+    content_length = end - start + 1
+    headers["Content-Length"] = str(content_length)
+    headers["Content-Range"] = f"bytes {start}-{end}/{total_length}"
+    return StreamingResponse(
+        _stream_grid_out(grid_out, start, content_length),
+        status_code=status.HTTP_206_PARTIAL_CONTENT,
+        media_type=content_type,
+        headers=headers,
+    )
+
+
+def redirect_to_photo(url: str, permanent: bool = True) -> RedirectResponse:
+    """
+    Redirect a legacy photo URL to its signed one. Pass ``permanent=False`` when the
+    legacy URL can later point at another file (e.g. a user's current avatar).
+    """
+    if permanent:
+        return RedirectResponse(
+            url,
+            status_code=status.HTTP_308_PERMANENT_REDIRECT,
+            headers={"Cache-Control": PHOTO_CACHE_CONTROL},
+        )
+    return RedirectResponse(url, status_code=status.HTTP_307_TEMPORARY_REDIRECT, headers={"Cache-Control": "no-cache"})
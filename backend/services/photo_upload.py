@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import hashlib
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import BinaryIO, Callable, Iterable, Optional, Sequence
+
+from fastapi import HTTPException, UploadFile, status
+
+from settings import get_settings
+
+_READ_CHUNK_SIZE = 1024 * 256
+
+SavePhoto = Callable[[BinaryIO, str, Optional[str], Optional[str]], str]
+DeletePhoto = Callable[[str], None]
+
+
+@dataclass(frozen=True)
+class PendingPhoto:
+    file: BinaryIO
+    filename: str
+    content_type: Optional[str]
+    size: int
+    sha256: str
+
+
+def _too_large(detail: str) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=detail)
+
+
+def prepare_uploads(uploads: Sequence[UploadFile], default_filenames: Sequence[str]) -> list[PendingPhoto]:
+    """
+    Measure and hash (SHA-256) every upload in fixed-size chunks (never loading a
+    whole file in memory) and reject the request with a 413 as soon as a file or the
+    request total crosses the configured caps, before anything is written to GridFS.
+    """
+    settings = get_settings()
+    request_bytes = 0
+    pending: list[PendingPhoto] = []
+    for upload, default_filename in zip(uploads, default_filenames):
+        size = 0
+        digest = hashlib.sha256()
+        upload.file.seek(0)
+        while True:
+            chunk = upload.file.read(_READ_CHUNK_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            digest.update(chunk)
+            request_bytes += len(chunk)
+            if size > settings.photo_max_file_bytes:
+                raise _too_large(
+                    f"La foto {upload.filename or default_filename} supera el máximo de "
+                    f"{settings.photo_max_file_bytes // (1024 * 1024)} MB"
+                )
+            if request_bytes > settings.photo_max_request_bytes:
+                raise _too_large(
+                    f"Las fotos superan el máximo de {settings.photo_max_request_bytes // (1024 * 1024)} MB por envío"
+                )
+        upload.file.seek(0)
+        pending.append(
+            PendingPhoto(
+                file=upload.file,
+                filename=upload.filename or default_filename,
+                content_type=upload.content_type,
+                size=size,
+                sha256=digest.hexdigest(),
+            )
+        )
+    return pending
+
+
+@lru_cache()
+def _get_upload_executor() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(
+        max_workers=get_settings().photo_upload_concurrency,
+        thread_name_prefix="photo-upload",
+    )
+
+
+def discard_photos(delete: DeletePhoto, file_ids: Iterable[str]) -> None:
+    """Best-effort removal of files already written for a request that failed."""
+    for file_id in file_ids:
+        try:
+            delete(file_id)
+        except Exception:
+            continue
+
+
+def save_photos_concurrently(save: SavePhoto, delete: DeletePhoto, photos: Sequence[PendingPhoto]) -> list[str]:
+    """
+    Store ``photos`` in parallel on a bounded pool shared by every request and return
+    their file ids in input order. If any upload fails, the ones that succeeded are
+    deleted and the first error is raised.
+    """
+    if not photos:
+        return []
+    executor = _get_upload_executor()
+    futures = [executor.submit(save, photo.file, photo.filename, photo.content_type, photo.sha256) for photo in photos]
+    wait(futures)
+
+    errors = [future.exception() for future in futures if future.exception() is not None]
+    if errors:
+        discard_photos(delete, [future.result() for future in futures if future.exception() is None])
+        raise errors[0]
+    return [future.result() for future in futures]
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+from collections import deque
+from typing import Generic, Hashable, Iterable, Optional, TypeVar
+
+T = TypeVar("T", bound=Hashable)
+
+
+class PhraseMatcher(Generic[T]):
+    """
+    Aho-Corasick automaton over ``(phrase, label)`` pairs. One pass over the text
+    finds every phrase occurring anywhere in it (same semantics as ``phrase in
+    text``). Priority is the order the phrases were given: a label ranks by its
+    earliest phrase that matched, so results do not depend on where in the text
+    each phrase appears. Phrases are matched as given; callers normalize both
+    sides the same way.
+    """
+
+    def __init__(self, phrases: Iterable[tuple[str, T]]) -> None:
+        self._labels: list[T] = []
+        self._goto: list[dict[str, int]] = [{}]
+        outputs: list[list[int]] = [[]]
+        for priority, (phrase, label) in enumerate(phrases):
+            self._labels.append(label)
+            if not phrase:
+                continue
+            node = 0
+            for ch in phrase:
+                next_node = self._goto[node].get(ch)
+                if next_node is None:
+                    next_node = len(self._goto)
+                    self._goto[node][ch] = next_node
+                    self._goto.append({})
+                    outputs.append([])
+                node = next_node
+            outputs[node].append(priority)
+
+        self._fail = [0] * len(self._goto)
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                fallback = self._fail[node]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(ch, 0)
+                # BFS order guarantees the fail target already has its merged outputs.
+                outputs[child].extend(outputs[self._fail[child]])
+                queue.append(child)
+        self._outputs: list[tuple[int, ...]] = [tuple(sorted(set(out))) for out in outputs]
+
+    def __len__(self) -> int:
+        return len(self._labels)
+
+    def _matched_priorities(self, text: str) -> set[int]:
+        goto, fail, outputs = self._goto, self._fail, self._outputs
+        matched: set[int] = set()
+        node = 0
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if outputs[node]:
+                matched.update(outputs[node])
+        return matched
+
+    def find_all(self, text: str) -> list[T]:
+        """Distinct labels of every phrase found in ``text``, highest priority first."""
+        labels: list[T] = []
+        seen: set[T] = set()
+        for priority in sorted(self._matched_priorities(text)):
+            label = self._labels[priority]
+            if label not in seen:
+                seen.add(label)
+                labels.append(label)
+        return labels
+
+    def first(self, text: str) -> Optional[T]:
+        """Label of the highest-priority phrase found in ``text``, or None."""
+        matched = self._matched_priorities(text)
+        return self._labels[min(matched)] if matched else None
+
+    def matches(self, text: str) -> bool:
+        return bool(self._matched_priorities(text))
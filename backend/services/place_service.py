@@ -3,6 +3,7 @@ from sqlalchemy.orm import Session
 from sqlalchemy import select
 from models import Place, UserReward, Reward
 from services.place_schemas import PlaceSummarySchema
+from services.photo_urls import list_photo_urls
 
 
 def get_place_badges(db: Session, place_id: int) -> List[str]:
@@ -30,7 +31,7 @@ def get_owner_places(db: Session, owner_id: int) -> List[PlaceSummarySchema]:
     place_summaries: List[PlaceSummarySchema] = []
 
     for place in places:
-        photo_urls = [photo.url for photo in place.photos]
+        photo_urls = list_photo_urls([photo.url for photo in place.photos])
 
         # Get badges specific to THIS place
         badges = get_place_badges(db, place.id)
@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import random
+from datetime import date, time
+from typing import Optional, Sequence
+
+from sqlalchemy import and_, case, exists, func, literal, or_, select
+from sqlalchemy.orm import Session
+
+from models import Booking, Place, PlaceSchedule, PlaceUnavailability, Review
+from services.locations import places_in_locations, resolve_location_ids
+
+# Candidates fetched per recommendation; the assistant then samples 3 of them.
+CANDIDATE_POOL_SIZE = 30
+# Added to every rating so places without reviews can still be picked.
+_BASE_WEIGHT = 1.0
+
+_END_OF_DAY = time(23, 59)
+
+
+def _location_condition(db: Session, location: str):
+    """ILIKE on the free-text columns, plus the normalized location ids when the text resolves."""
+    pattern = f"%{location.strip()}%"
+    condition = Place.city_state.ilike(pattern) | Place.name.ilike(pattern) | Place.country.ilike(pattern)
+    location_ids = resolve_location_ids(db, location)
+    if location_ids:
+        condition = condition | Place.id.in_(places_in_locations(location_ids))
+    return condition
+
+
+def _free_between(check_in: date, check_out: date):
+    unavailable = exists().where(
+        PlaceUnavailability.place_id == Place.id,
+        PlaceUnavailability.start_date < check_out,
+        PlaceUnavailability.end_date > check_in,
+    )
+    booked = exists().where(
+        Booking.place_id == Place.id,
+        Booking.check_in_date < check_out,
+        Booking.check_out_date > check_in,
+    )
+    return ~unavailable & ~booked
+
+
+def _schedule_day(column):
+    # day_of_week is 0=Monday..6=Sunday; 1-based rows (7=Sunday) are mapped onto it.
+    return case(
+        (column.between(0, 6), column),
+        (column.between(1, 7), (column - 1) % 7),
+        else_=column % 7,
+    )
+
+
+def _open_at(visit_date: date, visit_time: time):
+    closed_that_day = exists().where(
+        PlaceUnavailability.place_id == Place.id,
+        PlaceUnavailability.start_date <= visit_date,
+        PlaceUnavailability.end_date >= visit_date,
+    )
+    day_schedule = and_(
+        PlaceSchedule.place_id == Place.id,
+        _schedule_day(PlaceSchedule.day_of_week) == visit_date.weekday(),
+    )
+    opening = func.coalesce(PlaceSchedule.opening_time, time(0, 0))
+    # A missing closing time, or one before the opening, means "until the end of the day".
+    closing = case(
+        (
+            or_(PlaceSchedule.closing_time.is_(None), PlaceSchedule.closing_time <= opening),
+            literal(_END_OF_DAY),
+        ),
+        else_=PlaceSchedule.closing_time,
+    )
+    open_schedule = exists().where(
+        day_schedule,
+        PlaceSchedule.is_closed.is_(False),
+        opening <= visit_time,
+        closing >= visit_time,
+    )
+    # Places without a schedule for that day are considered open.
+    return ~closed_that_day & (~exists().where(day_schedule) | open_schedule)
+
+
+def _reviewed_by(user_id: Optional[int]):
+    if user_id is None:
+        return literal(False)
+    return exists().where(Review.place_id == Place.id, Review.user_id == user_id)
+
+
+def _candidates(db: Session, conditions: list, user_id: Optional[int], pool_size: int) -> list[tuple[Place, bool]]:
+    reviewed = _reviewed_by(user_id).label("reviewed")
+    stmt = (
+        select(Place, reviewed)
+        .where(*conditions)
+        .order_by(reviewed.asc(), Place.rating_avg.desc(), Place.name.asc())
+        .limit(pool_size)
+    )
+    return [(row[0], bool(row[1])) for row in db.execute(stmt).all()]
+
+
+def lodging_candidates(
+    db: Session,
+    *,
+    category: str,
+    location: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    guests: Optional[int] = None,
+    check_in: Optional[date] = None,
+    check_out: Optional[date] = None,
+    user_id: Optional[int] = None,
+    pool_size: int = CANDIDATE_POOL_SIZE,
+) -> list[tuple[Place, bool]]:
+    """
+    Places matching every lodging filter, already free for the stay, as
+    ``(place, reviewed_by_user)``; unreviewed ones first, then by rating.
+    """
+    conditions = [func.lower(Place.category) == category]
+    if location:
+        conditions.append(_location_condition(db, location))
+    if min_price is not None:
+        conditions.append(Place.price_per_night >= min_price)
+    if max_price is not None:
+        conditions.append(Place.price_per_night <= max_price)
+    if guests:
+        conditions.append(Place.capacity.is_(None) | (Place.capacity >= guests))
+    if check_in and check_out:
+        conditions.append(_free_between(check_in, check_out))
+    return _candidates(db, conditions, user_id, pool_size)
+
+
+def restaurant_candidates(
+    db: Session,
+    *,
+    location: Optional[str] = None,
+    visit_date: Optional[date] = None,
+    visit_time: Optional[time] = None,
+    user_id: Optional[int] = None,
+    pool_size: int = CANDIDATE_POOL_SIZE,
+) -> list[tuple[Place, bool]]:
+    """Restaurants open at the visit date and time, as ``(place, reviewed_by_user)``."""
+    conditions = [func.lower(Place.category) == "restaurante"]
+    if location:
+        conditions.append(_location_condition(db, location))
+    if visit_date and visit_time:
+        conditions.append(_open_at(visit_date, visit_time))
+    return _candidates(db, conditions, user_id, pool_size)
+
+
+def _weighted_sample(places: Sequence[Place], k: int, rng: random.Random) -> list[Place]:
+    # Efraimidis-Spirakis: keep the k largest u ** (1 / weight).
+    keyed = [(rng.random() ** (1.0 / (_BASE_WEIGHT + max(place.rating_avg or 0.0, 0.0))), place) for place in places]
+    keyed.sort(key=lambda item: item[0], reverse=True)
+    return [place for _, place in keyed[:k]]
+
+
+def sample_recommendations(
+    candidates: Sequence[tuple[Place, bool]], k: int = 3, rng: Optional[random.Random] = None
+) -> list[Place]:
+    """
+    Pick ``k`` places weighted by rating, preferring ones the user has not reviewed
+    and filling up with reviewed ones only when there are not enough.
+    """
+    rng = rng or random.Random()
+    fresh = [place for place, reviewed in candidates if not reviewed]
+    sampled = _weighted_sample(fresh, k, rng)
+    if len(sampled) < k:
+        seen = [place for place, reviewed in candidates if reviewed]
+        sampled += _weighted_sample(seen, k - len(sampled), rng)
+    return sampled
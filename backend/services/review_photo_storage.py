@@ -1,48 +1,42 @@
 from __future__ import annotations
 
-from typing import BinaryIO, Optional
+from typing import BinaryIO, Iterable, Optional
 
-from bson import ObjectId
-from bson.errors import InvalidId
-from gridfs import GridFSBucket, NoFile
-from pymongo import MongoClient
+from sqlalchemy.orm import Session
 
+from services.photo_backends import PhotoBackend, get_photo_backend
+from services.photo_purge import enqueue_photo_purge
 from settings import get_settings
 
-settings = get_settings()
 
-_mongo_client = MongoClient(settings.mongodb_uri)
-_mongo_database = _mongo_client[settings.mongodb_database]
-_review_photos_bucket = GridFSBucket(_mongo_database, bucket_name=settings.mongodb_review_photos_bucket)
+def _bucket_name() -> str:
+    return get_settings().mongodb_review_photos_bucket
 
 
-def save_review_photo(content: BinaryIO, filename: str, content_type: Optional[str]) -> str:
-    metadata = {}
-    if content_type:
-        metadata["contentType"] = content_type
-    content.seek(0)
-    file_id = _review_photos_bucket.upload_from_stream(
-        filename,
-        content,
-        metadata=metadata or None,
-    )
-    return str(file_id)
+def _backend() -> PhotoBackend:
+    return get_photo_backend(_bucket_name())
+
+
+def save_review_photo(
+    content: BinaryIO,
+    filename: str,
+    content_type: Optional[str],
+    content_hash: Optional[str] = None,
+) -> str:
+    """Store the review photo (once per distinct content) and return its file id."""
+    return _backend().save(content, filename, content_type, content_hash)
 
 
 def delete_review_photo(file_id: Optional[str]) -> None:
-    if not file_id:
-        return
-
-    try:
-        _review_photos_bucket.delete(ObjectId(file_id))
-    except (InvalidId, NoFile):
-        return
-
-
-def open_review_photo(file_id: Optional[str]):
-    if not file_id:
-        return None
-    try:
-        return _review_photos_bucket.open_download_stream(ObjectId(file_id))
-    except (InvalidId, NoFile):
-        return None
+    """Release a stored review photo; its data goes once no other reference remains."""
+    _backend().delete(file_id)
+
+
+def queue_review_photo_deletion(db: Session, file_ids: Iterable[Optional[str]]) -> int:
+    """Queue review photos for background deletion; committed with the caller's transaction."""
+    return enqueue_photo_purge(db, _bucket_name(), file_ids)
+
+
+async def open_review_photo_async(file_id: Optional[str], size: Optional[str] = None):
+    """Open a stored review photo (or one of its derivatives) without blocking the event loop."""
+    return await _backend().open_async(file_id, size)
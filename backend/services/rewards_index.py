@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Iterable, Optional
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+from models import Challenge, Reward
+from services.text_normalization import normalize_text
+from settings import get_settings
+
+# Distinct terms remembered per snapshot (category terms plus recommended place names).
+_MAX_MEMOIZED_TERMS = 4096
+
+
+@dataclass(frozen=True)
+class IndexedChallenge:
+    id: int
+    title: str
+    description: Optional[str]
+
+
+@dataclass(frozen=True)
+class IndexedReward:
+    id: int
+    title: str
+    description: Optional[str]
+    challenge_id: Optional[int]
+    challenge_title: Optional[str]
+    challenge_description: Optional[str]
+
+
+class _SubstringMemo:
+    """
+    Normalized searchable text per id, plus a memo of term -> matching ids. Not an
+    inverted index: the first lookup of a term scans every text, because terms match
+    as substrings ("caba" finds "cabaña", "restaurant" finds "restaurantes"). The
+    assistant asks for the same few category terms and place names over and over, so
+    repeated lookups are what the memo saves; it is dropped with the snapshot.
+    """
+
+    def __init__(self, texts: dict[int, str]) -> None:
+        self._texts = texts
+        self._memo: dict[str, tuple[int, ...]] = {}
+
+    def ids_for(self, term: str) -> tuple[int, ...]:
+        ids = self._memo.get(term)
+        if ids is None:
+            normalized = normalize_text(term)
+            ids = tuple(id_ for id_, text in self._texts.items() if normalized and normalized in text)
+            if len(self._memo) >= _MAX_MEMOIZED_TERMS:
+                self._memo.clear()
+            self._memo[term] = ids
+        return ids
+
+    def matching(self, terms: Iterable[str]) -> set[int]:
+        matched: set[int] = set()
+        for term in terms:
+            if term:
+                matched.update(self.ids_for(term))
+        return matched
+
+
+class RewardsIndex:
+    """
+    Immutable snapshot of every challenge and reward, detached from any session,
+    with their title/description text normalized once at build time.
+    """
+
+    def __init__(self, challenges: list[IndexedChallenge], rewards: list[IndexedReward]) -> None:
+        self.challenges = challenges
+        self.rewards = rewards
+        self._challenge_terms = _SubstringMemo(
+            {c.id: normalize_text(" ".join(filter(None, (c.title, c.description)))) for c in challenges}
+        )
+        self._reward_terms = _SubstringMemo(
+            {
+                r.id: normalize_text(
+                    " ".join(filter(None, (r.title, r.description, r.challenge_title, r.challenge_description)))
+                )
+                for r in rewards
+            }
+        )
+
+    @classmethod
+    def load(cls, db: Session) -> "RewardsIndex":
+        challenges = db.scalars(select(Challenge).order_by(Challenge.id)).all()
+        by_id = {challenge.id: challenge for challenge in challenges}
+        rewards = db.scalars(select(Reward).order_by(Reward.id)).all()
+        return cls(
+            [IndexedChallenge(c.id, c.title, c.description) for c in challenges],
+            [
+                IndexedReward(
+                    r.id,
+                    r.title,
+                    r.description,
+                    r.challenge_id,
+                    by_id[r.challenge_id].title if r.challenge_id in by_id else None,
+                    by_id[r.challenge_id].description if r.challenge_id in by_id else None,
+                )
+                for r in rewards
+            ],
+        )
+
+    def challenges_matching(self, terms: Iterable[str]) -> list[IndexedChallenge]:
+        """Challenges whose title or description contains any term, in id order."""
+        matched = self._challenge_terms.matching(terms)
+        return [challenge for challenge in self.challenges if challenge.id in matched]
+
+    def rewards_matching(self, terms: Iterable[str]) -> list[IndexedReward]:
+        """Rewards whose own or challenge text contains any term, in id order."""
+        matched = self._reward_terms.matching(terms)
+        return [reward for reward in self.rewards if reward.id in matched]
+
+
+class RewardsIndexCache:
+    """
+    Holds the current ``RewardsIndex``. It is rebuilt on first use after
+    ``invalidate()`` (called automatically when a session commits changes to
+    challenges or rewards) or after ``ttl_seconds``, which covers edits made
+    outside this process such as ``insert_initial_rewards.py``.
+    """
+
+    def __init__(self, ttl_seconds: int) -> None:
+        self.ttl_seconds = ttl_seconds
+        self._index: Optional[RewardsIndex] = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+        self._builds = 0
+        self._invalidations = 0
+
+    def get(self) -> RewardsIndex:
+        index = self._index
+        if index is not None and time.monotonic() < self._expires_at:
+            return index
+        with self._lock:
+            if self._index is None or time.monotonic() >= self._expires_at:
+                with SessionLocal() as db:
+                    self._index = RewardsIndex.load(db)
+                self._expires_at = time.monotonic() + max(self.ttl_seconds, 0)
+                self._builds += 1
+            return self._index
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._index = None
+            self._invalidations += 1
+
+    def stats(self) -> dict[str, int]:
+        index = self._index
+        return {
+            "challenges": len(index.challenges) if index else 0,
+            "rewards": len(index.rewards) if index else 0,
+            "builds": self._builds,
+            "invalidations": self._invalidations,
+        }
+
+
+@lru_cache()
+def get_rewards_index_cache() -> RewardsIndexCache:
+    return RewardsIndexCache(ttl_seconds=get_settings().rewards_index_ttl_seconds)
+
+
+_CHANGED_KEY = "rewards_index_changed"
+
+
+@event.listens_for(Session, "before_flush")
+def _track_reward_changes(session: Session, flush_context, instances) -> None:
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, (Challenge, Reward)):
+            session.info[_CHANGED_KEY] = True
+            return
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_bulk_reward_changes(orm_execute_state) -> None:
+    if orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert:
+        mapper = orm_execute_state.bind_mapper
+        if mapper is not None and mapper.class_ in (Challenge, Reward):
+            orm_execute_state.session.info[_CHANGED_KEY] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_on_commit(session: Session) -> None:
+    if session.info.pop(_CHANGED_KEY, False):
+        get_rewards_index_cache().invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_on_rollback(session: Session) -> None:
+    session.info.pop(_CHANGED_KEY, None)
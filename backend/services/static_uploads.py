@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import Iterable
+
+from fastapi.staticfiles import StaticFiles
+
+
+class UploadsStaticFiles(StaticFiles):
+    """
+    ``StaticFiles`` for the public uploads directory that answers 404 for anything
+    under ``private_dirs``. Photos stored there are only reachable through the signed
+    photo endpoints (which check the signature and may hand the file to the proxy with
+    X-Accel-Redirect), never by guessing their path under /uploads.
+    """
+
+    def __init__(self, *, directory: Path, private_dirs: Iterable[Path]) -> None:
+        super().__init__(directory=directory)
+        self.private_dirs = tuple(os.path.realpath(path) for path in private_dirs)
+
+    def _is_private(self, full_path: str) -> bool:
+        return any(os.path.commonpath([full_path, private]) == private for private in self.private_dirs)
+
+    def lookup_path(self, path: str) -> tuple[str, os.stat_result | None]:
+        full_path, stat_result = super().lookup_path(path)
+        # Resolved paths, so "photos/../photos/x" or a symlink into a private dir is caught too
+        if stat_result is not None and self._is_private(os.path.realpath(full_path)):
+            return "", None
+        return full_path, stat_result
@@ -0,0 +1,10 @@
+from __future__ import annotations
+
+import unicodedata
+from typing import Optional
+
+
+def normalize_text(text: Optional[str]) -> str:
+    """Lowercase and strip accents, the form the assistant matches phrases and terms in."""
+    decomposed = unicodedata.normalize("NFD", (text or "").lower())
+    return "".join(ch for ch in decomposed if unicodedata.category(ch) != "Mn")
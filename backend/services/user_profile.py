@@ -8,6 +8,7 @@ from sqlalchemy import select, func
 
 from constants import DEFAULT_AVATAR_URL
 from models import User, UserAchievement, UserReward, Reward
+from services.photo_urls import LIST_PHOTO_SIZE, list_photo_urls, sized_photo_url
 
 MONTHS_ES = [
     "enero",
@@ -118,7 +119,9 @@ def build_user_profile(user: User, db=None) -> UserProfile:
         place_rating = (
             float(place.rating_avg) if place and place.rating_avg is not None else None
         )
-        place_cover = place.photos[0].url if place and place.photos else None
+        place_cover = (
+            sized_photo_url(place.photos[0].url, LIST_PHOTO_SIZE) if place and place.photos else None
+        )
         helpful_votes = sum(1 for vote in review.votes if vote.is_helpful)
         not_helpful_votes = sum(1 for vote in review.votes if not vote.is_helpful)
         reviews_payload.append(
@@ -130,7 +133,7 @@ def build_user_profile(user: User, db=None) -> UserProfile:
                 rating=review.rating,
                 title=review.title,
                 comment=review.comment,
-                photos=[p.url for p in review.photos],
+                photos=list_photo_urls([p.url for p in review.photos]),
                 created_at=review.created_at.isoformat(),
                 helpful_votes=helpful_votes,
                 not_helpful_votes=not_helpful_votes,
@@ -1,13 +1,18 @@
 from __future__ import annotations
 
+import threading
+import time
+from collections import deque
 from functools import lru_cache
-from typing import Iterable
+from typing import Callable, Iterable, Iterator, Optional
 
+import httpx
 from fastapi import HTTPException
-from openai import APIConnectionError, OpenAI, OpenAIError
+from openai import APIConnectionError, APIStatusError, OpenAI, OpenAIError
 import logging
 
 from settings import get_settings
+from services.circuit_breaker import BreakerTicket, CircuitBreaker
 from services.virtual_assistant_context import build_context_block
 
 settings = get_settings()
@@ -42,12 +47,97 @@ def is_ai_enabled() -> bool:
 @lru_cache()
 def _get_openai_client() -> OpenAI:
     _ensure_openai_configured()
-    client_kwargs = {"api_key": settings.openai_api_key}
+    client_kwargs = {
+        "api_key": settings.openai_api_key,
+        # Timeouts explícitos: un proveedor lento no puede retener un worker más de esto (por intento)
+        "timeout": httpx.Timeout(
+            settings.openai_read_timeout_seconds,
+            connect=settings.openai_connect_timeout_seconds,
+        ),
+        "max_retries": settings.openai_max_retries,
+    }
     if settings.openai_base_url:
         client_kwargs["base_url"] = settings.openai_base_url
     return OpenAI(**client_kwargs)
 
 
+def _is_provider_failure(exc: Exception) -> bool:
+    """Errors that say the provider is unhealthy (vs. a bad request of ours)."""
+    if isinstance(exc, APIConnectionError):  # incluye APITimeoutError
+        return True
+    if isinstance(exc, APIStatusError):
+        return exc.status_code >= 500 or exc.status_code == 429
+    return not isinstance(exc, (OpenAIError, HTTPException))
+
+
+class AICallGuard:
+    """
+    Per-process admission control for AI calls: at most ``max_concurrency`` calls
+    in flight (waiting up to ``queue_timeout`` seconds for a slot) and a circuit
+    breaker that skips the provider while it keeps failing. Rejected calls answer
+    with the fallback message instead of holding a worker.
+    """
+
+    def __init__(self, max_concurrency: int, queue_timeout: float, breaker: CircuitBreaker) -> None:
+        self.max_concurrency = max(max_concurrency, 1)
+        self.queue_timeout = queue_timeout
+        self.breaker = breaker
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._rejected_busy = 0
+        self._rejected_open = 0
+
+    def admit(self) -> Optional[BreakerTicket]:
+        """Take a slot and a breaker ticket; ``None`` when the call must not go out."""
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            with self._lock:
+                self._rejected_busy += 1
+            return None
+        ticket = self.breaker.allow()
+        if ticket is None:
+            self._slots.release()
+            with self._lock:
+                self._rejected_open += 1
+            return None
+        with self._lock:
+            self._in_flight += 1
+        return ticket
+
+    def release(self, ticket: BreakerTicket, healthy: Optional[bool]) -> None:
+        """Free the slot; ``healthy=None`` (call abandoned) tells the breaker nothing."""
+        if healthy is True:
+            self.breaker.record_success(ticket)
+        elif healthy is False:
+            self.breaker.record_failure(ticket)
+        else:
+            self.breaker.release(ticket)
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+    def stats(self) -> dict[str, object]:
+        with self._lock:
+            return {
+                "in_flight": self._in_flight,
+                "max_concurrency": self.max_concurrency,
+                "rejected_busy": self._rejected_busy,
+                "rejected_open": self._rejected_open,
+                "breaker": self.breaker.stats(),
+            }
+
+
+ai_call_guard = AICallGuard(
+    max_concurrency=settings.assistant_ai_max_concurrency,
+    queue_timeout=settings.assistant_ai_queue_timeout_seconds,
+    breaker=CircuitBreaker(
+        "openai",
+        failure_threshold=settings.assistant_ai_breaker_failures,
+        reset_seconds=settings.assistant_ai_breaker_reset_seconds,
+    ),
+)
+
+
 def _convert_messages(messages: Iterable[dict[str, str]]) -> list[dict[str, object]]:
     converted: list[dict[str, object]] = []
     for message in messages:
@@ -65,6 +155,11 @@ def _convert_messages(messages: Iterable[dict[str, str]]) -> list[dict[str, obje
     return converted
 
 
+def _build_system_text(messages: list[dict[str, str]]) -> str:
+    context_block = build_context_block(messages)
+    return f"{ASSISTANT_INSTRUCTIONS}\n\nContexto confirmado:\n{context_block}"
+
+
 def generate_ai_response(messages: list[dict[str, str]]) -> str:
     """
     Calls the OpenAI Responses API using the configured model and returns the assistant reply.
@@ -72,10 +167,37 @@ def generate_ai_response(messages: list[dict[str, str]]) -> str:
     if not _is_openai_configured():
         logger.warning("Asistente IA deshabilitado (falta OPENAI_API_KEY o se desactivó). Respondiendo fallback.")
         return FALLBACK_MESSAGE
+    ticket = ai_call_guard.admit()
+    if ticket is None:
+        logger.warning("Asistente IA saturado o circuito abierto. Respondiendo fallback.")
+        return FALLBACK_MESSAGE
+    healthy = True
+    try:
+        return _request_ai_response(messages)
+    except APIConnectionError:
+        healthy = False
+        logger.exception("Error al conectar con el proveedor de IA")
+        hint = (
+            " Revisá OPENAI_BASE_URL: usá una URL accesible desde el contenedor (o vacía para la API pública)."
+        )
+        logger.error("Fallo de conexión con IA. %s", hint)
+        return FALLBACK_MESSAGE
+    except OpenAIError as exc:
+        healthy = not _is_provider_failure(exc)
+        logger.exception("Error al consultar OpenAI")
+        return FALLBACK_MESSAGE
+    except Exception as exc:  # pragma: no cover - fallback for redacted errors
+        healthy = not _is_provider_failure(exc)
+        logger.exception("Error inesperado al consultar OpenAI")
+        return FALLBACK_MESSAGE
+    finally:
+        ai_call_guard.release(ticket, healthy)
+
+
+def _request_ai_response(messages: list[dict[str, str]]) -> str:
     client = _get_openai_client()
     payload_messages = _convert_messages(messages)
-    context_block = build_context_block(messages)
-    system_text = f"{ASSISTANT_INSTRUCTIONS}\n\nContexto confirmado:\n{context_block}"
+    system_text = _build_system_text(messages)
     system_block = {
         "role": "system",
         "content": [
@@ -85,56 +207,169 @@ def generate_ai_response(messages: list[dict[str, str]]) -> str:
             }
         ],
     }
+    if hasattr(client, "responses"):
+        response = client.responses.create(
+            model=settings.openai_model,
+            input=[
+                system_block,
+                *payload_messages,
+            ],
+        )
+        parts: list[str] = []
+        for item in response.output:
+            if item.type == "output_text":
+                parts.append(item.text)
+        if not parts:
+            raise HTTPException(status_code=502, detail="No se pudo generar la respuesta del asistente.")
+        return "".join(parts).strip()
+    # Fallback for older SDKs without Responses API
+    chat_messages = [
+        {"role": "system", "content": system_text},
+        *[
+            {"role": msg["role"], "content": msg["content"][0]["text"]}
+            for msg in payload_messages
+        ],
+    ]
+    response = client.chat.completions.create(
+        model=settings.openai_model,
+        messages=chat_messages,
+    )
+    choice = response.choices[0]
+    content = choice.message.content
+    if isinstance(content, list):
+        parts = []
+        for block in content:
+            text = block.get("text")
+            if text:
+                parts.append(text)
+        content = "".join(parts)
+    if not isinstance(content, str):
+        raise HTTPException(status_code=502, detail="Respuesta inválida del asistente.")
+    return content.strip()
+
+
+class AIStreamInterrupted(Exception):
+    """Raised by ``stream_ai_response`` when the model fails after text was already sent."""
+
+
+def stream_ai_response(
+    messages: list[dict[str, str]],
+    on_complete: Optional[Callable[[str], None]] = None,
+) -> Iterator[str]:
+    """
+    Same request as ``generate_ai_response`` but with ``stream=True``: yields text
+    deltas as the model produces them. Errors before the first delta yield the
+    fallback message; errors mid-stream raise ``AIStreamInterrupted`` once the
+    stream is cleaned up, so the caller never mistakes a partial answer for a whole one.
+    ``on_complete`` receives the full answer only when the model finished normally.
+    The concurrency slot is held until the stream ends or the client disconnects.
+    """
+    if not _is_openai_configured():
+        logger.warning("Asistente IA deshabilitado (falta OPENAI_API_KEY o se desactivó). Respondiendo fallback.")
+        yield FALLBACK_MESSAGE
+        return
+    ticket = ai_call_guard.admit()
+    if ticket is None:
+        logger.warning("Asistente IA saturado o circuito abierto. Respondiendo fallback.")
+        yield FALLBACK_MESSAGE
+        return
+    parts: list[str] = []
+    healthy: Optional[bool] = True
+    completed = False
     try:
+        client = _get_openai_client()
+        system_text = _build_system_text(messages)
         if hasattr(client, "responses"):
-            response = client.responses.create(
+            stream = client.responses.create(
                 model=settings.openai_model,
                 input=[
-                    system_block,
-                    *payload_messages,
+                    {"role": "system", "content": [{"type": "text", "text": system_text}]},
+                    *_convert_messages(messages),
                 ],
+                stream=True,
             )
-            parts: list[str] = []
-            for item in response.output:
-                if item.type == "output_text":
-                    parts.append(item.text)
-            if not parts:
-                raise HTTPException(status_code=502, detail="No se pudo generar la respuesta del asistente.")
-            return "".join(parts).strip()
-        # Fallback for older SDKs without Responses API
-        chat_messages = [
-            {"role": "system", "content": system_text},
-            *[
-                {"role": msg["role"], "content": msg["content"][0]["text"]}
-                for msg in payload_messages
-            ],
-        ]
-        response = client.chat.completions.create(
-            model=settings.openai_model,
-            messages=chat_messages,
-        )
-        choice = response.choices[0]
-        content = choice.message.content
-        if isinstance(content, list):
-            parts = []
-            for block in content:
-                text = block.get("text")
-                if text:
-                    parts.append(text)
-            content = "".join(parts)
-        if not isinstance(content, str):
-            raise HTTPException(status_code=502, detail="Respuesta inválida del asistente.")
-        return content.strip()
-    except APIConnectionError as exc:
-        logger.exception("Error al conectar con el proveedor de IA")
-        hint = (
-            " Revisá OPENAI_BASE_URL: usá una URL accesible desde el contenedor (o vacía para la API pública)."
-        )
-        logger.error("Fallo de conexión con IA. %s", hint)
-        return FALLBACK_MESSAGE
+            with stream:
+                for event in stream:
+                    if event.type == "response.output_text.delta" and event.delta:
+                        parts.append(event.delta)
+                        yield event.delta
+        else:
+            stream = client.chat.completions.create(
+                model=settings.openai_model,
+                messages=[
+                    {"role": "system", "content": system_text},
+                    *[{"role": msg["role"], "content": msg["content"]} for msg in messages],
+                ],
+                stream=True,
+            )
+            with stream:
+                for chunk in stream:
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        parts.append(delta)
+                        yield delta
+        completed = True
+        if parts and on_complete is not None:
+            on_complete("".join(parts).strip())
+    except GeneratorExit:
+        # El cliente se desconectó: el proveedor no llegó a responder ni a fallar
+        healthy = None
+        raise
+    except APIConnectionError:
+        healthy = False
+        logger.exception("Error al conectar con el proveedor de IA (streaming)")
     except OpenAIError as exc:
-        logger.exception("Error al consultar OpenAI")
-        return FALLBACK_MESSAGE
+        healthy = not _is_provider_failure(exc)
+        logger.exception("Error al consultar OpenAI (streaming)")
     except Exception as exc:  # pragma: no cover - fallback for redacted errors
-        logger.exception("Error inesperado al consultar OpenAI")
-        return FALLBACK_MESSAGE
+        healthy = not _is_provider_failure(exc)
+        logger.exception("Error inesperado al consultar OpenAI (streaming)")
+    finally:
+        ai_call_guard.release(ticket, healthy)
+    if not parts:
+        yield FALLBACK_MESSAGE
+    elif not completed:
+        raise AIStreamInterrupted()
+
+
+class StreamLatencyStats:
+    """Rolling time-to-first-token of the streaming endpoint, per answer source."""
+
+    def __init__(self, window: int = 500) -> None:
+        self._samples: dict[str, deque[float]] = {}
+        self._counts: dict[str, int] = {}
+        self._window = window
+        self._lock = threading.Lock()
+
+    def record(self, source: str, seconds: float) -> None:
+        with self._lock:
+            self._samples.setdefault(source, deque(maxlen=self._window)).append(seconds)
+            self._counts[source] = self._counts.get(source, 0) + 1
+
+    def snapshot(self) -> dict[str, dict[str, float]]:
+        with self._lock:
+            result = {}
+            for source, samples in self._samples.items():
+                ordered = sorted(samples)
+                result[source] = {
+                    "count": self._counts[source],
+                    "ttft_p50_ms": round(ordered[len(ordered) // 2] * 1000, 1),
+                    "ttft_p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 1),
+                }
+            return result
+
+
+stream_latency_stats = StreamLatencyStats()
+
+
+def timed_stream(chunks: Iterable[str], source: str, started: float) -> Iterator[tuple[str, float]]:
+    """Yield ``(chunk, seconds_since_started)`` and record the first chunk's latency."""
+    first = True
+    for chunk in chunks:
+        elapsed = time.perf_counter() - started
+        if first:
+            stream_latency_stats.record(source, elapsed)
+            first = False
+        yield chunk, elapsed
@@ -2,12 +2,9 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from typing import Optional
-import unicodedata
 
-
-def _normalize(text: str) -> str:
-    normalized = unicodedata.normalize("NFD", text.lower())
-    return "".join(ch for ch in normalized if unicodedata.category(ch) != "Mn")
+from services.phrase_matcher import PhraseMatcher
+from services.text_normalization import normalize_text
 
 
 def _personalize(text: str, user_name: Optional[str]) -> str:
@@ -21,9 +18,6 @@ class ScriptedRule:
     response_template: str
     next_intent: Optional[str] = None
 
-    def matches(self, normalized_text: str) -> bool:
-        return any(trigger in normalized_text for trigger in self.triggers)
-
 
 @dataclass(frozen=True)
 class MatchedResponse:
@@ -33,7 +27,8 @@ class MatchedResponse:
 
 _RULES: tuple[ScriptedRule, ...] = (
     ScriptedRule(
-        triggers=("quien sos", "quien eres", "quien sos?", "quien eres?", "que sos"),
+        # "quien sos"/"quien eres" en cualquier parte del mensaje: no hace falta otro chequeo
+        triggers=("quien sos", "quien eres", "que sos"),
         response_template=(
             "Soy la asistente virtual de ViajerosXP, una guía que vive dentro de la plataforma. "
             "Te cuento cómo usar cada sección, te recuerdo atajos y te aviso si algo todavía no está disponible. "
@@ -140,37 +135,39 @@ _RULES: tuple[ScriptedRule, ...] = (
 
 
 GREETING_KEYWORDS = ("hola", "buen dia", "buenas", "que tal", "hey")
+# Un saludo que además pregunta algo no se responde como saludo.
+_GREETING_BLOCKERS = ("gracias", "como", "publicar")
+_NOT_GREETING = -1
+
+# Todos los disparadores en un solo autómata; el orden de _RULES define la prioridad.
+_RULE_MATCHER: PhraseMatcher[int] = PhraseMatcher(
+    [(trigger, index) for index, rule in enumerate(_RULES) for trigger in rule.triggers]
+    + [(word, _NOT_GREETING) for word in _GREETING_BLOCKERS]
+)
 
 
 def match_scripted_response(message: str, user_name: Optional[str]) -> Optional[MatchedResponse]:
-    normalized = _normalize(message)
-    if _is_greeting(normalized):
+    normalized = normalize_text(message)
+    found = _RULE_MATCHER.find_all(normalized)
+    if _is_greeting(normalized, blocked=_NOT_GREETING in found):
         return MatchedResponse(
             message=_personalize(
                 "¡Hola {user}! Soy la asistente de ViajerosXP. Contame qué necesitás y te ayudo.",
                 user_name,
             )
         )
-    for rule in _RULES:
-        if rule.matches(normalized):
-            return MatchedResponse(
-                message=_personalize(rule.response_template, user_name),
-                next_intent=rule.next_intent,
-            )
-    if "quien sos" in normalized or "quien eres" in normalized:
+    rule_index = next((index for index in found if index != _NOT_GREETING), None)
+    if rule_index is not None:
+        rule = _RULES[rule_index]
         return MatchedResponse(
-            message=_personalize(
-                "Soy la guía virtual de ViajerosXP: traduzco la plataforma en pasos simples y te aviso qué está disponible.",
-                user_name,
-            )
+            message=_personalize(rule.response_template, user_name),
+            next_intent=rule.next_intent,
         )
     return None
 
 
-def _is_greeting(normalized: str) -> bool:
-    if not normalized:
-        return False
-    if any(word in normalized for word in ("gracias", "como", "publicar")):
+def _is_greeting(normalized: str, blocked: bool) -> bool:
+    if not normalized or blocked:
         return False
     return any(normalized.startswith(word) for word in GREETING_KEYWORDS) and len(normalized.split()) <= 4
 
@@ -182,12 +179,13 @@ CATEGORY_ALIASES = {
 }
 
 
+_CATEGORY_MATCHER: PhraseMatcher[str] = PhraseMatcher(
+    (normalize_text(keyword), category) for category, keywords in CATEGORY_ALIASES.items() for keyword in keywords
+)
+
+
 def detect_category_keyword(text: str) -> Optional[str]:
-    normalized = _normalize(text)
-    for category, keywords in CATEGORY_ALIASES.items():
-        if any(keyword in normalized for keyword in keywords):
-            return category
-    return None
+    return _CATEGORY_MATCHER.first(normalize_text(text))
 
 
 def get_category_label(category: str) -> str:
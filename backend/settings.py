@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import hashlib
+import hmac
 import os
 from functools import lru_cache
 from pathlib import Path
@@ -16,6 +18,19 @@ def _load_env() -> None:
         load_dotenv()
 
 
+def _hkdf_sha256(secret: str, label: str, length: int = 32) -> str:
+    # HKDF (RFC 5869) sin salt: clave independiente derivada de `secret` para el uso `label`
+    prk = hmac.new(b"\x00" * hashlib.sha256().digest_size, secret.encode("utf-8"), hashlib.sha256).digest()
+    output = b""
+    block = b""
+    counter = 1
+    while len(output) < length:
+        block = hmac.new(prk, block + label.encode("utf-8") + bytes([counter]), hashlib.sha256).digest()
+        output += block
+        counter += 1
+    return output[:length].hex()
+
+
 @lru_cache()
 def get_settings() -> "Settings":
     _load_env()
@@ -31,21 +46,73 @@ def get_settings() -> "Settings":
         mongodb_avatars_bucket=os.getenv("MONGODB_AVATARS_BUCKET", "user_avatars"),
         mongodb_place_photos_bucket=os.getenv("MONGODB_PLACE_PHOTOS_BUCKET", "place_photos"),
         mongodb_review_photos_bucket=os.getenv("MONGODB_REVIEW_PHOTOS_BUCKET", "review_photos"),
+        mongodb_max_pool_size=int(os.getenv("MONGODB_MAX_POOL_SIZE", "50")),
+        mongodb_min_pool_size=int(os.getenv("MONGODB_MIN_POOL_SIZE", "0")),
+        mongodb_server_selection_timeout_ms=int(os.getenv("MONGODB_SERVER_SELECTION_TIMEOUT_MS", "5000")),
+        mongodb_connect_timeout_ms=int(os.getenv("MONGODB_CONNECT_TIMEOUT_MS", "5000")),
+        mongodb_socket_timeout_ms=int(os.getenv("MONGODB_SOCKET_TIMEOUT_MS", "20000")),
+        mongodb_wait_queue_timeout_ms=int(os.getenv("MONGODB_WAIT_QUEUE_TIMEOUT_MS", "5000")),
         frontend_origin=os.getenv("FRONTEND_ORIGIN", "http://localhost:5173"),
         jwt_secret_key=os.getenv("JWT_SECRET_KEY", "your-secret-key-change-in-production"),
         jwt_algorithm=os.getenv("JWT_ALGORITHM", "HS256"),
         access_token_expire_minutes=int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "60")),
         # NUEVO: Agregar LocationIQ
         locationiq_api_key=os.getenv("LOCATIONIQ_API_KEY", ""),
+        locationiq_base_url=os.getenv("LOCATIONIQ_BASE_URL", "https://us1.locationiq.com/v1"),
+        locationiq_timeout_seconds=float(os.getenv("LOCATIONIQ_TIMEOUT_SECONDS", "5")),
+        locationiq_max_connections=int(os.getenv("LOCATIONIQ_MAX_CONNECTIONS", "10")),
+        locationiq_requests_per_second=float(os.getenv("LOCATIONIQ_REQUESTS_PER_SECOND", "5")),
+        locationiq_burst=int(os.getenv("LOCATIONIQ_BURST", "2")),
+        geocoding_cache_ttl_seconds=int(os.getenv("GEOCODING_CACHE_TTL_SECONDS", str(30 * 24 * 3600))),
+        geocoding_negative_cache_ttl_seconds=int(os.getenv("GEOCODING_NEGATIVE_CACHE_TTL_SECONDS", str(24 * 3600))),
+        geocoding_cache_lru_size=int(os.getenv("GEOCODING_CACHE_LRU_SIZE", "2048")),
+        gazetteer_path=Path(
+            os.getenv(
+                "GAZETTEER_PATH",
+                Path(__file__).resolve().parent / "data" / "gazetteer.json",
+            )
+        ),
         uploads_root=Path(
             os.getenv(
                 "UPLOADS_ROOT",
                 Path(__file__).resolve().parent / "uploads",
             )
         ),
+        photo_cache_max_bytes=int(os.getenv("PHOTO_CACHE_MAX_BYTES", str(512 * 1024 * 1024))),
+        photo_cache_max_entry_bytes=int(os.getenv("PHOTO_CACHE_MAX_ENTRY_BYTES", str(20 * 1024 * 1024))),
+        photo_storage_backend=os.getenv("PHOTO_STORAGE_BACKEND", "gridfs").strip().lower(),
+        photo_accel_redirect_prefix=os.getenv("PHOTO_ACCEL_REDIRECT_PREFIX", "").strip() or None,
+        photo_url_secret=os.getenv("PHOTO_URL_SECRET", ""),
+        photo_purge_batch_size=int(os.getenv("PHOTO_PURGE_BATCH_SIZE", "50")),
+        photo_purge_poll_seconds=float(os.getenv("PHOTO_PURGE_POLL_SECONDS", "30")),
+        photo_purge_max_attempts=int(os.getenv("PHOTO_PURGE_MAX_ATTEMPTS", "8")),
+        photo_upload_concurrency=int(os.getenv("PHOTO_UPLOAD_CONCURRENCY", "4")),
+        photo_max_file_bytes=int(os.getenv("PHOTO_MAX_FILE_BYTES", str(10 * 1024 * 1024))),
+        photo_max_request_bytes=int(os.getenv("PHOTO_MAX_REQUEST_BYTES", str(60 * 1024 * 1024))),
         openai_api_key=os.getenv("OPENAI_API_KEY", ""),
         openai_model=os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
         openai_base_url=_normalize_openai_base_url(raw_openai_base_url, allow_openai_localhost),
+        openai_connect_timeout_seconds=float(os.getenv("OPENAI_CONNECT_TIMEOUT_SECONDS", "3")),
+        openai_read_timeout_seconds=float(os.getenv("OPENAI_READ_TIMEOUT_SECONDS", "20")),
+        openai_max_retries=int(os.getenv("OPENAI_MAX_RETRIES", "1")),
+        assistant_ai_max_concurrency=int(os.getenv("ASSISTANT_AI_MAX_CONCURRENCY", "8")),
+        assistant_ai_queue_timeout_seconds=float(os.getenv("ASSISTANT_AI_QUEUE_TIMEOUT_SECONDS", "2")),
+        assistant_ai_breaker_failures=int(os.getenv("ASSISTANT_AI_BREAKER_FAILURES", "5")),
+        assistant_ai_breaker_reset_seconds=float(os.getenv("ASSISTANT_AI_BREAKER_RESET_SECONDS", "30")),
+        assistant_cache_ttl_seconds=int(os.getenv("ASSISTANT_CACHE_TTL_SECONDS", str(6 * 3600))),
+        assistant_cache_max_entries=int(os.getenv("ASSISTANT_CACHE_MAX_ENTRIES", "1000")),
+        assistant_conversation_backend=os.getenv("ASSISTANT_CONVERSATION_BACKEND", "memory").strip().lower(),
+        assistant_conversation_ttl_seconds=int(os.getenv("ASSISTANT_CONVERSATION_TTL_SECONDS", str(60 * 60 * 2))),
+        assistant_conversation_max_entries=int(os.getenv("ASSISTANT_CONVERSATION_MAX_ENTRIES", "10000")),
+        assistant_history_token_budget=int(os.getenv("ASSISTANT_HISTORY_TOKEN_BUDGET", "1200")),
+        rewards_index_ttl_seconds=int(os.getenv("REWARDS_INDEX_TTL_SECONDS", "300")),
+        metrics_token=os.getenv("METRICS_TOKEN", "").strip(),
+        assistant_knowledge_dir=Path(
+            os.getenv(
+                "ASSISTANT_KNOWLEDGE_DIR",
+                Path(__file__).resolve().parent / "data" / "knowledge",
+            )
+        ),
         # Configuración SMTP para notificaciones por correo
         smtp_host=os.getenv("SMTP_HOST", ""),
         smtp_port=int(os.getenv("SMTP_PORT", "587")),
@@ -94,15 +161,57 @@ class Settings:
         mongodb_avatars_bucket: str,
         mongodb_place_photos_bucket: str,
         mongodb_review_photos_bucket: str,
+        mongodb_max_pool_size: int,
+        mongodb_min_pool_size: int,
+        mongodb_server_selection_timeout_ms: int,
+        mongodb_connect_timeout_ms: int,
+        mongodb_socket_timeout_ms: int,
+        mongodb_wait_queue_timeout_ms: int,
         frontend_origin: str,
         jwt_secret_key: str,
         jwt_algorithm: str,
         access_token_expire_minutes: int,
         locationiq_api_key: str,  # NUEVO
+        locationiq_base_url: str,
+        locationiq_timeout_seconds: float,
+        locationiq_max_connections: int,
+        locationiq_requests_per_second: float,
+        locationiq_burst: int,
+        geocoding_cache_ttl_seconds: int,
+        geocoding_negative_cache_ttl_seconds: int,
+        geocoding_cache_lru_size: int,
+        gazetteer_path: Path,
         uploads_root: Path,
+        photo_cache_max_bytes: int,
+        photo_cache_max_entry_bytes: int,
+        photo_storage_backend: str,
+        photo_accel_redirect_prefix: str | None,
+        photo_url_secret: str,
+        photo_purge_batch_size: int,
+        photo_purge_poll_seconds: float,
+        photo_purge_max_attempts: int,
+        photo_upload_concurrency: int,
+        photo_max_file_bytes: int,
+        photo_max_request_bytes: int,
         openai_api_key: str,
         openai_model: str,
         openai_base_url: str | None,
+        openai_connect_timeout_seconds: float,
+        openai_read_timeout_seconds: float,
+        openai_max_retries: int,
+        assistant_ai_max_concurrency: int,
+        assistant_ai_queue_timeout_seconds: float,
+        assistant_ai_breaker_failures: int,
+        assistant_ai_breaker_reset_seconds: float,
+        assistant_cache_ttl_seconds: int,
+        assistant_cache_max_entries: int,
+        assistant_knowledge_dir: Path,
+        rewards_index_ttl_seconds: int,
+        assistant_conversation_backend: str,
+        assistant_conversation_ttl_seconds: int,
+        assistant_conversation_max_entries: int,
+        assistant_history_token_budget: int,
+        metrics_token: str,
         smtp_host: str,
         smtp_port: int,
         smtp_username: str,
@@ -116,15 +225,78 @@ class Settings:
         self.mongodb_avatars_bucket = mongodb_avatars_bucket
         self.mongodb_place_photos_bucket = mongodb_place_photos_bucket
         self.mongodb_review_photos_bucket = mongodb_review_photos_bucket
+        self.mongodb_max_pool_size = mongodb_max_pool_size
+        self.mongodb_min_pool_size = mongodb_min_pool_size
+        self.mongodb_server_selection_timeout_ms = mongodb_server_selection_timeout_ms
+        self.mongodb_connect_timeout_ms = mongodb_connect_timeout_ms
+        self.mongodb_socket_timeout_ms = mongodb_socket_timeout_ms
+        self.mongodb_wait_queue_timeout_ms = mongodb_wait_queue_timeout_ms
         self.frontend_origin = frontend_origin
         self.jwt_secret_key = jwt_secret_key
         self.jwt_algorithm = jwt_algorithm
         self.access_token_expire_minutes = access_token_expire_minutes
         self.locationiq_api_key = locationiq_api_key  # NUEVO
+        # Cliente async de LocationIQ: URL (apuntable a un mock local), timeout, pool keep-alive y rate limit compartido
+        self.locationiq_base_url = locationiq_base_url.rstrip("/")
+        self.locationiq_timeout_seconds = locationiq_timeout_seconds
+        self.locationiq_max_connections = locationiq_max_connections
+        self.locationiq_requests_per_second = locationiq_requests_per_second
+        self.locationiq_burst = locationiq_burst
+        # Caché de geocoding: tabla en Postgres con vencimiento más un LRU en memoria
+        self.geocoding_cache_ttl_seconds = geocoding_cache_ttl_seconds
+        self.geocoding_negative_cache_ttl_seconds = geocoding_negative_cache_ttl_seconds
+        self.geocoding_cache_lru_size = geocoding_cache_lru_size
+        # Países y ciudades para el autocomplete offline (sin llamar a LocationIQ)
+        self.gazetteer_path = gazetteer_path.expanduser().resolve()
         self.uploads_root = uploads_root.expanduser().resolve()
+        # Caché LRU en disco de fotos de GridFS (0 la deshabilita)
+        self.photo_cache_dir = self.uploads_root / "photo_cache"
+        self.photo_cache_max_bytes = photo_cache_max_bytes
+        self.photo_cache_max_entry_bytes = photo_cache_max_entry_bytes
+        # Backend de fotos ("gridfs" o "filesystem", este último bajo uploads_root/photos)
+        self.photo_storage_backend = photo_storage_backend
+        self.photo_storage_dir = self.uploads_root / "photos"
+        # Si hay un proxy (nginx) delante, le delega el envío de archivos locales con sendfile
+        self.photo_accel_redirect_prefix = photo_accel_redirect_prefix
+        # Clave HMAC de las URLs firmadas de fotos; sin PHOTO_URL_SECRET se deriva del JWT con
+        # HKDF, así una firma de foto nunca sirve como material de la clave de los tokens
+        self.photo_url_secret = photo_url_secret or _hkdf_sha256(jwt_secret_key, "viajerosxp photo url signing v1")
+        # Cola de borrado de fotos procesada en segundo plano
+        self.photo_purge_batch_size = max(1, photo_purge_batch_size)
+        self.photo_purge_poll_seconds = photo_purge_poll_seconds
+        self.photo_purge_max_attempts = photo_purge_max_attempts
+        # Subida de fotos: escrituras concurrentes a GridFS y límites de tamaño
+        self.photo_upload_concurrency = max(1, photo_upload_concurrency)
+        self.photo_max_file_bytes = photo_max_file_bytes
+        self.photo_max_request_bytes = photo_max_request_bytes
         self.openai_api_key = openai_api_key
         self.openai_model = openai_model
         self.openai_base_url = openai_base_url
+        # Timeouts y reintentos del cliente de OpenAI (por intento)
+        self.openai_connect_timeout_seconds = openai_connect_timeout_seconds
+        self.openai_read_timeout_seconds = openai_read_timeout_seconds
+        self.openai_max_retries = openai_max_retries
+        # Llamadas a la IA en paralelo por proceso y espera máxima por un lugar libre
+        self.assistant_ai_max_concurrency = assistant_ai_max_concurrency
+        self.assistant_ai_queue_timeout_seconds = assistant_ai_queue_timeout_seconds
+        # Circuit breaker: fallas seguidas para abrirlo y segundos hasta volver a probar
+        self.assistant_ai_breaker_failures = assistant_ai_breaker_failures
+        self.assistant_ai_breaker_reset_seconds = assistant_ai_breaker_reset_seconds
+        # Caché de respuestas de la IA (misma pregunta normalizada y mismo contexto)
+        self.assistant_cache_ttl_seconds = assistant_cache_ttl_seconds
+        self.assistant_cache_max_entries = assistant_cache_max_entries
+        # Base de conocimiento del asistente (*.json / *.jsonl), indexada al arrancar
+        self.assistant_knowledge_dir = assistant_knowledge_dir.expanduser().resolve()
+        # Índice de retos/recompensas del asistente: se recarga al cambiar o cada N segundos
+        self.rewards_index_ttl_seconds = rewards_index_ttl_seconds
+        # Conversaciones del asistente guardadas en el servidor ("memory" o "postgres")
+        self.assistant_conversation_backend = assistant_conversation_backend
+        self.assistant_conversation_ttl_seconds = assistant_conversation_ttl_seconds
+        self.assistant_conversation_max_entries = assistant_conversation_max_entries
+        # Tokens (estimados) de historial que se mandan a la IA en cada turno
+        self.assistant_history_token_budget = assistant_history_token_budget
+        # Token (Authorization: Bearer) para /api/metrics; vacío deshabilita el endpoint
+        self.metrics_token = metrics_token
         self.smtp_host = smtp_host
         self.smtp_port = smtp_port
         self.smtp_username = smtp_username
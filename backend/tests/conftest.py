@@ -0,0 +1,69 @@
+"""
+Configuración común de los tests: corren sin Postgres, Mongo ni red. Las fotos van al
+backend de archivos dentro de un directorio temporal y LocationIQ se reemplaza por
+mock_locationiq servido en proceso (httpx.ASGITransport).
+"""
+from __future__ import annotations
+
+import os
+import tempfile
+
+# Antes de importar settings: get_settings() se cachea la primera vez que se llama.
+_UPLOADS_ROOT = tempfile.mkdtemp(prefix="viajerosxp-tests-")
+os.environ.update(
+    {
+        "DATABASE_URL": "sqlite://",
+        "UPLOADS_ROOT": _UPLOADS_ROOT,
+        "PHOTO_STORAGE_BACKEND": "filesystem",
+        "PHOTO_URL_SECRET": "test-photo-secret",
+        "LOCATIONIQ_API_KEY": "test",
+        "LOCATIONIQ_BASE_URL": "http://locationiq.test/v1",
+        "LOCATIONIQ_REQUESTS_PER_SECOND": "1000",
+        "LOCATIONIQ_BURST": "100",
+    }
+)
+
+import httpx  # noqa: E402
+import pytest  # noqa: E402
+
+import geocoding  # noqa: E402
+from mock_locationiq import build_app  # noqa: E402
+from services.geocoding_cache import GeocodingCache  # noqa: E402
+
+
+class _DatabaseDown:
+    """SessionLocal de reemplazo: la caché de geocoding toma los errores como misses."""
+
+    def __call__(self):
+        raise RuntimeError("sin base de datos en los tests")
+
+
+@pytest.fixture
+def geocoding_cache(monkeypatch) -> GeocodingCache:
+    """Caché en memoria (la tabla de Postgres no existe en los tests)."""
+    monkeypatch.setattr("services.geocoding_cache.SessionLocal", _DatabaseDown())
+    cache = GeocodingCache(ttl_seconds=3600, negative_ttl_seconds=600, lru_size=100)
+    monkeypatch.setattr(geocoding, "get_geocoding_cache", lambda: cache)
+    return cache
+
+
+@pytest.fixture
+def make_locationiq_client(geocoding_cache):
+    """
+    Fábrica de ``(cliente, stats)``: cada cliente habla con su propia instancia del mock
+    por ASGI, sin red (``latency_ms`` y ``rate_limit`` se pasan al mock), y ``stats()``
+    devuelve los contadores del mock (requests que le llegaron).
+    """
+
+    def factory(latency_ms: float = 0, rate_limit: float = 0):
+        transport = httpx.ASGITransport(app=build_app(latency_ms=latency_ms, rate_limit=rate_limit))
+        client = geocoding.LocationIQClient()
+        client._http = httpx.AsyncClient(transport=transport, base_url=client.base_url, timeout=client.timeout)
+
+        async def stats() -> dict:
+            async with httpx.AsyncClient(transport=transport, base_url="http://mock") as http:
+                return (await http.get("/stats")).json()
+
+        return client, stats
+
+    return factory
@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import pytest
+
+from services import assistant_response_cache
+from services.assistant_response_cache import AssistantResponseCache, normalize_question
+
+
+def _messages(question: str) -> list[dict[str, str]]:
+    return [{"role": "assistant", "content": "¡Hola! ¿En qué te ayudo?"}, {"role": "user", "content": question}]
+
+
+@pytest.mark.parametrize(
+    "first, second",
+    [
+        ("¿Cómo publico una reseña?", "como escribo una resena"),
+        ("¿Cómo BORRO mis fotos?", "como elimino mi foto"),
+        ("Hola, quiero saber cómo edito mi perfil", "¿Cómo modifico mi perfil?"),
+    ],
+)
+def test_equivalent_questions_normalize_alike(first, second):
+    assert normalize_question(first) == normalize_question(second)
+
+
+@pytest.mark.parametrize(
+    "first, second",
+    [
+        ("¿Cómo dejo de recibir mails?", "¿Cómo hago para recibir mails?"),
+        ("¿Cómo dejo de recibir mails?", "¿Cómo recibo mails?"),
+        ("¿Cómo dejo una reseña?", "¿Cómo publico una reseña?"),
+        ("¿Cómo creo una cuenta?", "¿Cómo borro una cuenta?"),
+        ("¿Cómo hago una reserva?", "¿Cómo cambio una reserva?"),
+        ("¿Cómo veo mis fotos?", "¿Por qué no veo mis fotos?"),
+    ],
+)
+def test_different_questions_do_not_collide(first, second):
+    assert normalize_question(first) != normalize_question(second)
+
+
+def test_negated_question_keeps_its_negation():
+    assert normalize_question("¿Cómo dejo de recibir mails?") == "dejo de recibir mail"
+
+
+def test_word_order_and_content_still_matter():
+    assert normalize_question("¿Cómo busco hoteles?") != normalize_question("¿Cómo busco restaurantes?")
+    assert normalize_question("reseña de perfil") != normalize_question("perfil de reseña")
+    assert normalize_question("¿¡hola!?") == ""
+
+
+def test_key_depends_on_the_question():
+    same = AssistantResponseCache.key_for(_messages("¿Cómo publico una reseña?"))
+    assert same == AssistantResponseCache.key_for(_messages("hola, como PUBLICO una resena"))
+    assert same != AssistantResponseCache.key_for(_messages("¿Cómo borro mi cuenta?"))
+    assert AssistantResponseCache.key_for(_messages("¿?")) is None
+
+
+def test_key_includes_the_selected_context(monkeypatch):
+    messages = _messages("¿Cómo publico una reseña?")
+    before = AssistantResponseCache.key_for(messages)
+
+    monkeypatch.setattr(assistant_response_cache, "select_context_chunks", lambda messages: [])
+    assert AssistantResponseCache.key_for(messages) != before
+
+
+def test_hits_misses_and_eviction():
+    cache = AssistantResponseCache(ttl_seconds=60, max_entries=2)
+    assert cache.get("a") is None
+    cache.set("a", "respuesta a")
+    cache.set("b", "respuesta b")
+    assert cache.get("a") == "respuesta a"
+    cache.set("c", "respuesta c")
+
+    assert cache.get("b") is None
+    assert cache.get("c") == "respuesta c"
+    assert cache.stats() == {"entries": 2, "hits": 2, "misses": 2, "evictions": 1, "hit_ratio": 0.5}
+
+
+def test_entries_expire(monkeypatch):
+    cache = AssistantResponseCache(ttl_seconds=10, max_entries=5)
+    now = assistant_response_cache.time.monotonic()
+    cache.set("a", "respuesta")
+
+    monkeypatch.setattr(assistant_response_cache.time, "monotonic", lambda: now + 11)
+    assert cache.get("a") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_empty_answers_and_missing_keys_are_not_cached():
+    cache = AssistantResponseCache(ttl_seconds=60, max_entries=5)
+    cache.set("a", "")
+    cache.set(None, "respuesta")
+    assert cache.get("a") is None
+    assert cache.get(None) is None
+    assert cache.stats()["entries"] == 0
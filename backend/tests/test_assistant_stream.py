@@ -0,0 +1,220 @@
+from __future__ import annotations
+
+import json
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+from openai import APIConnectionError
+
+import main
+from auth import get_optional_user
+from database import get_session
+from services import virtual_assistant_ai
+from services.assistant_response_cache import AssistantResponseCache
+from services.circuit_breaker import CircuitBreaker
+from services.conversation_store import MemoryConversationStore
+from services.virtual_assistant_ai import FALLBACK_MESSAGE, AIStreamInterrupted, stream_ai_response
+
+_PAYLOAD = {"messages": [{"role": "user", "content": "¿Qué puedo hacer en la app?"}]}
+
+
+@pytest.fixture
+def answer_cache(monkeypatch) -> AssistantResponseCache:
+    cache = AssistantResponseCache(ttl_seconds=60, max_entries=10)
+    monkeypatch.setattr(main, "get_assistant_response_cache", lambda: cache)
+    return cache
+
+
+@pytest.fixture
+def conversations(monkeypatch) -> MemoryConversationStore:
+    store = MemoryConversationStore(ttl_seconds=60, max_entries=10)
+    monkeypatch.setattr(main, "get_conversation_store", lambda: store)
+    return store
+
+
+@pytest.fixture
+def client(monkeypatch, answer_cache, conversations):
+    main.app.dependency_overrides[get_session] = lambda: None
+    main.app.dependency_overrides[get_optional_user] = lambda: None
+    monkeypatch.setattr(main, "_answer_without_ai", lambda payload, db, user: None)
+    yield TestClient(main.app)
+    main.app.dependency_overrides.clear()
+
+
+def _events(response) -> list[tuple[str, dict]]:
+    events = []
+    for block in response.text.strip().split("\n\n"):
+        event_line, data_line = block.split("\n")
+        events.append((event_line.removeprefix("event: "), json.loads(data_line.removeprefix("data: "))))
+    return events
+
+
+def test_deltas_come_before_done(client, monkeypatch):
+    monkeypatch.setattr(main, "is_ai_enabled", lambda: True)
+    monkeypatch.setattr(main, "stream_ai_response", lambda messages, on_complete=None: iter(["Podés ", "publicar ", "lugares."]))
+
+    response = client.post("/api/chatbot/ai/respond/stream", json=_PAYLOAD)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert response.headers["x-accel-buffering"] == "no"
+    events = _events(response)
+    assert [name for name, _ in events] == ["delta", "delta", "delta", "done"]
+    assert [data["text"] for _, data in events[:-1]] == ["Podés ", "publicar ", "lugares."]
+    done = events[-1][1]
+    assert (done["message"], done["source"], done["state"]) == ("Podés publicar lugares.", "ai", None)
+    assert done["total_ms"] >= done["ttft_ms"] >= 0
+
+
+def test_done_saves_the_turn(client, conversations, monkeypatch):
+    monkeypatch.setattr(main, "is_ai_enabled", lambda: True)
+    monkeypatch.setattr(main, "stream_ai_response", lambda messages, on_complete=None: iter(["Desde ", "tu perfil."]))
+
+    done = _events(client.post("/api/chatbot/ai/respond/stream", json=_PAYLOAD))[-1][1]
+
+    saved = conversations.get(done["conversation_id"])
+    assert saved.messages == [*_PAYLOAD["messages"], {"role": "assistant", "content": "Desde tu perfil."}]
+
+
+def test_interrupted_answer_sends_error_and_is_not_saved(client, conversations, monkeypatch):
+    def stream(messages, on_complete=None):
+        yield "Desde "
+        raise AIStreamInterrupted()
+
+    monkeypatch.setattr(main, "is_ai_enabled", lambda: True)
+    monkeypatch.setattr(main, "stream_ai_response", stream)
+
+    events = _events(client.post("/api/chatbot/ai/respond/stream", json=_PAYLOAD))
+
+    assert [name for name, _ in events] == ["delta", "error"]
+    conversation_id = events[-1][1]["conversation_id"]
+    assert conversations.get(conversation_id) is None
+
+
+def test_completed_answers_are_served_from_the_cache(client, monkeypatch):
+    def stream(messages, on_complete=None):
+        yield "Desde tu perfil."
+        on_complete("Desde tu perfil.")
+
+    monkeypatch.setattr(main, "is_ai_enabled", lambda: True)
+    monkeypatch.setattr(main, "stream_ai_response", stream)
+
+    first = _events(client.post("/api/chatbot/ai/respond/stream", json=_PAYLOAD))
+    second = _events(client.post("/api/chatbot/ai/respond/stream", json=_PAYLOAD))
+
+    assert first[-1][1]["source"] == "ai"
+    assert second == [("delta", {"text": "Desde tu perfil."}), ("done", second[-1][1])]
+    assert second[-1][1]["source"] == "cache"
+
+
+def test_guided_answers_are_a_single_delta(client, monkeypatch):
+    guided = main.ChatbotAIResponse(message="Elegí una categoría.")
+    monkeypatch.setattr(main, "_answer_without_ai", lambda payload, db, user: guided)
+
+    events = _events(client.post("/api/chatbot/ai/respond/stream", json=_PAYLOAD))
+
+    assert events[0] == ("delta", {"text": "Elegí una categoría."})
+    assert (events[1][0], events[1][1]["source"]) == ("done", "scripted")
+
+
+def test_fallback_without_ai(client, monkeypatch):
+    monkeypatch.setattr(main, "is_ai_enabled", lambda: False)
+
+    events = _events(client.post("/api/chatbot/ai/respond/stream", json=_PAYLOAD))
+
+    assert [name for name, _ in events] == ["delta", "done"]
+    assert events[1][1]["message"] == FALLBACK_MESSAGE
+    assert events[1][1]["source"] == "fallback"
+    assert "fallback" in virtual_assistant_ai.stream_latency_stats.snapshot()
+
+
+class _Stream:
+    def __init__(self, events, error=None) -> None:
+        self._events = events
+        self._error = error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def __iter__(self):
+        yield from self._events
+        if self._error is not None:
+            raise self._error
+
+
+def _delta(text: str):
+    return SimpleNamespace(type="response.output_text.delta", delta=text)
+
+
+@pytest.fixture
+def openai_stream(monkeypatch):
+    """Reemplaza el cliente de OpenAI; el test define qué devuelve ``responses.create``."""
+    holder = {}
+    fake = SimpleNamespace(responses=SimpleNamespace(create=lambda **kwargs: holder["stream"]))
+    monkeypatch.setattr(virtual_assistant_ai, "_is_openai_configured", lambda: True)
+    monkeypatch.setattr(virtual_assistant_ai, "_get_openai_client", lambda: fake)
+    guard = virtual_assistant_ai.AICallGuard(2, 0.1, CircuitBreaker("openai", failure_threshold=5, reset_seconds=30))
+    monkeypatch.setattr(virtual_assistant_ai, "ai_call_guard", guard)
+    holder["guard"] = guard
+    return holder
+
+
+def test_stream_relays_text_deltas(openai_stream):
+    done = SimpleNamespace(type="response.completed", delta=None)
+    openai_stream["stream"] = _Stream([_delta("Ho"), _delta("la"), done])
+    completed = []
+
+    assert list(stream_ai_response(_PAYLOAD["messages"], on_complete=completed.append)) == ["Ho", "la"]
+    assert completed == ["Hola"]
+
+
+def test_error_before_the_first_delta_yields_the_fallback(openai_stream):
+    openai_stream["stream"] = _Stream([], error=APIConnectionError(request=None))
+
+    assert list(stream_ai_response(_PAYLOAD["messages"])) == [FALLBACK_MESSAGE]
+    assert openai_stream["guard"].stats()["breaker"]["consecutive_failures"] == 1
+
+
+def test_error_mid_stream_is_reported_after_what_was_sent(openai_stream):
+    openai_stream["stream"] = _Stream([_delta("Hola")], error=RuntimeError("se cortó"))
+    completed = []
+    received = []
+
+    with pytest.raises(AIStreamInterrupted):
+        for chunk in stream_ai_response(_PAYLOAD["messages"], on_complete=completed.append):
+            received.append(chunk)
+
+    assert received == ["Hola"]
+    # Una respuesta cortada no se cachea y el lugar queda libre.
+    assert completed == []
+    assert openai_stream["guard"].stats()["in_flight"] == 0
+
+
+def test_stream_holds_a_slot_until_it_ends(openai_stream):
+    openai_stream["stream"] = _Stream([_delta("Ho"), _delta("la")])
+    guard = openai_stream["guard"]
+
+    stream = stream_ai_response(_PAYLOAD["messages"])
+    assert next(stream) == "Ho"
+    assert guard.stats()["in_flight"] == 1
+    assert list(stream) == ["la"]
+    assert guard.stats()["in_flight"] == 0
+    assert guard.breaker.stats()["consecutive_failures"] == 0
+
+
+def test_abandoned_stream_reports_no_outcome(openai_stream):
+    openai_stream["stream"] = _Stream([_delta("Ho"), _delta("la")])
+    guard = openai_stream["guard"]
+    guard.breaker.record_failure(guard.breaker.allow())
+
+    stream = stream_ai_response(_PAYLOAD["messages"])
+    assert next(stream) == "Ho"
+    stream.close()
+
+    # La desconexión libera el lugar sin contar como éxito ni como falla.
+    assert guard.stats()["in_flight"] == 0
+    assert guard.breaker.stats()["consecutive_failures"] == 1
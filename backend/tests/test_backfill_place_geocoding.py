@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import asyncio
+import json
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+import backfill_place_geocoding as backfill_module
+from models import Place
+
+
+@pytest.fixture
+def session_factory(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'places.db'}")
+    Place.__table__.create(engine)
+    factory = sessionmaker(bind=engine, autoflush=False, future=True)
+    monkeypatch.setattr(backfill_module, "SessionLocal", factory)
+    return factory
+
+
+@pytest.fixture
+def assigned(monkeypatch) -> list[int]:
+    # place_locations usa INSERT ... ON CONFLICT de Postgres; acá solo se registra.
+    calls: list[int] = []
+    monkeypatch.setattr(backfill_module, "assign_place_locations", lambda db, place_id, *_: calls.append(place_id))
+    return calls
+
+
+@pytest.fixture
+def run(make_locationiq_client, monkeypatch, tmp_path):
+    checkpoint = tmp_path / "geocode.checkpoint"
+
+    def run_backfill(limit=None, dry_run=False, batch_size=2):
+        client, mock_stats = make_locationiq_client()
+        monkeypatch.setattr(backfill_module, "locationiq_client", client)
+        stats = asyncio.run(backfill_module.backfill(checkpoint, batch_size, 2, 0, limit, dry_run))
+        requests = asyncio.run(mock_stats())["requests"]
+        return stats, requests
+
+    run_backfill.checkpoint = checkpoint
+    return run_backfill
+
+
+def _add_places(factory, *places: dict) -> None:
+    with factory() as db:
+        for values in places:
+            db.add(Place(owner_id=1, name=f"Lugar {values['id']}", **values))
+        db.commit()
+
+
+def _pending(place_id: int, city: str = "Rosario") -> dict:
+    return {"id": place_id, "street": "San Martín", "street_number": str(place_id), "city_state": city, "country": "Argentina"}
+
+
+def test_fills_coordinates_and_filters(session_factory, assigned, run):
+    _add_places(session_factory, _pending(1), _pending(2, "Mendoza"))
+
+    stats, requests = run()
+
+    assert (stats["scanned"], stats["updated"], requests) == (2, 2, 2)
+    with session_factory() as db:
+        places = db.scalars(select(Place).order_by(Place.id)).all()
+    assert all(place.latitude is not None and place.longitude is not None for place in places)
+    assert [place.country_filter for place in places] == ["Argentina", "Argentina"]
+    assert assigned == [1, 2]
+    assert json.loads(run.checkpoint.read_text()) == {"last_id": 2}
+
+
+def test_skips_complete_places_and_keeps_existing_coordinates(session_factory, assigned, run):
+    complete = {
+        "id": 1,
+        "latitude": 1.5,
+        "longitude": 2.5,
+        "country_filter": "Argentina",
+        "city_state_filter": "Rosario",
+        "street_filter": "San Martín",
+    }
+    without_filters = {**_pending(2), "latitude": -31.0, "longitude": -64.0}
+    _add_places(session_factory, complete, without_filters, {"id": 3})
+
+    stats, requests = run()
+
+    # El lugar completo ni se lee; el que no tiene dirección no llama a LocationIQ.
+    assert (stats["scanned"], stats["updated"], stats["not_found"], requests) == (2, 1, 1, 1)
+    with session_factory() as db:
+        kept = db.get(Place, 2)
+    assert (kept.latitude, kept.longitude) == (-31.0, -64.0)
+    assert kept.street_filter is not None
+
+
+def test_resumes_from_the_checkpoint(session_factory, assigned, run):
+    _add_places(session_factory, *(_pending(place_id) for place_id in range(1, 6)))
+
+    first, first_requests = run(limit=2)
+    assert (first["scanned"], first_requests) == (2, 2)
+    assert json.loads(run.checkpoint.read_text()) == {"last_id": 2}
+
+    # Se pierden las coordenadas del lugar 1: al retomar no se vuelve a mirar.
+    with session_factory() as db:
+        db.get(Place, 1).latitude = None
+        db.commit()
+
+    second, second_requests = run()
+    assert (second["scanned"], second_requests) == (3, 3)
+    assert json.loads(run.checkpoint.read_text()) == {"last_id": 5}
+    assert assigned == [1, 2, 3, 4, 5]
+    with session_factory() as db:
+        assert db.get(Place, 1).latitude is None
+
+
+def test_dry_run_writes_nothing(session_factory, assigned, run):
+    _add_places(session_factory, _pending(1))
+
+    stats, requests = run(dry_run=True)
+
+    assert (stats["updated"], requests) == (1, 1)
+    assert not run.checkpoint.exists()
+    assert assigned == []
+    with session_factory() as db:
+        assert db.get(Place, 1).latitude is None
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+import backfill_signed_photo_urls as backfill_module
+from models import Place, PlacePhoto
+from services.photo_urls import signed_photo_url
+
+_BASE_URL = "https://api.test/"
+_FILE_ID = "65f0c0ffee0000000000beef"
+
+
+@pytest.fixture
+def session_factory(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'photos.db'}")
+    Place.__table__.create(engine)
+    PlacePhoto.__table__.create(engine)
+    factory = sessionmaker(bind=engine, autoflush=False, future=True)
+    monkeypatch.setattr(backfill_module, "SessionLocal", factory)
+    with factory() as db:
+        db.add_all(
+            [
+                PlacePhoto(id=1, place_id=1, url=f"{_BASE_URL}api/places/1/photos/1", photo_file_id=_FILE_ID),
+                PlacePhoto(id=2, place_id=1, url=signed_photo_url(_BASE_URL, "places", _FILE_ID), photo_file_id=_FILE_ID),
+                PlacePhoto(id=3, place_id=1, url="https://cdn.externo/foto.jpg", photo_file_id=None),
+            ]
+        )
+        db.commit()
+    return factory
+
+
+def _urls(factory) -> dict[int, str]:
+    with factory() as db:
+        return dict(db.execute(select(PlacePhoto.id, PlacePhoto.url)).all())
+
+
+def test_rewrites_only_stored_photos_with_a_stale_url(session_factory):
+    before = _urls(session_factory)
+
+    scanned, rewritten = backfill_module.backfill_table(
+        PlacePhoto, PlacePhoto.url, "places", _BASE_URL, batch_size=1, dry_run=False
+    )
+
+    assert (scanned, rewritten) == (2, 1)
+    after = _urls(session_factory)
+    assert after[1] == after[2] == signed_photo_url(_BASE_URL, "places", _FILE_ID)
+    # Las URLs externas (sin archivo propio) no se tocan.
+    assert after[3] == before[3]
+    # Una segunda corrida no encuentra nada para cambiar.
+    assert backfill_module.backfill_table(PlacePhoto, PlacePhoto.url, "places", _BASE_URL, 1, False) == (2, 0)
+
+
+def test_dry_run_only_counts(session_factory):
+    before = _urls(session_factory)
+
+    assert backfill_module.backfill_table(PlacePhoto, PlacePhoto.url, "places", _BASE_URL, 10, True) == (2, 1)
+    assert _urls(session_factory) == before
@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import threading
+
+import pytest
+from openai import APIConnectionError
+
+from services import circuit_breaker, virtual_assistant_ai
+from services.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from services.virtual_assistant_ai import FALLBACK_MESSAGE, AICallGuard
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Reloj monotónico manual para el breaker."""
+    now = {"value": 1000.0}
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", lambda: now["value"])
+
+    def advance(seconds: float) -> None:
+        now["value"] += seconds
+
+    return advance
+
+
+def test_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker("test", failure_threshold=3, reset_seconds=10)
+    for _ in range(2):
+        breaker.record_failure(breaker.allow())
+    breaker.record_success(breaker.allow())
+    assert breaker.stats()["consecutive_failures"] == 0
+
+    for _ in range(3):
+        ticket = breaker.allow()
+        assert ticket is not None and not ticket.probe
+        breaker.record_failure(ticket)
+
+    assert breaker.state == OPEN
+    assert breaker.allow() is None
+    stats = breaker.stats()
+    assert (stats["times_opened"], stats["rejected"], stats["retry_in_seconds"]) == (1, 1, 10.0)
+
+
+def test_half_open_admits_a_single_probe(clock):
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_seconds=10)
+    breaker.record_failure(breaker.allow())
+
+    clock(10)
+    assert breaker.state == HALF_OPEN
+    probe = breaker.allow()
+    assert probe.probe
+    assert breaker.allow() is None
+
+    breaker.record_success(probe)
+    assert breaker.state == CLOSED
+    assert breaker.allow() and breaker.allow()
+
+
+def test_failed_probe_reopens(clock):
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_seconds=10)
+    for _ in range(2):
+        breaker.record_failure(breaker.allow())
+
+    clock(10)
+    breaker.record_failure(breaker.allow())
+
+    assert breaker.state == OPEN
+    assert breaker.stats()["times_opened"] == 2
+    clock(9)
+    assert breaker.allow() is None
+    clock(1)
+    assert breaker.allow().probe
+
+
+def test_released_probe_lets_the_next_one_through(clock):
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_seconds=10)
+    breaker.record_failure(breaker.allow())
+
+    clock(10)
+    breaker.release(breaker.allow())
+
+    # Sin resultado el breaker sigue semiabierto, pero admite otra prueba.
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow().probe
+    assert breaker.allow() is None
+
+
+def test_only_the_probe_moves_a_half_open_breaker(clock):
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_seconds=10)
+    slow_success, slow_failure, slow_released = breaker.allow(), breaker.allow(), breaker.allow()
+    for _ in range(2):
+        breaker.record_failure(breaker.allow())
+
+    # Llamadas admitidas antes de abrir que terminan con el circuito abierto no cuentan.
+    breaker.record_success(slow_success)
+    assert breaker.state == OPEN
+
+    clock(10)
+    probe = breaker.allow()
+    breaker.record_failure(slow_failure)
+    breaker.release(slow_released)
+    assert breaker.state == HALF_OPEN
+    assert breaker.stats()["times_opened"] == 1
+    # El lugar de la prueba sigue ocupado: release() de otra llamada no lo libera.
+    assert breaker.allow() is None
+
+    breaker.record_success(probe)
+    assert breaker.state == CLOSED
+    assert breaker.stats()["consecutive_failures"] == 0
+
+
+def test_guard_rejects_when_saturated():
+    guard = AICallGuard(1, 0.01, CircuitBreaker("test", failure_threshold=5, reset_seconds=10))
+
+    ticket = guard.admit()
+    assert ticket is not None
+    assert guard.admit() is None
+    guard.release(ticket, healthy=True)
+    guard.release(guard.admit(), healthy=True)
+
+    stats = guard.stats()
+    assert (stats["in_flight"], stats["rejected_busy"], stats["rejected_open"]) == (0, 1, 0)
+
+
+def test_guard_rejects_while_open_and_frees_the_slot():
+    guard = AICallGuard(1, 0.01, CircuitBreaker("test", failure_threshold=1, reset_seconds=60))
+    guard.release(guard.admit(), healthy=False)
+
+    assert guard.admit() is None
+    assert guard.stats()["rejected_open"] == 1
+    # El rechazo no se quedó con el único lugar.
+    assert guard._slots.acquire(timeout=0.01)
+
+
+def test_generate_answers_the_fallback_while_the_provider_fails(monkeypatch):
+    guard = AICallGuard(2, 0.01, CircuitBreaker("openai", failure_threshold=2, reset_seconds=60))
+    calls = []
+
+    def failing_request(messages):
+        calls.append(messages)
+        raise APIConnectionError(request=None)
+
+    monkeypatch.setattr(virtual_assistant_ai, "ai_call_guard", guard)
+    monkeypatch.setattr(virtual_assistant_ai, "_is_openai_configured", lambda: True)
+    monkeypatch.setattr(virtual_assistant_ai, "_request_ai_response", failing_request)
+    messages = [{"role": "user", "content": "hola"}]
+
+    answers = [virtual_assistant_ai.generate_ai_response(messages) for _ in range(4)]
+
+    assert answers == [FALLBACK_MESSAGE] * 4
+    # Con el circuito abierto ya no se llama al proveedor.
+    assert len(calls) == 2
+    assert guard.stats()["breaker"]["state"] == OPEN
+
+
+def test_concurrent_callers_share_the_limit():
+    guard = AICallGuard(2, 0.05, CircuitBreaker("test", failure_threshold=5, reset_seconds=10))
+    barrier = threading.Barrier(4)
+    admitted = []
+
+    def call():
+        barrier.wait()
+        admitted.append(guard.admit() is not None)
+
+    threads = [threading.Thread(target=call) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(admitted) == [False, False, True, True]
@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from auth import get_optional_user
+from database import get_session
+from services import conversation_store
+from services.conversation_store import Conversation, MemoryConversationStore, estimate_tokens, trim_to_budget
+
+
+def _message(role: str, length: int) -> dict[str, str]:
+    return {"role": role, "content": "x" * length}
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 4
+    assert estimate_tokens("abcd") == 5
+    assert estimate_tokens("abcde") == 6
+
+
+def test_trim_keeps_the_most_recent_messages_in_budget():
+    # Cada mensaje de 36 caracteres cuesta 9 + 4 = 13 tokens.
+    history = [_message("user", 36), _message("assistant", 36), _message("user", 36), _message("assistant", 36)]
+
+    assert trim_to_budget(history, 26) == history[2:]
+    assert trim_to_budget(history, 1000) == history
+    assert trim_to_budget([], 10) == []
+
+
+def test_trim_never_starts_with_an_orphan_reply():
+    history = [_message("user", 36), _message("assistant", 36), _message("user", 36), _message("assistant", 36)]
+
+    # Entrarían tres mensajes, pero el primero sería una respuesta sin su pregunta.
+    assert trim_to_budget(history, 39) == history[2:]
+
+
+def test_trim_always_keeps_the_last_message():
+    huge = _message("user", 10_000)
+    assert trim_to_budget([_message("user", 4), huge], 10) == [huge]
+    reply = _message("assistant", 10_000)
+    assert trim_to_budget([reply], 10) == [reply]
+
+
+def test_memory_store_returns_copies_and_expires(monkeypatch):
+    store = MemoryConversationStore(ttl_seconds=10, max_entries=5)
+    store.save(Conversation("a", 1, [_message("user", 4)], {"pending_intent": None}))
+
+    loaded = store.get("a")
+    loaded.messages.append(_message("assistant", 4))
+    assert len(store.get("a").messages) == 1
+    assert store.get("b") is None
+
+    now = conversation_store.time.monotonic()
+    monkeypatch.setattr(conversation_store.time, "monotonic", lambda: now + 11)
+    assert store.get("a") is None
+
+
+def test_memory_store_evicts_the_least_recently_saved():
+    store = MemoryConversationStore(ttl_seconds=60, max_entries=2)
+    for conversation_id in ("a", "b", "c"):
+        store.save(Conversation(conversation_id))
+
+    assert store.get("a") is None
+    assert store.stats() == {"backend": "memory", "conversations": 2}
+
+
+def test_purge_expired(monkeypatch):
+    store = MemoryConversationStore(ttl_seconds=10, max_entries=5)
+    store.save(Conversation("a"))
+    now = conversation_store.time.monotonic()
+    monkeypatch.setattr(conversation_store.time, "monotonic", lambda: now + 11)
+    store.save(Conversation("b"))
+
+    assert store.purge_expired() == 1
+    assert store.get("b") is not None
+
+
+@pytest.fixture
+def store(monkeypatch) -> MemoryConversationStore:
+    store = MemoryConversationStore(ttl_seconds=60, max_entries=10)
+    monkeypatch.setattr(main, "get_conversation_store", lambda: store)
+    return store
+
+
+@pytest.fixture
+def chat(monkeypatch, store):
+    """POST a /api/chatbot/ai/respond como ``user_id`` (None = visitante), sin IA."""
+    current = {"user": None}
+    main.app.dependency_overrides[get_session] = lambda: None
+    main.app.dependency_overrides[get_optional_user] = lambda: current["user"]
+    monkeypatch.setattr(main, "_answer_without_ai", lambda payload, db, user: None)
+    monkeypatch.setattr(main, "is_ai_enabled", lambda: False)
+    client = TestClient(main.app)
+
+    def send(text: str, conversation_id=None, user_id=None) -> dict:
+        current["user"] = SimpleNamespace(id=user_id) if user_id is not None else None
+        body = {"messages": [{"role": "user", "content": text}], "conversation_id": conversation_id}
+        return client.post("/api/chatbot/ai/respond", json=body).json()
+
+    yield send
+    main.app.dependency_overrides.clear()
+
+
+def test_follow_up_messages_extend_the_stored_history(chat, store):
+    first = chat("Hola", user_id=7)
+    second = chat("¿Y los retos?", conversation_id=first["conversation_id"], user_id=7)
+
+    assert second["conversation_id"] == first["conversation_id"]
+    contents = [message["content"] for message in store.get(first["conversation_id"]).messages]
+    assert contents == ["Hola", main.FALLBACK_MESSAGE, "¿Y los retos?", main.FALLBACK_MESSAGE]
+
+
+def test_another_users_conversation_starts_fresh(chat, store):
+    mine = chat("Hola", user_id=7)["conversation_id"]
+
+    theirs = chat("Hola", conversation_id=mine, user_id=8)["conversation_id"]
+    anonymous = chat("Hola", conversation_id=mine)["conversation_id"]
+
+    assert len({mine, theirs, anonymous}) == 3
+    assert len(store.get(mine).messages) == 2
+
+
+def test_anonymous_conversation_is_claimed_on_login(chat, store):
+    conversation_id = chat("Hola")["conversation_id"]
+
+    assert chat("Sigo", conversation_id=conversation_id, user_id=7)["conversation_id"] == conversation_id
+    assert store.get(conversation_id).user_id == 7
+
+
+def test_unknown_or_expired_ids_start_fresh(chat, store, monkeypatch):
+    assert chat("Hola", conversation_id="f" * 32)["conversation_id"] != "f" * 32
+
+    conversation_id = chat("Hola")["conversation_id"]
+    now = conversation_store.time.monotonic()
+    monkeypatch.setattr(conversation_store.time, "monotonic", lambda: now + 61)
+
+    assert chat("Sigo", conversation_id=conversation_id)["conversation_id"] != conversation_id
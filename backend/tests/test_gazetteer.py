@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from routers import geocoding as geocoding_router
+from services.gazetteer import Gazetteer, fold_text, get_gazetteer
+
+_COUNTRIES = [
+    {"code": "AR", "name": "Argentina"},
+    {"code": "CO", "name": "Colombia"},
+    {"code": "CR", "name": "Costa Rica"},
+    {"code": "US", "name": "Estados Unidos", "aliases": ["EEUU", "USA"]},
+]
+_CITIES = [
+    {"name": "San José", "country_code": "CR", "population": 340000},
+    {"name": "San Juan", "country_code": "AR", "region": "San Juan", "population": 470000},
+    {"name": "Santa Marta", "country_code": "CO", "population": 500000},
+    {"name": "Costa del Este", "country_code": "AR", "population": 2000},
+    {"name": "Buenos Aires", "country_code": "AR", "population": 3075000, "aliases": ["CABA"]},
+]
+
+
+def _names(items) -> list[str]:
+    return [item.name for item in items]
+
+
+def test_fold_text():
+    assert fold_text("Bogotá D.C.") == "bogota d c"
+    assert fold_text("  SÃO   Paulo ") == "sao paulo"
+    assert fold_text("!!") == ""
+
+
+def test_prefix_matches_are_ranked():
+    gazetteer = Gazetteer(_COUNTRIES, _CITIES)
+
+    # Por población entre coincidencias al inicio del nombre.
+    assert _names(gazetteer.search_cities("san")) == ["Santa Marta", "San Juan", "San José"]
+    # Una coincidencia exacta gana aunque tenga menos habitantes.
+    assert _names(gazetteer.search_cities("san jose")) == ["San José"]
+    # El inicio del nombre va antes que una palabra posterior.
+    assert _names(gazetteer.search_countries("cos")) == ["Costa Rica"]
+    assert _names(gazetteer.search_cities("costa")) == ["Costa del Este"]
+    assert _names(gazetteer.search_cities("aires")) == ["Buenos Aires"]
+    assert gazetteer.search_cities("   ") == []
+
+
+def test_aliases_and_limit():
+    gazetteer = Gazetteer(_COUNTRIES, _CITIES)
+
+    assert _names(gazetteer.search_countries("eeuu")) == ["Estados Unidos"]
+    assert _names(gazetteer.search_cities("caba")) == ["Buenos Aires"]
+    assert len(gazetteer.search_cities("s", limit=2)) == 2
+
+
+def test_cities_can_be_filtered_by_country_name_code_or_alias():
+    gazetteer = Gazetteer(_COUNTRIES, _CITIES)
+
+    assert _names(gazetteer.search_cities("san", country="argentina")) == ["San Juan"]
+    assert _names(gazetteer.search_cities("san", country="CR")) == ["San José"]
+    assert gazetteer.search_cities("san", country="USA") == []
+    assert gazetteer.search_cities("san", country="Narnia") == []
+    assert gazetteer.resolve_country_code("Costa  Rica") == "CR"
+
+
+def test_bundled_gazetteer_covers_common_queries():
+    gazetteer = get_gazetteer()
+
+    assert gazetteer.search_countries("argen")[0].code == "AR"
+    assert gazetteer.search_countries("EE. UU.")[0].code == "US"
+    assert gazetteer.search_cities("bogota")[0].name == "Bogotá"
+    assert gazetteer.search_cities("capital federal")[0].name == "Buenos Aires"
+    assert all(city.country_code == "AR" for city in gazetteer.search_cities("c", country="AR"))
+
+
+def test_autocomplete_endpoints_use_the_gazetteer():
+    app = FastAPI()
+    app.include_router(geocoding_router.router)
+    client = TestClient(app)
+
+    countries = client.get("/api/places/autocomplete/countries", params={"query": "argen"}).json()
+    assert countries[0] == {"name": "Argentina", "code": "AR"}
+
+    cities = client.get("/api/places/autocomplete/cities", params={"query": "caba", "country": "ar"}).json()
+    assert cities == [
+        {"name": "Buenos Aires", "region": "Ciudad Autónoma de Buenos Aires", "country": "Argentina", "code": "AR"}
+    ]
+    assert client.get("/api/places/autocomplete/cities", params={"query": ""}).status_code == 422
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+from datetime import timedelta
+from io import BytesIO
+
+import pytest
+from bson import ObjectId
+from PIL import Image
+from sqlalchemy import create_engine, insert
+from sqlalchemy.pool import StaticPool
+
+import gc_orphan_photos
+from models import PhotoPurgeJob
+from services.photo_backends import FilesystemPhotoBackend
+
+
+@pytest.fixture
+def backend(tmp_path) -> FilesystemPhotoBackend:
+    return FilesystemPhotoBackend(tmp_path / "review_photos")
+
+
+@pytest.fixture
+def referenced(monkeypatch) -> list[str]:
+    """Ids que Postgres devolvería como referenciados (ordenados al leerlos)."""
+    file_ids: list[str] = []
+    monkeypatch.setattr(gc_orphan_photos, "_referenced_file_ids", lambda column: iter(sorted(file_ids)))
+    return file_ids
+
+
+def _save(backend, color) -> str:
+    buffer = BytesIO()
+    Image.new("RGB", (40, 40), color).save(buffer, "PNG")
+    buffer.seek(0)
+    return backend.save(buffer, "foto.png", "image/png")
+
+
+def _collect(backend, grace=timedelta(0), pending=(), collect_live_refs=False):
+    return gc_orphan_photos.collect_bucket(backend, None, grace, False, set(pending), collect_live_refs)
+
+
+def test_find_orphans_merges_sorted_ids():
+    stored = iter(["a", "b", "c", "d"])
+    assert list(gc_orphan_photos.find_orphans(stored, iter(["b", "d", "e"]))) == ["a", "c"]
+
+
+def test_referenced_files_are_kept(backend, referenced):
+    file_id = _save(backend, (1, 1, 1))
+    referenced.append(file_id)
+
+    stats = _collect(backend)
+
+    assert (stats["scanned"], stats["orphans"], stats["deleted"]) == (1, 0, 0)
+
+
+def test_recently_reused_ids_are_kept(backend, referenced, monkeypatch):
+    file_id = _save(backend, (2, 2, 2))
+    # El archivo es viejo, pero una subida nueva acaba de sumarle una referencia.
+    monkeypatch.setattr(gc_orphan_photos, "parse_file_id", lambda _: ObjectId("000000000000000000000000"))
+
+    stats = _collect(backend, grace=timedelta(hours=1))
+
+    assert (stats["too_recent"], stats["deleted"]) == (1, 0)
+    assert backend.local_file(file_id) is not None
+
+
+def test_pending_purges_and_live_references_are_kept(backend, referenced):
+    queued = _save(backend, (3, 3, 3))
+    live = _save(backend, (4, 4, 4))
+
+    stats = _collect(backend, pending=[queued])
+
+    assert (stats["pending_purge"], stats["live_refs"], stats["deleted"]) == (1, 1, 0)
+    assert backend.local_file(queued) is not None and backend.local_file(live) is not None
+
+
+def test_live_references_can_be_collected_explicitly(backend, referenced):
+    file_id = _save(backend, (5, 5, 5))
+
+    stats = _collect(backend, collect_live_refs=True)
+
+    assert stats["deleted"] == 1
+    assert backend.local_file(file_id) is None
+    assert backend.reference(file_id) is None
+
+
+def test_exhausted_purges_are_not_pending(monkeypatch):
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    PhotoPurgeJob.__table__.create(engine)
+    with engine.begin() as connection:
+        connection.execute(
+            insert(PhotoPurgeJob),
+            [
+                {"bucket": "review_photos", "file_id": "en_cola", "attempts": 1},
+                {"bucket": "review_photos", "file_id": "agotado", "attempts": 5},
+                {"bucket": "place_photos", "file_id": "otro_bucket", "attempts": 0},
+            ],
+        )
+    monkeypatch.setattr(gc_orphan_photos, "engine", engine)
+
+    assert gc_orphan_photos._pending_purge_file_ids("review_photos", max_attempts=5) == {"en_cola"}
@@ -0,0 +1,217 @@
+from __future__ import annotations
+
+import asyncio
+import time
+
+import httpx
+import pytest
+
+import geocoding
+from services.geocoding_cache import MISS, GeocodingCache, geocoding_cache_key
+
+_FLORIDA = [{"lat": "-34.6", "lon": "-58.37", "display_name": "Florida 100, Buenos Aires"}]
+
+
+@pytest.fixture
+def locationiq(geocoding_cache):
+    """Cliente cuyas requests a LocationIQ se contestan desde ``responses`` (por query), sin red."""
+    calls: list[str] = []
+    responses: dict[str, httpx.Response] = {}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        query = request.url.params["q"]
+        calls.append(query)
+        return responses.get(query) or httpx.Response(200, json=_FLORIDA)
+
+    client = geocoding.LocationIQClient()
+    client._http = httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url=client.base_url)
+    return client, calls, responses
+
+
+def _search_key(query: str, limit: int = 3) -> str:
+    return geocoding_cache_key("search", query, limit=limit, country=None, language="es")
+
+
+def test_equivalent_queries_share_a_key():
+    assert _search_key("Palermo,  Buenos Aires") == _search_key("  palermo, BUENOS aires ")
+    assert _search_key("Palermo") != _search_key("Palermo", limit=1)
+    assert geocoding_cache_key("geocode", "Palermo", limit=1) != geocoding_cache_key("search", "Palermo", limit=1)
+
+
+def test_search_miss_then_hit(locationiq):
+    client, calls, _ = locationiq
+
+    first = asyncio.run(client.search_places("Florida 100, Buenos Aires"))
+    second = asyncio.run(client.search_places("florida 100,  buenos aires"))
+
+    assert first == second == _FLORIDA
+    assert len(calls) == 1
+
+
+def test_empty_answers_are_cached(locationiq, geocoding_cache):
+    client, calls, responses = locationiq
+    responses["noexiste 123"] = httpx.Response(404, json={"error": "Unable to geocode"})
+    responses["Noexiste 1, Rosario"] = httpx.Response(200, json=[])
+    address = {"street": "Noexiste", "street_number": "1", "city_state": "Rosario"}
+
+    async def scenario():
+        searches = [await client.search_places("noexiste 123") for _ in range(2)]
+        geocoded = [await client.geocode_address(address) for _ in range(2)]
+        return searches, geocoded
+
+    assert asyncio.run(scenario()) == ([[], []], [None, None])
+
+    assert calls == ["noexiste 123", "Noexiste 1, Rosario"]
+    assert geocoding_cache.get_local(_search_key("noexiste 123")) == []
+
+
+def test_errors_are_not_cached(locationiq, geocoding_cache):
+    client, calls, responses = locationiq
+    responses["Salta"] = httpx.Response(429)
+    responses["Jujuy"] = httpx.Response(500)
+
+    assert asyncio.run(client.search_places("Salta")) == []
+    assert asyncio.run(client.search_places("Jujuy")) == []
+    assert geocoding_cache.get_local(_search_key("Salta")) is MISS
+    assert geocoding_cache.get_local(_search_key("Jujuy")) is MISS
+
+    del responses["Salta"]
+    assert asyncio.run(client.search_places("Salta")) == _FLORIDA
+    assert calls == ["Salta", "Jujuy", "Salta"]
+
+
+def test_geocode_returns_coordinates(locationiq):
+    client, calls, _ = locationiq
+    address = {"street": "Florida", "street_number": "100", "city_state": "Buenos Aires", "country": "Argentina"}
+
+    expected = {"latitude": -34.6, "longitude": -58.37, "display_name": "Florida 100, Buenos Aires"}
+    assert asyncio.run(client.geocode_address(address)) == expected
+    assert asyncio.run(client.geocode_address(address)) == expected
+    assert calls == ["Florida 100, Buenos Aires, Argentina"]
+
+
+def test_lru_is_bounded_and_expires(geocoding_cache, monkeypatch):
+    cache = GeocodingCache(ttl_seconds=60, negative_ttl_seconds=10, lru_size=2)
+    for query in ["a", "b", "c"]:
+        cache.set(query, query, [query])
+
+    assert cache.get("a") is MISS
+    assert cache.get("c") == ["c"]
+
+    now = time.time()
+    monkeypatch.setattr("services.geocoding_cache.time.time", lambda: now + 30)
+    cache.set("vacio", "vacio", [])
+    monkeypatch.setattr("services.geocoding_cache.time.time", lambda: now + 45)
+    assert cache.get("c") == ["c"]
+    assert cache.get("vacio") is MISS
+
+
+def test_disabled_ttl_skips_caching(geocoding_cache):
+    cache = GeocodingCache(ttl_seconds=0, negative_ttl_seconds=0, lru_size=10)
+    cache.set("a", "a", [1])
+    cache.set("b", "b", None)
+    assert cache.get("a") is MISS and cache.get("b") is MISS
+
+
+def test_timeouts_are_not_cached(locationiq, geocoding_cache):
+    client, calls, _ = locationiq
+
+    def timeout(request: httpx.Request) -> httpx.Response:
+        raise httpx.ReadTimeout("sin respuesta", request=request)
+
+    client._http = httpx.AsyncClient(transport=httpx.MockTransport(timeout), base_url=client.base_url)
+
+    assert asyncio.run(client.search_places("Tandil")) == []
+    assert geocoding_cache.get_local(_search_key("Tandil")) is MISS
+
+
+def test_token_bucket_spaces_requests_after_the_burst():
+    bucket = geocoding.AsyncTokenBucket(rate_per_second=50, burst=2)
+
+    async def scenario():
+        started = time.monotonic()
+        for _ in range(4):
+            await bucket.acquire()
+        return time.monotonic() - started
+
+    # Dos tokens de ráfaga y dos más a 50/s: unos 40ms de espera en total.
+    assert 0.03 <= asyncio.run(scenario()) < 0.5
+
+
+def test_concurrent_identical_queries_share_one_request(geocoding_cache):
+    calls: list[str] = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.params["q"])
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, json=_FLORIDA)
+
+    client = geocoding.LocationIQClient()
+    client._http = httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url=client.base_url)
+
+    async def scenario():
+        return await asyncio.gather(
+            client.search_places("Florida 100"),
+            client.search_places("  FLORIDA 100 "),
+            client.search_places("Florida 100"),
+            client.search_places("Corrientes 800"),
+        )
+
+    results = asyncio.run(scenario())
+    assert results[:3] == [_FLORIDA] * 3
+    assert sorted(calls) == ["Corrientes 800", "Florida 100"]
+    stats = client.stats()
+    assert (stats["upstream_requests"], stats["coalesced_requests"], stats["in_flight"]) == (2, 2, 0)
+
+    asyncio.run(client.search_places("florida 100"))
+    assert client.stats()["cache_hits"] == 1
+
+
+def test_cancelled_caller_does_not_cancel_the_shared_request(geocoding_cache):
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, json=_FLORIDA)
+
+    client = geocoding.LocationIQClient()
+    client._http = httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url=client.base_url)
+
+    async def scenario():
+        first = asyncio.ensure_future(client.search_places("Florida 100"))
+        await asyncio.sleep(0)
+        second = asyncio.ensure_future(client.search_places("Florida 100"))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(scenario()) == _FLORIDA
+
+
+def test_mock_locationiq_round_trip(make_locationiq_client):
+    client, mock_stats = make_locationiq_client()
+    address = {"street": "San Martín", "street_number": "50", "city_state": "Rosario", "country": "Argentina"}
+
+    async def scenario():
+        geocoded = await client.geocode_address(address)
+        missing = await client.geocode_address({**address, "street": "Noexiste"})
+        return geocoded, missing, await mock_stats()
+
+    geocoded, missing, stats = asyncio.run(scenario())
+    assert geocoded["display_name"] == "San Martín 50, Centro, Rosario, C1000AAA, Argentina"
+    assert isinstance(geocoded["latitude"], float)
+    assert missing is None
+    assert (stats["requests"], stats["not_found"]) == (2, 1)
+
+
+def test_rate_limited_answers_from_the_mock_are_not_cached(make_locationiq_client, geocoding_cache):
+    client, mock_stats = make_locationiq_client(rate_limit=1)
+
+    async def scenario():
+        await client.search_places("Mendoza")
+        limited = await client.search_places("Salta")
+        return limited, await mock_stats()
+
+    limited, stats = asyncio.run(scenario())
+    assert limited == []
+    assert stats["rate_limited"] == 1
+    assert geocoding_cache.get_local(_search_key("Salta")) is MISS
+    assert geocoding_cache.get_local(_search_key("Mendoza")) is not MISS
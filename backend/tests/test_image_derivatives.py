@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+from io import BytesIO
+
+from PIL import Image
+
+from services.image_derivatives import DERIVATIVE_MAX_SIDES, PLACEHOLDER_MAX_SIDE, build_derivatives
+
+
+def _image_bytes(size: tuple[int, int]) -> BytesIO:
+    buffer = BytesIO()
+    Image.new("RGB", size, (40, 90, 160)).save(buffer, "PNG")
+    buffer.seek(0)
+    return buffer
+
+
+def test_builds_every_size_keeping_the_aspect_ratio():
+    derivatives = {derivative.size: derivative for derivative in build_derivatives(_image_bytes((2000, 1000)))}
+
+    assert set(derivatives) == {*DERIVATIVE_MAX_SIDES, "placeholder"}
+    for size, max_side in DERIVATIVE_MAX_SIDES.items():
+        assert (derivatives[size].width, derivatives[size].height) == (max_side, max_side // 2)
+    assert max(derivatives["placeholder"].width, derivatives["placeholder"].height) == PLACEHOLDER_MAX_SIDE
+
+
+def test_derivatives_decode_as_their_content_type():
+    for derivative in build_derivatives(_image_bytes((500, 400))):
+        with Image.open(BytesIO(derivative.data)) as image:
+            assert Image.MIME[image.format] == derivative.content_type
+            assert image.size == (derivative.width, derivative.height)
+        assert derivative.extension in (".webp", ".jpg")
+
+
+def test_small_images_are_not_upscaled():
+    derivatives = build_derivatives(_image_bytes((200, 150)))
+    assert all((d.width, d.height) == (200, 150) for d in derivatives if d.size != "placeholder")
+
+
+def test_exif_orientation_is_applied():
+    buffer = BytesIO()
+    exif = Image.Exif()
+    exif[0x0112] = 6  # Rotada 90°: el ancho y el alto se intercambian
+    Image.new("RGB", (400, 200)).save(buffer, "JPEG", exif=exif)
+    buffer.seek(0)
+
+    full = next(d for d in build_derivatives(buffer) if d.size == "full")
+    assert (full.width, full.height) == (200, 400)
+
+
+def test_undecodable_and_animated_uploads_keep_only_the_original():
+    assert build_derivatives(BytesIO(b"esto no es una imagen")) == []
+
+    animated = BytesIO()
+    frames = [Image.new("RGB", (50, 50), color) for color in ("red", "blue")]
+    frames[0].save(animated, "GIF", save_all=True, append_images=frames[1:])
+    animated.seek(0)
+    assert build_derivatives(animated) == []
+
+
+def test_stream_is_rewound_for_storing_the_original():
+    content = _image_bytes((300, 300))
+    build_derivatives(content)
+    assert content.tell() == 0
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import json
+
+import numpy as np
+
+from services import virtual_assistant_context
+from services.knowledge_index import KnowledgeChunk, KnowledgeIndex, load_knowledge_chunks, tokenize
+from services.virtual_assistant_context import OVERVIEW_CHUNK_ID, select_context_chunks, select_relevant_chunks
+
+_CHUNKS = [
+    KnowledgeChunk("hoteles", ("hotel",), "Los hoteles se buscan desde la home con filtros de precio."),
+    KnowledgeChunk("resenas", ("reseña", "opinión"), "Las reseñas llevan fotos y una puntuación de 1 a 5."),
+    KnowledgeChunk("perfil", (), "El perfil se edita desde el menú; la foto de perfil también."),
+    KnowledgeChunk("fotos", (), "Fotos, fotos y más fotos: cada lugar puede tener varias fotos."),
+]
+
+
+def _ids(results) -> list[str]:
+    return [chunk.id for chunk, _ in results]
+
+
+def test_tokenize_folds_accents_and_drops_stopwords_and_plurals():
+    assert tokenize("¿Cómo publico las Reseñas de mis hoteles?") == ["publico", "resena", "hotele"]
+    assert tokenize("la de un") == []
+
+
+def test_keywords_and_rare_terms_rank_first():
+    index = KnowledgeIndex(_CHUNKS)
+
+    assert _ids(index.search("hotel", limit=4)) == ["hoteles"]
+    assert _ids(index.search("opinión", limit=4)) == ["resenas"]
+    # "fotos" aparece en tres chunks; el que más la repite gana.
+    assert _ids(index.search("fotos", limit=4))[0] == "fotos"
+
+
+def test_scores_match_a_dense_bm25():
+    index = KnowledgeIndex(_CHUNKS)
+    query = "foto de perfil del hotel"
+
+    dense = np.zeros(len(_CHUNKS), dtype=np.float32)
+    for term in set(tokenize(query)):
+        term_id = index.vocabulary.get(term)
+        if term_id is None:
+            continue
+        postings = slice(index.indptr[term_id], index.indptr[term_id + 1])
+        for doc_id, weight in zip(index.doc_ids[postings], index.weights[postings]):
+            dense[doc_id] += weight
+
+    np.testing.assert_allclose(index.scores(query), dense, rtol=1e-6)
+
+
+def test_search_limit_and_ties_keep_file_order():
+    twins = [KnowledgeChunk(f"c{i}", (), "mapa del lugar") for i in range(5)]
+    index = KnowledgeIndex(twins)
+
+    assert _ids(index.search("mapa", limit=3)) == ["c0", "c1", "c2"]
+    assert index.search("nada que ver", limit=3) == []
+    assert KnowledgeIndex([]).search("mapa", limit=3) == []
+
+
+def test_chunks_load_from_json_and_jsonl(tmp_path):
+    (tmp_path / "a.json").write_text(json.dumps([{"id": "a", "keywords": ["x"], "text": "uno"}]))
+    (tmp_path / "b.jsonl").write_text('{"id": "b", "text": "dos"}\n\n{"id": "c", "text": "tres"}\n')
+    (tmp_path / "notas.txt").write_text("ignorado")
+
+    chunks = load_knowledge_chunks(tmp_path)
+    assert [chunk.id for chunk in chunks] == ["a", "b", "c"]
+    assert chunks[0].keywords == ("x",) and chunks[1].keywords == ()
+
+
+def test_overview_is_always_in_the_context(monkeypatch):
+    overview = KnowledgeChunk(OVERVIEW_CHUNK_ID, (), "ViajerosXP en general.")
+    index = KnowledgeIndex([overview, *_CHUNKS])
+    monkeypatch.setattr(virtual_assistant_context, "get_knowledge_index", lambda: index)
+
+    assert [chunk.id for chunk in select_relevant_chunks("hotel", limit=2)] == [OVERVIEW_CHUNK_ID, "hoteles"]
+    assert [chunk.id for chunk in select_relevant_chunks("zzz", limit=2)] == [OVERVIEW_CHUNK_ID]
+    messages = [{"role": "assistant", "content": "hotel"}, {"role": "user", "content": "reseñas"}]
+    assert [chunk.id for chunk in select_context_chunks(messages)] == [OVERVIEW_CHUNK_ID, "resenas"]
+
+
+def test_bundled_knowledge_base_answers_common_questions():
+    chunk_ids = [chunk.id for chunk in select_relevant_chunks("¿Cómo filtro hoteles por precio?")]
+    assert chunk_ids[0] == "search_and_filters"
+    assert OVERVIEW_CHUNK_ID in chunk_ids
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+from models import Location, LocationAlias, PlaceLocation
+from services.locations import (
+    LocationNode,
+    assign_place_locations,
+    location_chain,
+    places_in_locations,
+    resolve_location_ids,
+)
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    for model in (Location, LocationAlias, PlaceLocation):
+        model.__table__.create(engine)
+    with sessionmaker(bind=engine)() as session:
+        yield session
+
+
+def _levels(chain: list[LocationNode]) -> list[tuple[str, str]]:
+    return [(node.level, node.name) for node in chain]
+
+
+def test_city_aliases_share_one_chain():
+    chains = [
+        _levels(location_chain("Argentina", city_state))
+        for city_state in ("CABA", "Capital Federal", "Ciudad Autónoma de Buenos Aires")
+    ]
+    assert chains[0] == chains[1] == chains[2]
+    assert chains[0][0] == ("country", "Argentina")
+    assert ("city", "Buenos Aires") in chains[0]
+
+
+def test_country_aliases_resolve_to_the_gazetteer_name():
+    (country,) = location_chain("EEUU", None)
+    assert (country.level, country.name) == ("country", "Estados Unidos")
+    assert "US" in country.aliases
+
+
+def test_unknown_areas_are_mapped_by_position():
+    chain = location_chain("Narnia", "Barrio Alto, Villa Sur, Provincia Norte")
+    assert _levels(chain) == [
+        ("country", "Narnia"),
+        ("region", "Provincia Norte"),
+        ("city", "Villa Sur"),
+        ("neighbourhood", "Barrio Alto"),
+    ]
+    assert _levels(location_chain(" ", "  ")) == []
+
+
+def test_assign_creates_each_level_once(db):
+    first = assign_place_locations(db, 1, "Argentina", "CABA")
+    second = assign_place_locations(db, 2, "argentina", "Capital Federal")
+
+    assert first == second
+    assert db.scalar(select(Location).where(Location.id == first[-1])).parent_id == first[-2]
+    assert sorted(db.scalars(select(PlaceLocation.place_id).where(PlaceLocation.location_id == first[0]))) == [1, 2]
+
+
+def test_assign_replaces_the_previous_mapping(db):
+    assign_place_locations(db, 1, "Argentina", "CABA")
+    narnia = assign_place_locations(db, 1, "Narnia", "Villa Sur")
+
+    mapped = db.scalars(select(PlaceLocation.location_id).where(PlaceLocation.place_id == 1)).all()
+    assert sorted(mapped) == sorted(narnia)
+
+
+def test_names_and_aliases_resolve_to_locations(db):
+    assign_place_locations(db, 1, "Argentina", "CABA")
+    assign_place_locations(db, 2, "Narnia", "Villa Sur")
+
+    (city_id,) = resolve_location_ids(db, "capital federal")
+    assert resolve_location_ids(db, "Buenos  Aires") == [city_id]
+    assert db.scalars(places_in_locations([city_id])).all() == [1]
+    assert db.scalars(places_in_locations(resolve_location_ids(db, "villa sur"))).all() == [2]
+    assert resolve_location_ids(db, "!!") == []
@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+
+
+@pytest.fixture
+def client() -> TestClient:
+    return TestClient(main.app)
+
+
+def test_metrics_are_disabled_without_a_token(client, monkeypatch):
+    monkeypatch.setattr(main.settings, "metrics_token", "")
+
+    assert client.get("/api/metrics").status_code == 404
+    assert client.get("/api/metrics", headers={"Authorization": "Bearer "}).status_code == 404
+
+
+def test_metrics_require_the_token(client, monkeypatch):
+    monkeypatch.setattr(main.settings, "metrics_token", "secreto")
+
+    assert client.get("/api/metrics").status_code == 401
+    assert client.get("/api/metrics", headers={"Authorization": "Bearer otro"}).status_code == 401
+
+    response = client.get("/api/metrics", headers={"Authorization": "Bearer secreto"})
+    assert response.status_code == 200
+    assert {"mongo_pool", "photo_purge", "assistant_ai"} <= set(response.json())
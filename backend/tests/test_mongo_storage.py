@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from services.mongo_storage import MongoStorage
+from settings import get_settings
+
+
+@pytest.fixture
+def storage():
+    storage = MongoStorage(get_settings())
+    yield storage
+    storage.close()
+
+
+def test_client_is_created_lazily_without_connecting(storage):
+    assert storage.pool_metrics()["sync"]["client_created"] is False
+    client = storage.client
+    assert storage.client is client
+    assert storage.pool_metrics()["sync"]["client_created"] is True
+    assert client.options.pool_options.max_pool_size == get_settings().mongodb_max_pool_size
+
+
+def test_async_client_is_created_lazily_with_the_same_options(storage):
+    assert storage.pool_metrics()["async"]["client_created"] is False
+
+    # Motor se crea dentro del event loop, como en los endpoints.
+    async def scenario():
+        client = storage.async_client
+        assert storage.async_client is client
+        assert storage.async_bucket("fotos") is storage.async_bucket("fotos")
+        return client
+
+    client = asyncio.run(scenario())
+    assert storage.pool_metrics()["async"]["client_created"] is True
+    assert client.options.pool_options.max_pool_size == get_settings().mongodb_max_pool_size
+
+
+def test_buckets_share_the_client_and_are_reused(storage):
+    places = storage.place_photos_bucket
+    assert storage.bucket(get_settings().mongodb_place_photos_bucket) is places
+    assert storage.avatars_bucket is not places
+    assert storage.avatars_bucket._collection.database.client is storage.client
+
+
+def test_pool_events_feed_the_metrics(storage):
+    listener = storage._pool_listener
+    for event in ("connection_created", "connection_created", "connection_checked_out", "connection_closed"):
+        getattr(listener, event)(None)
+    storage._async_pool_listener.connection_created(None)
+
+    metrics = storage.pool_metrics()
+    sync = metrics["sync"]
+    assert (sync["open_connections"], sync["checked_out"], sync["checkouts"]) == (1, 1, 1)
+    # Cada cliente reporta su propio pool: los eventos no se mezclan.
+    assert metrics["async"]["open_connections"] == 1
+    assert metrics["async"]["checkouts"] == 0
+    assert metrics["max_pool_size"] == get_settings().mongodb_max_pool_size
+
+
+def test_close_drops_the_client_and_buckets(storage):
+    client = storage.client
+    storage.place_photos_bucket
+
+    async def open_async_client():
+        return storage.async_client
+
+    asyncio.run(open_async_client())
+    storage.close()
+
+    assert storage.pool_metrics()["sync"]["client_created"] is False
+    assert storage.pool_metrics()["async"]["client_created"] is False
+    assert storage.client is not client
@@ -0,0 +1,240 @@
+from __future__ import annotations
+
+import asyncio
+from io import BytesIO
+
+import pytest
+from bson import ObjectId
+from gridfs import NoFile
+from PIL import Image
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from services.photo_bucket import delete_photo, hash_content, open_photo, open_photo_async, save_photo
+
+
+class _GridOut(BytesIO):
+    def __init__(self, file_id: ObjectId, data: bytes, metadata) -> None:
+        super().__init__(data)
+        self._id = file_id
+        self.length = len(data)
+        self.metadata = metadata
+
+
+class _AsyncGridOut(_GridOut):
+    async def read(self, size: int = -1) -> bytes:
+        return super().read(size)
+
+
+class _FakeBucket:
+    """GridFSBucket en memoria con las operaciones que usa photo_bucket."""
+
+    grid_out_class = _GridOut
+
+    def __init__(self) -> None:
+        self.files: dict[ObjectId, tuple[bytes, dict]] = {}
+
+    def upload_from_stream(self, filename, source, metadata=None) -> ObjectId:
+        file_id = ObjectId()
+        self.upload_from_stream_with_id(file_id, filename, source, metadata)
+        return file_id
+
+    def upload_from_stream_with_id(self, file_id, filename, source, metadata=None) -> None:
+        self.files[file_id] = (source.read(), metadata)
+
+    def _open(self, file_id):
+        if file_id not in self.files:
+            raise NoFile(file_id)
+        data, metadata = self.files[file_id]
+        return self.grid_out_class(file_id, data, metadata)
+
+    def open_download_stream(self, file_id):
+        return self._open(file_id)
+
+    def delete(self, file_id) -> None:
+        if self.files.pop(file_id, None) is None:
+            raise NoFile(file_id)
+
+    def find(self, query):
+        file_id = query["_id"]
+        documents = [self._open(file_id)] if file_id in self.files else []
+
+        class _Cursor(list):
+            def limit(self, count):
+                return self[:count]
+
+        return _Cursor(documents)
+
+
+class _FakeAsyncBucket(_FakeBucket):
+    grid_out_class = _AsyncGridOut
+
+    async def open_download_stream(self, file_id):
+        return self._open(file_id)
+
+
+class _DeleteResult:
+    def __init__(self, deleted_count: int) -> None:
+        self.deleted_count = deleted_count
+
+
+class _FakeRefs:
+    """Colección ``<bucket>.refs`` en memoria: filtros por igualdad y ``$lte``, updates ``$inc``/``$set``."""
+
+    def __init__(self) -> None:
+        self.documents: dict[str, dict] = {}
+
+    @staticmethod
+    def _matches(document: dict, query: dict) -> bool:
+        for key, expected in query.items():
+            if isinstance(expected, dict):
+                if not document.get(key, 0) <= expected["$lte"]:
+                    return False
+            elif document.get(key) != expected:
+                return False
+        return True
+
+    def find_one(self, query: dict):
+        return next((dict(doc) for doc in self.documents.values() if self._matches(doc, query)), None)
+
+    def find_one_and_update(self, query: dict, update: dict, return_document=ReturnDocument.BEFORE):
+        for document in self.documents.values():
+            if self._matches(document, query):
+                before = dict(document)
+                for key, delta in update.get("$inc", {}).items():
+                    document[key] = document.get(key, 0) + delta
+                document.update(update.get("$set", {}))
+                return dict(document) if return_document == ReturnDocument.AFTER else before
+        return None
+
+    def insert_one(self, document: dict) -> None:
+        if document["_id"] in self.documents:
+            raise DuplicateKeyError("duplicate key")
+        self.documents[document["_id"]] = dict(document)
+
+    def delete_one(self, query: dict) -> _DeleteResult:
+        for key, document in list(self.documents.items()):
+            if self._matches(document, query):
+                del self.documents[key]
+                return _DeleteResult(1)
+        return _DeleteResult(0)
+
+
+def _png(color=(200, 10, 10)) -> BytesIO:
+    buffer = BytesIO()
+    Image.new("RGB", (900, 600), color).save(buffer, "PNG")
+    buffer.seek(0)
+    return buffer
+
+
+@pytest.fixture
+def bucket() -> _FakeBucket:
+    return _FakeBucket()
+
+
+@pytest.fixture
+def refs() -> _FakeRefs:
+    return _FakeRefs()
+
+
+def test_save_stores_the_original_with_its_derivatives(bucket, refs):
+    upload = _png()
+    file_id = save_photo(bucket, refs, upload, "foto.png", "image/png")
+
+    original = open_photo(bucket, file_id)
+    assert original.read() == upload.getvalue()
+    assert original.metadata["contentType"] == "image/png"
+    assert set(original.metadata["variants"]) == {"thumb", "card", "full", "placeholder"}
+    assert original.metadata["sha256"] == hash_content(upload)
+    assert len(bucket.files) == 5
+
+
+def test_open_falls_back_to_the_original(bucket, refs):
+    file_id = save_photo(bucket, refs, _png(), "foto.png", "image/png")
+
+    thumb = open_photo(bucket, file_id, "thumb")
+    assert thumb.metadata["variant"] == "thumb"
+    assert open_photo(bucket, file_id, "enorme")._id == ObjectId(file_id)
+    assert open_photo(bucket, None) is None
+    assert open_photo(bucket, str(ObjectId())) is None
+
+
+def test_identical_uploads_share_one_blob(bucket, refs):
+    first = save_photo(bucket, refs, _png(), "a.png", "image/png")
+    second = save_photo(bucket, refs, _png(), "b.png", "image/png")
+    other = save_photo(bucket, refs, _png((10, 200, 10)), "c.png", "image/png")
+
+    assert first == second != other
+    assert len(bucket.files) == 10
+    assert refs.find_one({"file_id": first})["refcount"] == 2
+    assert refs.find_one({"file_id": other})["refcount"] == 1
+
+
+def test_precomputed_hash_is_trusted(bucket, refs):
+    upload = _png()
+    file_id = save_photo(bucket, refs, upload, "a.png", "image/png", content_hash=hash_content(upload))
+    assert save_photo(bucket, refs, _png(), "b.png", "image/png") == file_id
+
+
+def test_delete_removes_the_blob_with_the_last_reference(bucket, refs):
+    file_id = save_photo(bucket, refs, _png(), "a.png", "image/png")
+    save_photo(bucket, refs, _png(), "b.png", "image/png")
+
+    delete_photo(bucket, refs, file_id)
+    assert open_photo(bucket, file_id) is not None
+    assert refs.find_one({"file_id": file_id})["refcount"] == 1
+
+    delete_photo(bucket, refs, file_id)
+    assert bucket.files == {}
+    assert refs.documents == {}
+
+    # Las mismas fotos subidas otra vez se guardan de nuevo.
+    assert save_photo(bucket, refs, _png(), "c.png", "image/png") != file_id
+
+
+def test_delete_of_a_file_stored_before_deduplication(bucket, refs):
+    legacy_id = str(bucket.upload_from_stream("viejo.jpg", BytesIO(b"viejo")))
+    delete_photo(bucket, refs, legacy_id)
+    delete_photo(bucket, refs, legacy_id)
+    delete_photo(bucket, refs, None)
+
+    assert bucket.files == {}
+
+
+def test_concurrent_upload_of_the_same_bytes_keeps_the_first_blob(bucket, refs):
+    upload = _png()
+    theirs = str(ObjectId())
+    insert_one = refs.insert_one
+
+    def insert_after_another_request(document):
+        # Otro request registró el mismo hash entre nuestra búsqueda y el insert.
+        refs.insert_one = insert_one
+        insert_one({"_id": document["_id"], "file_id": theirs, "refcount": 1})
+        insert_one(document)
+
+    refs.insert_one = insert_after_another_request
+    file_id = save_photo(bucket, refs, upload, "a.png", "image/png")
+
+    assert file_id == theirs
+    assert bucket.files == {}
+    assert refs.find_one({"file_id": theirs})["refcount"] == 2
+
+
+def test_async_open_matches_the_sync_one(refs):
+    bucket = _FakeAsyncBucket()
+    file_id = save_photo(bucket, refs, _png(), "foto.png", "image/png")
+
+    async def scenario():
+        return (
+            await open_photo_async(bucket, file_id),
+            await open_photo_async(bucket, file_id, "card"),
+            await open_photo_async(bucket, file_id, "enorme"),
+            await open_photo_async(bucket, "no-es-un-id"),
+            await open_photo_async(bucket, str(ObjectId())),
+        )
+
+    original, card, fallback, invalid, missing = asyncio.run(scenario())
+    assert original._id == ObjectId(file_id)
+    assert card.metadata["variant"] == "card"
+    assert fallback._id == ObjectId(file_id)
+    assert invalid is None and missing is None
@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+from io import BytesIO
+
+import pytest
+
+from services.photo_disk_cache import PhotoDiskCache, photo_cache_key
+
+
+class _StoredFile:
+    """Lo mínimo de un GridOut de Motor que usa la caché: read() async, close() y length."""
+
+    def __init__(self, data: bytes) -> None:
+        self._content = BytesIO(data)
+        self.length = len(data)
+        self.closed = False
+
+    async def read(self, size: int = -1) -> bytes:
+        return self._content.read(size)
+
+    def close(self) -> None:
+        self.closed = True
+
+
+def _put(cache: PhotoDiskCache, key: str, data: bytes, content_type: str = "image/webp"):
+    return asyncio.run(cache.put(key, _StoredFile(data), content_type))
+
+
+@pytest.fixture
+def cache(tmp_path) -> PhotoDiskCache:
+    return PhotoDiskCache(tmp_path / "photo_cache", max_bytes=100, max_entry_bytes=60)
+
+
+def test_put_then_get(cache):
+    stored = _put(cache, "abc", b"x" * 10)
+    cached = cache.get("abc")
+
+    assert cached == stored
+    assert cached.path.read_bytes() == b"x" * 10
+    assert (cached.content_type, cached.length) == ("image/webp", 10)
+    assert cache.get("otra") is None
+
+
+def test_put_closes_the_source(cache):
+    source = _StoredFile(b"x" * 10)
+    asyncio.run(cache.put("abc", source, "image/webp"))
+    assert source.closed
+
+
+def test_entries_over_the_size_cap_are_not_cached(cache):
+    source = _StoredFile(b"x" * 61)
+    assert asyncio.run(cache.put("grande", source, "image/webp")) is None
+    assert cache.get("grande") is None
+    # El llamador lo sigue usando para servir la foto directamente.
+    assert not source.closed
+
+
+def test_least_recently_used_entries_are_evicted(cache):
+    for key in ("a", "b", "c"):
+        _put(cache, key, b"x" * 30)
+    cache.get("a")
+    _put(cache, "d", b"x" * 30)
+
+    assert cache.get("b") is None
+    assert all(cache.get(key) is not None for key in ("a", "c", "d"))
+
+
+def test_index_is_rebuilt_from_disk_in_mtime_order(cache):
+    for index, key in enumerate(("viejo", "nuevo")):
+        path = _put(cache, key, b"x" * 40).path
+        os.utime(path, (1000 + index, 1000 + index))
+    (cache.directory / ".tmp-abandonado").write_bytes(b"x")
+
+    reloaded = PhotoDiskCache(cache.directory, max_bytes=100, max_entry_bytes=60)
+    _put(reloaded, "otro", b"x" * 40)
+
+    assert reloaded.get("viejo") is None
+    assert reloaded.get("nuevo") is not None
+    assert not (cache.directory / ".tmp-abandonado").exists()
+
+
+def test_load_scans_the_directory_up_front(cache):
+    _put(cache, "foto", b"x" * 10)
+    (cache.directory / ".tmp-abandonado").write_bytes(b"x")
+
+    reloaded = PhotoDiskCache(cache.directory, max_bytes=100, max_entry_bytes=60)
+    reloaded.load()
+
+    assert not (cache.directory / ".tmp-abandonado").exists()
+    assert list(reloaded._entries) == ["foto"]
+
+
+def test_get_async_reads_the_index_off_the_event_loop(cache, monkeypatch):
+    _put(cache, "foto", b"x" * 10)
+    threads = []
+    original_get = PhotoDiskCache.get
+
+    def get(self, key):
+        threads.append(threading.get_ident())
+        return original_get(self, key)
+
+    monkeypatch.setattr(PhotoDiskCache, "get", get)
+
+    async def lookup():
+        return threading.get_ident(), await cache.get_async("foto")
+
+    loop_thread, cached = asyncio.run(lookup())
+
+    assert cached.length == 10
+    assert threads and threads[0] != loop_thread
+
+
+def test_purge_drops_the_original_and_its_derivatives(cache):
+    for size in (None, "thumb", "card"):
+        _put(cache, photo_cache_key("foto", size), b"x" * 10)
+    _put(cache, "foto2", b"x" * 10)
+
+    cache.purge("foto")
+
+    assert [cache.get(photo_cache_key("foto", size)) for size in (None, "thumb", "card")] == [None, None, None]
+    assert cache.get("foto2") is not None
+
+
+def test_disabled_cache_stores_nothing(tmp_path):
+    cache = PhotoDiskCache(tmp_path / "off", max_bytes=0, max_entry_bytes=0)
+    assert _put(cache, "abc", b"x") is None
+    assert cache.get("abc") is None
@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, select, update
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from models import PhotoPurgeJob
+from services import photo_purge
+
+
+class _Backend:
+    def __init__(self) -> None:
+        self.deleted: list[str] = []
+        self.broken: set[str] = set()
+
+    def delete(self, file_id):
+        if file_id in self.broken:
+            raise RuntimeError(f"no se pudo borrar {file_id}")
+        self.deleted.append(file_id)
+
+
+@pytest.fixture
+def session_factory(monkeypatch):
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    PhotoPurgeJob.__table__.create(engine)
+    factory = sessionmaker(bind=engine)
+    monkeypatch.setattr(photo_purge, "SessionLocal", factory)
+    return factory
+
+
+@pytest.fixture
+def backend(monkeypatch) -> _Backend:
+    backend = _Backend()
+    monkeypatch.setattr(photo_purge, "get_photo_backend", lambda bucket: backend)
+    return backend
+
+
+def _enqueue(session_factory, file_ids) -> None:
+    with session_factory() as db:
+        photo_purge.enqueue_photo_purge(db, "place_photos", file_ids)
+        db.commit()
+
+
+def _jobs(session_factory) -> list[PhotoPurgeJob]:
+    with session_factory() as db:
+        return list(db.scalars(select(PhotoPurgeJob).order_by(PhotoPurgeJob.id)))
+
+
+def _make_due(session_factory) -> None:
+    with session_factory() as db:
+        db.execute(update(PhotoPurgeJob).values(available_at=datetime(2000, 1, 1)))
+        db.commit()
+
+
+def test_enqueue_skips_missing_ids(session_factory):
+    with session_factory() as db:
+        assert photo_purge.enqueue_photo_purge(db, "place_photos", ["a", None, "", "b"]) == 2
+        db.commit()
+
+    assert [job.file_id for job in _jobs(session_factory)] == ["a", "b"]
+
+
+def test_batch_deletes_and_drains_the_queue(session_factory, backend):
+    _enqueue(session_factory, ["a", "b", "c"])
+    _make_due(session_factory)
+
+    assert photo_purge.process_photo_purge_batch(batch_size=2, max_attempts=3) == (2, 0)
+    assert photo_purge.process_photo_purge_batch(batch_size=2, max_attempts=3) == (1, 0)
+    assert backend.deleted == ["a", "b", "c"]
+    assert _jobs(session_factory) == []
+
+
+def test_failures_are_retried_with_backoff(session_factory, backend):
+    backend.broken.add("b")
+    _enqueue(session_factory, ["a", "b"])
+    _make_due(session_factory)
+
+    assert photo_purge.process_photo_purge_batch(batch_size=10, max_attempts=3) == (2, 1)
+    (job,) = _jobs(session_factory)
+    assert (job.file_id, job.attempts) == ("b", 1)
+    assert "no se pudo borrar b" in job.last_error
+    assert job.available_at > datetime.utcnow()
+
+    # Hasta que vence el backoff, el trabajo no se vuelve a tomar.
+    assert photo_purge.process_photo_purge_batch(batch_size=10, max_attempts=3) == (0, 0)
+
+    backend.broken.clear()
+    _make_due(session_factory)
+    assert photo_purge.process_photo_purge_batch(batch_size=10, max_attempts=3) == (1, 0)
+    assert backend.deleted == ["a", "b"]
+    assert _jobs(session_factory) == []
+
+
+def test_jobs_stop_after_max_attempts(session_factory, backend):
+    backend.broken.add("a")
+    _enqueue(session_factory, ["a"])
+
+    for _ in range(2):
+        _make_due(session_factory)
+        assert photo_purge.process_photo_purge_batch(batch_size=10, max_attempts=2) == (1, 1)
+
+    _make_due(session_factory)
+    assert photo_purge.process_photo_purge_batch(batch_size=10, max_attempts=2) == (0, 0)
+    (job,) = _jobs(session_factory)
+    assert job.attempts == 2
+    assert photo_purge.count_exhausted_photo_purges(max_attempts=2) == 1
+    assert photo_purge.count_exhausted_photo_purges(max_attempts=3) == 0
+
+
+def test_retry_delay_is_capped():
+    assert photo_purge._retry_delay(1) == timedelta(seconds=5)
+    assert photo_purge._retry_delay(3) == timedelta(seconds=20)
+    assert photo_purge._retry_delay(50) == timedelta(hours=1)
+
+
+def test_worker_counts_purged_and_failed(session_factory, backend):
+    backend.broken.add("b")
+    _enqueue(session_factory, ["a", "b"])
+    _make_due(session_factory)
+    worker = photo_purge.PhotoPurgeWorker(batch_size=10, poll_seconds=60, max_attempts=3)
+
+    assert worker.run_once() == 2
+    stats = worker.stats()
+    assert (stats["batches"], stats["purged"], stats["failed_attempts"]) == (1, 1, 1)
+    assert stats["running"] is False
+    assert stats["exhausted"] == 0
+
+    exhausted = photo_purge.PhotoPurgeWorker(batch_size=10, poll_seconds=60, max_attempts=1)
+    assert exhausted.stats()["exhausted"] == 1
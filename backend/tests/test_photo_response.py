@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import asyncio
+from io import BytesIO
+
+import pytest
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.testclient import TestClient
+
+from services import photo_response
+from services.photo_disk_cache import CachedPhoto
+from services.photo_response import _etag_matches, parse_range_header, quote_etag
+from settings import get_settings
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        ("bytes=0-99", (0, 99)),
+        ("bytes=100-", (100, 999)),
+        ("bytes=-100", (900, 999)),
+        ("bytes=-5000", (0, 999)),
+        ("bytes=990-2000", (990, 999)),
+        (" bytes=5-5 ", (5, 5)),
+    ],
+)
+def test_satisfiable_ranges(header, expected):
+    assert parse_range_header(header, 1000) == expected
+
+
+@pytest.mark.parametrize("header", [None, "", "bytes=-", "bytes=0-1,5-9", "items=0-9", "bytes=a-b"])
+def test_ignored_ranges_serve_the_whole_file(header):
+    assert parse_range_header(header, 1000) is None
+
+
+@pytest.mark.parametrize("header", ["bytes=1000-", "bytes=1000-1001", "bytes=50-10", "bytes=-0"])
+def test_unsatisfiable_ranges(header):
+    with pytest.raises(HTTPException) as error:
+        parse_range_header(header, 1000)
+    assert error.value.status_code == 416
+    assert error.value.headers == {"Content-Range": "bytes */1000"}
+
+
+def test_etag_matching():
+    etag = quote_etag("abc")
+    assert _etag_matches('"abc"', etag)
+    assert _etag_matches('"x", W/"abc"', etag)
+    assert _etag_matches("*", etag)
+    assert not _etag_matches('"abcd"', etag)
+    assert not _etag_matches(None, etag)
+
+
+def test_if_range_needs_a_strong_match():
+    etag = quote_etag("abc")
+    assert _etag_matches(' "abc" ', etag, strong=True)
+    assert not _etag_matches('W/"abc"', etag, strong=True)
+    assert not _etag_matches("*", etag, strong=True)
+    assert not _etag_matches('"x", "abc"', etag, strong=True)
+
+
+class _AsyncStoredFile:
+    def __init__(self, data: bytes) -> None:
+        self._content = BytesIO(data)
+        self.closed = False
+
+    def seek(self, offset: int) -> None:
+        self._content.seek(offset)
+
+    async def read(self, size: int = -1) -> bytes:
+        return self._content.read(size)
+
+    def close(self) -> None:
+        self.closed = True
+
+
+def _collect(stream) -> bytes:
+    async def consume() -> bytes:
+        return b"".join([chunk async for chunk in stream])
+
+    return asyncio.run(consume())
+
+
+def test_async_stream_reads_only_the_range_and_closes(monkeypatch):
+    monkeypatch.setattr(photo_response, "STREAM_CHUNK_SIZE", 4)
+    source = _AsyncStoredFile(bytes(range(20)))
+
+    assert _collect(photo_response._stream_grid_out(source, 3, 10)) == bytes(range(3, 13))
+    assert source.closed
+
+
+def _serve(path, headers=None, accel_prefix=None, monkeypatch=None):
+    settings = get_settings()
+    monkeypatch.setattr(settings, "photo_accel_redirect_prefix", accel_prefix)
+
+    async def open_file():
+        if path is None:
+            return None
+        return CachedPhoto(path=path, content_type="image/jpeg", length=path.stat().st_size)
+
+    app = FastAPI()
+
+    @app.get("/foto")
+    async def foto(request: Request):
+        return await photo_response.stream_photo(request, "clave-local", open_file)
+
+    return TestClient(app).get("/foto", headers=headers or {})
+
+
+@pytest.fixture
+def local_photo():
+    path = get_settings().uploads_root / "photos" / "aa" / "bb" / "foto"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(bytes(range(100)))
+    return path
+
+
+def test_local_photos_are_sent_from_disk(local_photo, monkeypatch):
+    response = _serve(local_photo, monkeypatch=monkeypatch)
+    assert response.status_code == 200
+    assert response.content == bytes(range(100))
+    assert "x-accel-redirect" not in response.headers
+
+    partial = _serve(local_photo, {"Range": "bytes=90-"}, monkeypatch=monkeypatch)
+    assert partial.status_code == 206
+    assert partial.content == bytes(range(90, 100))
+
+
+def test_proxy_sends_local_photos_when_configured(local_photo, monkeypatch):
+    response = _serve(local_photo, {"Range": "bytes=0-9"}, accel_prefix="/internal-photos/", monkeypatch=monkeypatch)
+
+    assert response.status_code == 200
+    assert response.content == b""
+    assert response.headers["x-accel-redirect"] == "/internal-photos/photos/aa/bb/foto"
+    assert response.headers["etag"] == '"clave-local"'
+
+
+def test_not_modified_only_for_existing_photos(local_photo, monkeypatch):
+    headers = {"If-None-Match": '"clave-local"'}
+
+    assert _serve(local_photo, headers, monkeypatch=monkeypatch).status_code == 304
+    assert _serve(None, headers, monkeypatch=monkeypatch).status_code == 404
+
+
+def test_weak_if_range_serves_the_whole_photo(local_photo, monkeypatch):
+    strong = _serve(local_photo, {"Range": "bytes=90-", "If-Range": '"clave-local"'}, monkeypatch=monkeypatch)
+    weak = _serve(local_photo, {"Range": "bytes=90-", "If-Range": 'W/"clave-local"'}, monkeypatch=monkeypatch)
+
+    assert strong.status_code == 206
+    assert weak.status_code == 200
+    assert weak.content == bytes(range(100))
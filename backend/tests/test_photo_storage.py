@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import asyncio
+from io import BytesIO
+
+import pytest
+from PIL import Image
+
+from services.photo_backends import FilesystemPhotoBackend, create_photo_backend
+
+
+def _png(color: tuple[int, int, int], size: tuple[int, int] = (900, 600)) -> BytesIO:
+    buffer = BytesIO()
+    Image.new("RGB", size, color).save(buffer, "PNG")
+    buffer.seek(0)
+    return buffer
+
+
+def _refcount(backend: FilesystemPhotoBackend, file_id: str) -> int:
+    exported = backend.export_photo(file_id)
+    exported.content.close()
+    return exported.refcount
+
+
+@pytest.fixture
+def backend(tmp_path) -> FilesystemPhotoBackend:
+    return FilesystemPhotoBackend(tmp_path / "place_photos")
+
+
+def test_identical_uploads_share_one_file(backend):
+    first = backend.save(_png((200, 10, 10)), "a.png", "image/png")
+    second = backend.save(_png((200, 10, 10)), "b.png", "image/png")
+    other = backend.save(_png((10, 200, 10)), "c.png", "image/png")
+
+    assert first == second
+    assert other != first
+    assert _refcount(backend, first) == 2
+    assert _refcount(backend, other) == 1
+    assert list(backend.iter_file_ids()) == sorted([first, other])
+
+
+def test_derivatives_are_stored_with_the_original(backend):
+    file_id = backend.save(_png((20, 20, 200)), "a.png", "image/png")
+    card = backend.local_file(file_id, "card")
+    original = backend.local_file(file_id)
+
+    assert card is not None and original is not None
+    assert card.path != original.path
+    assert original.content_type == "image/png"
+    with Image.open(card.path) as image:
+        assert max(image.size) <= 800
+    assert backend.local_file(file_id, "enorme") == original
+
+
+def test_open_and_open_async_read_the_stored_bytes(backend):
+    upload = _png((7, 7, 7))
+    file_id = backend.save(upload, "a.png", "image/png")
+
+    with backend.open(file_id) as handle:
+        assert handle.read() == upload.getvalue()
+    assert asyncio.run(backend.open_async(file_id, "thumb")) == backend.local_file(file_id, "thumb")
+    assert backend.open("0" * 24) is None
+
+
+def test_delete_releases_one_reference_at_a_time(backend):
+    file_id = backend.save(_png((1, 2, 3)), "a.png", "image/png")
+    backend.save(_png((1, 2, 3)), "b.png", "image/png")
+
+    backend.delete(file_id)
+    assert backend.local_file(file_id) is not None
+    assert _refcount(backend, file_id) == 1
+
+    backend.delete(file_id)
+    assert backend.local_file(file_id) is None
+    assert backend.local_file(file_id, "thumb") is None
+    assert list(backend.iter_file_ids()) == []
+
+
+def test_upload_after_last_delete_stores_a_new_file(backend):
+    file_id = backend.save(_png((9, 9, 9)), "a.png", "image/png")
+    backend.delete(file_id)
+    again = backend.save(_png((9, 9, 9)), "a.png", "image/png")
+
+    assert again != file_id
+    assert _refcount(backend, again) == 1
+
+
+def test_delete_ignores_unknown_ids(backend):
+    backend.delete(None)
+    backend.delete("no-es-un-id")
+    backend.delete("0" * 24)
+
+
+def test_export_and_import_keep_the_id_and_references(backend, tmp_path):
+    file_id = backend.save(_png((4, 5, 6)), "a.png", "image/png")
+    backend.save(_png((4, 5, 6)), "b.png", "image/png")
+    target = FilesystemPhotoBackend(tmp_path / "destino")
+
+    exported = backend.export_photo(file_id)
+    with exported.content:
+        target.import_photo(exported)
+
+    assert list(target.iter_file_ids()) == [file_id]
+    assert target.checksum(file_id) == backend.checksum(file_id)
+    assert _refcount(target, file_id) == 2
+    assert target.local_file(file_id, "card") is not None
+    # El mismo contenido subido al destino reutiliza el id migrado.
+    assert target.save(_png((4, 5, 6)), "c.png", "image/png") == file_id
+
+    target.remove(file_id)
+    assert list(target.iter_file_ids()) == []
+
+
+def test_unknown_backend_kind():
+    with pytest.raises(ValueError):
+        create_photo_backend("s3", "place_photos")
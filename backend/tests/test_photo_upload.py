@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import hashlib
+import threading
+from io import BytesIO
+
+import pytest
+from fastapi import HTTPException, UploadFile
+from starlette.datastructures import Headers
+
+from services.photo_upload import prepare_uploads, save_photos_concurrently
+from settings import get_settings
+
+
+def _upload(data: bytes, filename: str = "foto.jpg") -> UploadFile:
+    return UploadFile(BytesIO(data), filename=filename, headers=Headers({"content-type": "image/jpeg"}))
+
+
+@pytest.fixture
+def caps(monkeypatch):
+    settings = get_settings()
+    monkeypatch.setattr(settings, "photo_max_file_bytes", 100)
+    monkeypatch.setattr(settings, "photo_max_request_bytes", 250)
+    return settings
+
+
+def test_prepare_measures_and_rewinds(caps):
+    uploads = [_upload(b"a" * 80), _upload(b"b" * 100, filename="")]
+    uploads[0].file.read(10)
+
+    pending = prepare_uploads(uploads, ["uno.jpg", "dos.jpg"])
+
+    assert [(photo.size, photo.filename, photo.content_type) for photo in pending] == [
+        (80, "foto.jpg", "image/jpeg"),
+        (100, "dos.jpg", "image/jpeg"),
+    ]
+    assert all(photo.file.tell() == 0 for photo in pending)
+    assert pending[0].sha256 == hashlib.sha256(b"a" * 80).hexdigest()
+
+
+def test_file_over_the_cap_is_rejected(caps):
+    with pytest.raises(HTTPException) as error:
+        prepare_uploads([_upload(b"a" * 101)], ["uno.jpg"])
+    assert error.value.status_code == 413
+    assert "foto.jpg" in error.value.detail
+
+
+def test_request_over_the_cap_is_rejected(caps):
+    with pytest.raises(HTTPException) as error:
+        prepare_uploads([_upload(b"a" * 100) for _ in range(3)], ["a", "b", "c"])
+    assert error.value.status_code == 413
+    assert "por envío" in error.value.detail
+
+
+def _pending(count: int):
+    return prepare_uploads([_upload(bytes([index]) * 10, f"{index}.jpg") for index in range(count)], [""] * count)
+
+
+def test_saves_run_in_parallel_and_keep_the_input_order(caps):
+    barrier = threading.Barrier(2, timeout=5)
+
+    def save(content, filename, content_type, content_hash):
+        # Con subidas en serie la barrera nunca se completa y el test falla por timeout.
+        barrier.wait()
+        return f"id-{filename}"
+
+    assert save_photos_concurrently(save, lambda file_id: None, _pending(2)) == ["id-0.jpg", "id-1.jpg"]
+
+
+def test_failed_upload_discards_the_saved_ones(caps):
+    deleted: list[str] = []
+
+    def save(content, filename, content_type, content_hash):
+        if filename == "1.jpg":
+            raise RuntimeError("GridFS caído")
+        return f"id-{filename}"
+
+    with pytest.raises(RuntimeError):
+        save_photos_concurrently(save, deleted.append, _pending(3))
+    assert sorted(deleted) == ["id-0.jpg", "id-2.jpg"]
+
+
+def test_saves_receive_the_precomputed_hash(caps):
+    received: list[str] = []
+
+    def save(content, filename, content_type, content_hash):
+        received.append(content_hash)
+        return filename
+
+    photos = _pending(2)
+    save_photos_concurrently(save, lambda _: None, photos)
+    assert sorted(received) == sorted(photo.sha256 for photo in photos)
+
+
+def test_no_photos_saves_nothing():
+    assert save_photos_concurrently(lambda *_: pytest.fail("no debería guardar"), lambda _: None, []) == []
@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+from io import BytesIO
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from routers import photos
+from services.photo_backends import get_photo_backend
+from services.photo_urls import signed_photo_path, sized_photo_url, verify_photo_signature
+from settings import _hkdf_sha256, get_settings
+
+
+@pytest.fixture(scope="module")
+def client() -> TestClient:
+    app = FastAPI()
+    app.include_router(photos.router)
+    return TestClient(app)
+
+
+@pytest.fixture(scope="module")
+def photo() -> tuple[str, bytes]:
+    buffer = BytesIO()
+    Image.new("RGB", (640, 480), (30, 120, 200)).save(buffer, "JPEG")
+    content = buffer.getvalue()
+    backend = get_photo_backend(get_settings().mongodb_place_photos_bucket)
+    file_id = backend.save(BytesIO(content), "foto.jpg", "image/jpeg")
+    return file_id, content
+
+
+def _path(file_id: str) -> str:
+    return f"/{signed_photo_path('places', file_id)}"
+
+
+def test_hkdf_matches_the_rfc_5869_vector():
+    # RFC 5869, caso de prueba 3 (sin salt ni info)
+    assert _hkdf_sha256("\x0b" * 22, "", 42) == (
+        "8da4e775a563c18f715f802a063c5a31b8a11f5c5ee1879ec3454e5f3c738d2d9d201395faa4b61a96c8"
+    )
+    assert _hkdf_sha256("jwt", "fotos") != _hkdf_sha256("jwt", "otra cosa")
+
+
+def test_signature_depends_on_kind_and_id(photo):
+    file_id, _ = photo
+    signature = _path(file_id).rsplit("/", 1)[1]
+    assert verify_photo_signature("places", file_id, signature)
+    assert not verify_photo_signature("reviews", file_id, signature)
+    assert not verify_photo_signature("places", "0" * 24, signature)
+
+
+def test_full_download(client, photo):
+    file_id, content = photo
+    response = client.get(_path(file_id))
+
+    assert response.status_code == 200
+    assert response.content == content
+    assert response.headers["etag"] == f'"{file_id}"'
+    assert "immutable" in response.headers["cache-control"]
+    assert response.headers["accept-ranges"] == "bytes"
+
+
+def test_bad_signature_is_not_found(client, photo):
+    file_id, _ = photo
+    response = client.get(f"/api/photos/places/{file_id}/{'0' * 32}")
+    assert response.status_code == 404
+
+
+def test_matching_etag_is_not_modified(client, photo):
+    file_id, _ = photo
+    response = client.get(_path(file_id), headers={"If-None-Match": f'W/"otro", "{file_id}"'})
+
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == f'"{file_id}"'
+
+
+def test_range_returns_partial_content(client, photo):
+    file_id, content = photo
+    response = client.get(_path(file_id), headers={"Range": "bytes=10-19"})
+
+    assert response.status_code == 206
+    assert response.content == content[10:20]
+    assert response.headers["content-range"] == f"bytes 10-19/{len(content)}"
+    assert response.headers["content-length"] == "10"
+
+
+def test_suffix_range(client, photo):
+    file_id, content = photo
+    response = client.get(_path(file_id), headers={"Range": "bytes=-5"})
+
+    assert response.status_code == 206
+    assert response.content == content[-5:]
+
+
+def test_unsatisfiable_range(client, photo):
+    file_id, content = photo
+    response = client.get(_path(file_id), headers={"Range": f"bytes={len(content)}-"})
+
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{len(content)}"
+
+
+def test_stale_if_range_returns_the_whole_photo(client, photo):
+    file_id, content = photo
+    response = client.get(_path(file_id), headers={"Range": "bytes=0-9", "If-Range": '"otra-version"'})
+
+    assert response.status_code == 200
+    assert response.content == content
+
+
+def test_sized_url_serves_the_derivative(client, photo):
+    file_id, content = photo
+    response = client.get(sized_photo_url(_path(file_id), "thumb"))
+
+    assert response.status_code == 200
+    assert response.headers["etag"] != f'"{file_id}"'
+    with Image.open(BytesIO(response.content)) as image:
+        assert max(image.size) <= 320
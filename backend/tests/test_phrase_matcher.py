@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import random
+from typing import Optional
+
+import pytest
+
+import main
+from services import virtual_assistant_rules as rules
+from services.phrase_matcher import PhraseMatcher
+from services.text_normalization import normalize_text
+
+
+def _naive_find_all(phrases: list[tuple[str, str]], text: str) -> list[str]:
+    labels: list[str] = []
+    for phrase, label in phrases:
+        if phrase and phrase in text and label not in labels:
+            labels.append(label)
+    return labels
+
+
+def test_overlapping_phrases_and_priority():
+    matcher = PhraseMatcher([("he", "he"), ("she", "she"), ("his", "his"), ("hers", "hers")])
+
+    assert matcher.find_all("ushers") == ["he", "she", "hers"]
+    assert matcher.first("ushers") == "he"
+    assert matcher.first("xyz") is None
+    assert not matcher.matches("")
+    assert len(matcher) == 4
+
+
+def test_priority_is_registration_order_not_position():
+    matcher = PhraseMatcher([("zeta", "z"), ("alfa", "a"), ("beta", "z")])
+
+    assert matcher.find_all("alfa beta zeta") == ["z", "a"]
+    assert matcher.first("alfa beta") == "a"
+
+
+def test_random_phrases_match_like_substring_checks():
+    rng = random.Random(48)
+    for _ in range(200):
+        phrases = [
+            ("".join(rng.choice("ab ") for _ in range(rng.randint(0, 4))), rng.choice("xyzw"))
+            for _ in range(rng.randint(1, 8))
+        ]
+        matcher = PhraseMatcher(phrases)
+        for _ in range(20):
+            text = "".join(rng.choice("ab c") for _ in range(rng.randint(0, 12)))
+            expected = _naive_find_all(phrases, text)
+            assert matcher.find_all(text) == expected
+            assert matcher.first(text) == (expected[0] if expected else None)
+            assert matcher.matches(text) == bool(expected)
+
+
+# Implementaciones lineales anteriores al autómata, como referencia.
+
+
+def _linear_scripted(message: str, user_name: Optional[str]):
+    normalized = normalize_text(message)
+    blocked = any(word in normalized for word in ("gracias", "como", "publicar"))
+    if (
+        normalized
+        and not blocked
+        and any(normalized.startswith(word) for word in rules.GREETING_KEYWORDS)
+        and len(normalized.split()) <= 4
+    ):
+        return "saludo", None
+    for rule in rules._RULES:
+        if any(trigger in normalized for trigger in rule.triggers):
+            return rule.response_template, rule.next_intent
+    return None
+
+
+def _linear_category(text: str) -> Optional[str]:
+    normalized = normalize_text(text)
+    for category, keywords in rules.CATEGORY_ALIASES.items():
+        if any(normalize_text(keyword) in normalized for keyword in keywords):
+            return category
+    return None
+
+
+def _linear_rewards_scope(text: str, rewards_context: bool):
+    normalized = normalize_text(text)
+    if not any(keyword in normalized for keyword in ("reto", "logro", "recompensa")):
+        if rewards_context and ("en general" in normalized or "todos los lugares" in normalized):
+            return "category", None
+        return None, None
+    if any(f"{d} {n}" in normalized for n in ("lugares", "hoteles", "restaurantes", "alojamientos") for d in ("esos", "estos")):
+        return "places", None
+    category = next(
+        (
+            category
+            for category, terms in main.CATEGORY_TERMS.items()
+            if any(normalize_text(term) in normalized for term in terms)
+        ),
+        None,
+    )
+    if "todos los lugares" in normalized or "en general" in normalized or "todos" in normalized or "categoria" in normalized or category:
+        return "category", category
+    return None, None
+
+
+def _vocabulary() -> list[str]:
+    words = {"gracias", "hola", "buenas", "hey", "mi", "quiero", "ver", "xyz", "?", "Cómo", "CABAÑAS", "Quién"}
+    for rule in rules._RULES:
+        for trigger in rule.triggers:
+            words.update(trigger.split())
+    for terms in rules.CATEGORY_ALIASES.values():
+        words.update(terms)
+    for terms in main.CATEGORY_TERMS.values():
+        words.update(terms)
+    words.update("reto logro recompensa esos estos lugares todos general categoria en".split())
+    return sorted(words)
+
+
+def _random_messages(count: int) -> list[str]:
+    rng = random.Random(2048)
+    vocabulary = _vocabulary()
+    messages = [" ".join(rng.choice(vocabulary) for _ in range(rng.randint(1, 7))) for _ in range(count)]
+    # Disparadores completos, para cubrir también las coincidencias largas.
+    messages += [trigger for rule in rules._RULES for trigger in rule.triggers]
+    return messages
+
+
+@pytest.mark.parametrize("message", ["Hola!", "hola, como publico una reseña?", "¿Quién sos?", "quien eres vos", ""])
+def test_scripted_examples(message):
+    response = rules.match_scripted_response(message, "Ana")
+    expected = _linear_scripted(message, "Ana")
+    assert (response is None) == (expected is None)
+
+
+@pytest.mark.parametrize("message", ["¿Quién sos?", "y vos quien eres", "perdón, ¿qué sos?"])
+def test_who_are_you_is_answered_by_the_automaton(message):
+    response = rules.match_scripted_response(message, "Ana")
+    assert response.message == rules._RULES[0].response_template
+
+
+def test_scripted_responses_match_the_linear_rules():
+    for message in _random_messages(3000):
+        response = rules.match_scripted_response(message, None)
+        expected = _linear_scripted(message, None)
+        if expected is None:
+            assert response is None, message
+        elif expected[0] == "saludo":
+            assert response.message.startswith("¡Hola viajero!"), message
+        else:
+            assert (response.message, response.next_intent) == (rules._personalize(expected[0], None), expected[1]), message
+
+
+def test_category_keywords_match_the_linear_loop():
+    for message in _random_messages(3000):
+        assert rules.detect_category_keyword(message) == _linear_category(message), message
+    assert rules.detect_category_keyword("Busco CABAÑAS en la costa") == "alojamiento"
+
+
+def test_rewards_scope_matches_the_linear_checks():
+    state = main.AssistantState(rewards_context=True)
+    for message in _random_messages(3000):
+        assert main.detect_rewards_scope(message) == _linear_rewards_scope(message, False), message
+        assert main.detect_rewards_scope(message, state) == _linear_rewards_scope(message, True), message
+
+
+def test_new_recommendation_requests():
+    assert main._is_new_recommendation_request("¿Qué otros lugares hay?")
+    assert main._is_new_recommendation_request("quiero algo DIFERENTE")
+    assert not main._is_new_recommendation_request("contame de este lugar")
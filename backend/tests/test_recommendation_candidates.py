@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import random
+from datetime import date, time
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from models import Base, Booking, Location, LocationAlias, Place, PlaceLocation, PlaceSchedule, PlaceUnavailability, Review
+from services.locations import assign_place_locations
+from services.recommendation_candidates import (
+    lodging_candidates,
+    restaurant_candidates,
+    sample_recommendations,
+)
+
+_TABLES = (Place, PlaceSchedule, PlaceUnavailability, Booking, Review, Location, LocationAlias, PlaceLocation)
+# Un lunes
+_MONDAY = date(2026, 3, 2)
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[model.__table__ for model in _TABLES])
+    with sessionmaker(bind=engine)() as session:
+        yield session
+
+
+def _place(db, name: str, category: str = "hotel", rating: float = 3.0, **values) -> Place:
+    place = Place(name=name, category=category, rating_avg=rating, owner_id=1, **values)
+    db.add(place)
+    db.flush()
+    return place
+
+
+def _names(candidates) -> list[str]:
+    return [place.name for place, _ in candidates]
+
+
+def test_booked_and_unavailable_lodging_is_filtered_before_the_limit(db):
+    booked = _place(db, "Reservado", rating=5.0)
+    closed = _place(db, "Cerrado", rating=4.5)
+    _place(db, "Libre", rating=2.0)
+    db.add(Booking(place_id=booked.id, guest_id=1, check_in_date=date(2026, 3, 1), check_out_date=date(2026, 3, 4), total_price=1))
+    db.add(PlaceUnavailability(place_id=closed.id, start_date=date(2026, 3, 3), end_date=date(2026, 3, 10)))
+    db.flush()
+
+    stay = {"check_in": date(2026, 3, 2), "check_out": date(2026, 3, 5)}
+    assert _names(lodging_candidates(db, category="hotel", pool_size=1, **stay)) == ["Libre"]
+    # La salida de una reserva el mismo día de la entrada no se superpone.
+    later = {"check_in": date(2026, 3, 4), "check_out": date(2026, 3, 6)}
+    assert sorted(_names(lodging_candidates(db, category="hotel", **later))) == ["Libre", "Reservado"]
+
+
+def test_lodging_filters_price_capacity_and_location(db):
+    _place(db, "Barato", price_per_night=50, capacity=2, city_state="Rosario")
+    _place(db, "Caro", price_per_night=500, capacity=6, city_state="Rosario")
+    _place(db, "Grande", price_per_night=80, capacity=None, city_state="Mendoza")
+    _place(db, "Hostel", category="hostel", price_per_night=20, city_state="Rosario")
+
+    assert sorted(_names(lodging_candidates(db, category="hotel", max_price=100))) == ["Barato", "Grande"]
+    assert sorted(_names(lodging_candidates(db, category="hotel", guests=4))) == ["Caro", "Grande"]
+    assert sorted(_names(lodging_candidates(db, category="hotel", location="rosario"))) == ["Barato", "Caro"]
+
+
+def test_location_matches_normalized_aliases(db):
+    place = _place(db, "Obelisco Suites", city_state="Av. Corrientes 1000")
+    assign_place_locations(db, place.id, "Argentina", "CABA")
+
+    assert _names(lodging_candidates(db, category="hotel", location="Capital Federal")) == ["Obelisco Suites"]
+
+
+def test_unreviewed_places_come_first_then_by_rating(db):
+    reviewed = _place(db, "Visitado", rating=5.0)
+    _place(db, "Bueno", rating=4.0)
+    _place(db, "Regular", rating=2.0)
+    db.add(Review(place_id=reviewed.id, user_id=7, rating=5, author_name="Ana"))
+    db.flush()
+
+    candidates = lodging_candidates(db, category="hotel", user_id=7)
+    assert [(place.name, seen) for place, seen in candidates] == [
+        ("Bueno", False),
+        ("Regular", False),
+        ("Visitado", True),
+    ]
+    assert not any(seen for _, seen in lodging_candidates(db, category="hotel"))
+
+
+def test_restaurants_open_at_the_visit_time(db):
+    lunch = _place(db, "Almuerzo", category="Restaurante")
+    late = _place(db, "Trasnoche", category="restaurante")
+    closed = _place(db, "Cerrado el lunes", category="restaurante")
+    _place(db, "Sin horario", category="restaurante")
+    holiday = _place(db, "De vacaciones", category="restaurante")
+    db.add_all(
+        [
+            PlaceSchedule(place_id=lunch.id, day_of_week=0, opening_time=time(12), closing_time=time(16)),
+            # Cierra después de medianoche: abierto hasta el fin del día.
+            PlaceSchedule(place_id=late.id, day_of_week=0, opening_time=time(20), closing_time=time(2)),
+            PlaceSchedule(place_id=closed.id, day_of_week=0, is_closed=True),
+            PlaceUnavailability(place_id=holiday.id, start_date=_MONDAY, end_date=_MONDAY),
+        ]
+    )
+    db.flush()
+
+    at_lunch = restaurant_candidates(db, visit_date=_MONDAY, visit_time=time(13))
+    assert sorted(_names(at_lunch)) == ["Almuerzo", "Sin horario"]
+    at_night = restaurant_candidates(db, visit_date=_MONDAY, visit_time=time(23))
+    assert sorted(_names(at_night)) == ["Sin horario", "Trasnoche"]
+
+
+def test_sample_prefers_unreviewed_places():
+    places = [Place(name=f"Lugar {i}", rating_avg=float(i % 5)) for i in range(6)]
+    candidates = [(place, index < 2) for index, place in enumerate(places)]
+
+    sampled = sample_recommendations(candidates, k=3, rng=random.Random(1))
+    assert len(sampled) == 3
+    assert not set(sampled) & set(places[:2])
+
+    few = sample_recommendations(candidates[:3], k=3, rng=random.Random(1))
+    assert set(few) == set(places[:3])
+
+
+def test_sample_weights_by_rating():
+    top = Place(name="Excelente", rating_avg=5.0)
+    low = Place(name="Sin reseñas", rating_avg=0.0)
+    rng = random.Random(7)
+
+    picks = [sample_recommendations([(top, False), (low, False)], k=1, rng=rng)[0] for _ in range(600)]
+    # Peso 6 contra 1: el mejor puntuado sale cerca del 86% de las veces.
+    assert 0.78 < picks.count(top) / len(picks) < 0.94
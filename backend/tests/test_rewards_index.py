@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import pytest
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from models import Base, Challenge, Reward
+from services import rewards_index
+from services.rewards_index import IndexedChallenge, IndexedReward, RewardsIndex, RewardsIndexCache
+from services.text_normalization import normalize_text
+
+
+def _index() -> RewardsIndex:
+    challenges = [
+        IndexedChallenge(1, "Explorador de cabañas", "Reseñá 3 cabañas"),
+        IndexedChallenge(2, "Gourmet", "Visitá restaurantes"),
+    ]
+    rewards = [
+        IndexedReward(10, "Descuento", "10% en hoteles", None, None, None),
+        IndexedReward(11, "Noche gratis", "Una noche", 1, "Explorador de cabañas", "Reseñá 3 cabañas"),
+        IndexedReward(12, "Postre", "Postre sin cargo", 2, "Gourmet", "Visitá restaurantes"),
+    ]
+    return RewardsIndex(challenges, rewards)
+
+
+def test_normalize_text():
+    assert normalize_text("Cabaña en CÓRDOBA") == "cabana en cordoba"
+    assert normalize_text(None) == ""
+
+
+def test_terms_match_normalized_text_in_id_order():
+    index = _index()
+
+    assert [c.id for c in index.challenges_matching(["CABAÑA"])] == [1]
+    assert [c.id for c in index.challenges_matching(["restaurant", "caba"])] == [1, 2]
+    # Un premio también matchea por el texto de su reto.
+    assert [r.id for r in index.rewards_matching(["cabaña"])] == [11]
+    assert [r.id for r in index.rewards_matching(["hotel", "restaurantes"])] == [10, 12]
+    assert index.rewards_matching(["", "spa"]) == []
+
+
+def test_repeated_terms_give_the_same_answer():
+    index = _index()
+    first = index.rewards_matching(["postre"])
+    assert index.rewards_matching(["postre"]) == first
+
+
+@pytest.fixture
+def session_factory(monkeypatch):
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine, tables=[Challenge.__table__, Reward.__table__])
+    factory = sessionmaker(bind=engine)
+    monkeypatch.setattr(rewards_index, "SessionLocal", factory)
+    with factory() as db:
+        db.add(Challenge(id=1, title="Gourmet", slug="gourmet", description="Visitá restaurantes"))
+        db.add(Reward(id=10, title="Postre", description="Postre sin cargo", challenge_id=1))
+        db.commit()
+    return factory
+
+
+@pytest.fixture
+def cache(monkeypatch) -> RewardsIndexCache:
+    cache = RewardsIndexCache(ttl_seconds=300)
+    monkeypatch.setattr(rewards_index, "get_rewards_index_cache", lambda: cache)
+    return cache
+
+
+def test_cache_builds_once_until_invalidated(session_factory, cache):
+    index = cache.get()
+    assert cache.get() is index
+    assert [r.challenge_title for r in index.rewards] == ["Gourmet"]
+    assert cache.stats() == {"challenges": 1, "rewards": 1, "builds": 1, "invalidations": 0}
+
+    cache.invalidate()
+    assert cache.get() is not index
+    assert cache.stats()["builds"] == 2
+
+
+def test_commits_touching_rewards_invalidate_the_cache(session_factory, cache):
+    cache.get()
+
+    with session_factory() as db:
+        db.add(Reward(id=11, title="Café", description="Café gratis"))
+        db.commit()
+    assert [r.id for r in cache.get().rewards_matching(["cafe"])] == [11]
+
+    with session_factory() as db:
+        db.execute(update(Challenge).values(description="Probá cafeterías"))
+        db.commit()
+    assert [c.id for c in cache.get().challenges_matching(["cafeteria"])] == [1]
+    assert cache.stats()["invalidations"] == 2
+
+
+def test_rolled_back_changes_keep_the_cache(session_factory, cache):
+    index = cache.get()
+
+    with session_factory() as db:
+        db.add(Reward(id=12, title="Spa", description="Día de spa"))
+        db.flush()
+        db.rollback()
+    with session_factory() as db:
+        db.commit()
+
+    assert cache.get() is index
+
+
+def test_ttl_expiry_rebuilds(session_factory, cache, monkeypatch):
+    index = cache.get()
+    now = rewards_index.time.monotonic()
+    monkeypatch.setattr(rewards_index.time, "monotonic", lambda: now + 301)
+
+    assert cache.get() is not index
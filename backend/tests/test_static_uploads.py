@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from services.static_uploads import UploadsStaticFiles
+
+
+@pytest.fixture
+def client(tmp_path) -> TestClient:
+    (tmp_path / "avatars").mkdir()
+    (tmp_path / "avatars" / "yo.png").write_bytes(b"avatar")
+    (tmp_path / "photos" / "ab").mkdir(parents=True)
+    (tmp_path / "photos" / "ab" / "foto.jpg").write_bytes(b"privada")
+    (tmp_path / "photos_viejas").mkdir()
+    (tmp_path / "photos_viejas" / "x.jpg").write_bytes(b"publica")
+
+    app = FastAPI()
+    app.mount("/uploads", UploadsStaticFiles(directory=tmp_path, private_dirs=[tmp_path / "photos"]))
+    return TestClient(app)
+
+
+def test_public_uploads_are_served(client):
+    assert client.get("/uploads/avatars/yo.png").content == b"avatar"
+    # Solo se esconde el directorio privado, no los que empiezan igual.
+    assert client.get("/uploads/photos_viejas/x.jpg").content == b"publica"
+
+
+@pytest.mark.parametrize(
+    "path",
+    ["/uploads/photos/ab/foto.jpg", "/uploads/photos/ab", "/uploads/avatars/../photos/ab/foto.jpg"],
+)
+def test_private_dirs_are_not_found(client, path):
+    assert client.get(path).status_code == 404
+
+
+def test_symlinks_into_private_dirs_are_not_found(client, tmp_path):
+    (tmp_path / "avatars" / "atajo.jpg").symlink_to(tmp_path / "photos" / "ab" / "foto.jpg")
+
+    assert client.get("/uploads/avatars/atajo.jpg").status_code == 404
+
+
+def test_app_hides_the_photo_store_and_the_disk_cache():
+    import main
+
+    settings = main.settings
+    public = settings.uploads_root / "avatars" / "publico.txt"
+    public.parent.mkdir(parents=True, exist_ok=True)
+    public.write_text("hola")
+    private = [directory / "prueba.jpg" for directory in (settings.photo_storage_dir, settings.photo_cache_dir)]
+    for path in private:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"privada")
+    client = TestClient(main.app)
+
+    try:
+        assert client.get("/uploads/avatars/publico.txt").text == "hola"
+        assert client.get("/uploads/photos/prueba.jpg").status_code == 404
+        assert client.get("/uploads/photo_cache/prueba.jpg").status_code == 404
+    finally:
+        for path in [public, *private]:
+            path.unlink()